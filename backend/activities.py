@@ -0,0 +1,121 @@
+# backend/activities.py
+"""
+Tätigkeiten: Auflösung Text → Activity und die Nutzungszähler
+pro Mitarbeiter (für die Vorschlagsliste beim Stempeln).
+"""
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+
+# Startbestand (entspricht der früheren festen Liste im Frontend)
+DEFAULT_ACTIVITIES = [
+    "Aufräumen",
+    "Logistik",
+    "Pause",
+    "CAD",
+    "Engineering",
+    "Montage",
+    "Werkstatt",
+    "Werkstatt extern",
+    "Montage extern",
+    "Projektleitung",
+    "Meeting",
+    "Administration",
+    "Software",
+    "Inbetriebnahme",
+    "Support",
+    "Service",
+    "Krank",
+    "Ferien",
+]
+
+# Vom System gebuchte Tätigkeiten: Schlüssel → Startname. Gesucht wird über
+# den Schlüssel, damit Umbenennen nichts kaputt macht.
+SYSTEM_ACTIVITIES = {
+    "pause": "Pause",
+    "krank": "Krank",
+    "ferien": "Ferien",
+}
+PAUSE_SCHLUESSEL = "pause"
+FERIEN_SCHLUESSEL = "ferien"
+# Startnamen: nur noch für Einträge ohne activity_id (Altbestand, freier Text)
+PAUSE_TAETIGKEIT = SYSTEM_ACTIVITIES[PAUSE_SCHLUESSEL]
+FERIEN_TAETIGKEIT = SYSTEM_ACTIVITIES[FERIEN_SCHLUESSEL]
+
+
+def system_activity(db: Session, schluessel: str) -> models.Activity | None:
+    return db.query(models.Activity).filter(models.Activity.schluessel == schluessel).first()
+
+
+def find_activity(db: Session, name: str | None) -> models.Activity | None:
+    """
+    Sucht eine Tätigkeit per Name (ohne Gross-/Kleinschreibung und Leerzeichen
+    am Rand). Unbekannte Texte werden NICHT automatisch angelegt.
+    """
+    if not name or not name.strip():
+        return None
+    return (
+        db.query(models.Activity)
+        .filter(func.lower(models.Activity.name) == name.strip().lower())
+        .first()
+    )
+
+
+def assign_activity(db: Session, entry: models.TimeEntry) -> None:
+    """
+    Setzt activity_id/taetigkeit konsistent:
+    - activity_id gesetzt → taetigkeit = Name der Tätigkeit
+    - nur Text gesetzt   → activity_id per Namenssuche
+    """
+    if entry.activity_id is not None:
+        act = db.get(models.Activity, entry.activity_id)
+        if act is not None:
+            entry.taetigkeit = act.name
+            return
+    act = find_activity(db, entry.taetigkeit)
+    entry.activity_id = act.id if act else None
+
+
+def bump_usage(db: Session, employee_id: int, activity_id: int | None, delta: int = 1) -> None:
+    """
+    Zähler per Upsert anpassen – kein Durchsuchen der Historie.
+    """
+    if activity_id is None:
+        return
+    now = datetime.utcnow()
+    stmt = insert(models.ActivityUsage).values(
+        employee_id=employee_id,
+        activity_id=activity_id,
+        anzahl=max(delta, 0),
+        zuletzt=now if delta > 0 else None,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.ActivityUsage.employee_id, models.ActivityUsage.activity_id],
+        set_={
+            "anzahl": func.greatest(models.ActivityUsage.anzahl + delta, 0),
+            "zuletzt": now if delta > 0 else models.ActivityUsage.zuletzt,
+        },
+    )
+    db.execute(stmt)
+
+
+def suggest_activities(db: Session, employee_id: int, limit: int = 5) -> list[tuple]:
+    """
+    Meistgenutzte aktive Tätigkeiten dieses Mitarbeiters (Index-Scan auf activity_usage).
+    """
+    return (
+        db.query(models.Activity, models.ActivityUsage.anzahl)
+        .join(models.ActivityUsage, models.ActivityUsage.activity_id == models.Activity.id)
+        .filter(
+            models.ActivityUsage.employee_id == employee_id,
+            models.ActivityUsage.anzahl > 0,
+            models.Activity.aktiv.is_(True),
+        )
+        .order_by(models.ActivityUsage.anzahl.desc(), models.ActivityUsage.zuletzt.desc())
+        .limit(limit)
+        .all()
+    )
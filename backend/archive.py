@@ -0,0 +1,345 @@
+# backend/archive.py
+"""
+Archivierung abgeschlossener Projekte.
+
+Der Projektordner wird als tar.xz nach <projektpfad>/99_Archiv/ gestreamt
+(Datei für Datei, konstanter Speicher), gegen ein Manifest (Grösse + SHA-256)
+geprüft und danach durch das Archiv ersetzt. Der Projektordner selbst bleibt
+bestehen – die Laufnummern in BASE_DIR/<jahr> verschieben sich dadurch nicht.
+"""
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+from db import SessionLocal, engine
+from filesystem import resolve_project_path
+
+ARCHIV_ORDNER = "99_Archiv"
+ARCHIV_STATUS = "Abgeschlossen"
+CHUNK_SIZE = 1024 * 1024
+# xz-Preset: 6 = Standard; höher spart kaum Platz, kostet aber viel CPU
+XZ_PRESET = int(os.getenv("ARCHIV_XZ_PRESET", "6"))
+# Nur ein Batch gleichzeitig – über alle Worker und den Cron-Aufruf hinweg
+_LOCK_KEY = 280003
+
+_batch: threading.Thread | None = None
+
+
+class _HashingReader:
+    """
+    Reicht Dateiinhalt an tarfile durch und berechnet dabei SHA-256.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self.sha = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self.sha.update(data)
+        return data
+
+
+def _archive_path(project_root: Path) -> Path:
+    return project_root / ARCHIV_ORDNER / f"{project_root.name}.tar.xz"
+
+
+def _walk(project_root: Path, skip: tuple[Path, ...]):
+    """
+    (Pfad, Archivname) aller Einträge in stabiler Reihenfolge; Symlinks auf
+    Ordner werden nicht verfolgt (os.walk listet sie unter dirnames).
+    """
+    for dirpath, dirnames, filenames in os.walk(project_root):
+        for name in sorted(dirnames) + sorted(filenames):
+            full = Path(dirpath) / name
+            if full not in skip:
+                yield full, full.relative_to(project_root).as_posix()
+
+
+def _file_digest(f) -> tuple[int, str]:
+    sha = hashlib.sha256()
+    size = 0
+    while chunk := f.read(CHUNK_SIZE):
+        sha.update(chunk)
+        size += len(chunk)
+    return size, sha.hexdigest()
+
+
+def _read_manifest(archive: Path) -> dict[str, tuple]:
+    """
+    Manifest aus dem Archiv: Dateien → (Grösse, SHA-256),
+    Sym-/Hardlinks → (Typ, Ziel). Ordner zählen nicht.
+    """
+    manifest: dict[str, tuple] = {}
+    with tarfile.open(archive, mode="r:xz") as tar:
+        for member in tar:
+            if member.isdir():
+                continue
+            if member.issym() or member.islnk():
+                manifest[member.name] = (member.type, member.linkname)
+            elif member.isfile():
+                manifest[member.name] = _file_digest(tar.extractfile(member))
+            else:
+                raise ValueError(f"Unerwarteter Eintrag im Archiv: {member.name}")
+    return manifest
+
+
+def _restore_filter(member: tarfile.TarInfo, dest_path: str) -> tarfile.TarInfo:
+    """
+    Symlinks werden so archiviert, wie sie im Projektordner stehen (auch
+    absolut oder nach aussen) und genau so wiederhergestellt: für sie gilt
+    "tar" (Pfad des Eintrags geprüft, Ziel nicht), für alles andere "data".
+    """
+    if member.issym():
+        return tarfile.tar_filter(member, dest_path)
+    return tarfile.data_filter(member, dest_path)
+
+
+def _check_members(tar: tarfile.TarFile, dest: Path) -> None:
+    """
+    Alle Einträge vorab durch den Restore-Filter schicken – beim Archivieren
+    und vor dem Entpacken. So scheitert ein Restore nicht erst mittendrin.
+    Einträge unterhalb eines Symlinks (_walk erzeugt keine) werden abgelehnt,
+    sonst würde durch den Link hindurch geschrieben.
+    """
+    links = set()
+    for member in tar.getmembers():
+        _restore_filter(member, str(dest))
+        parts = member.name.split("/")
+        if any("/".join(parts[:i]) in links for i in range(1, len(parts))):
+            raise ValueError(f"Eintrag unterhalb eines Symlinks: {member.name}")
+        if member.issym():
+            links.add(member.name)
+
+
+def _verify(archive: Path, manifest: dict[str, tuple]) -> None:
+    # Gegen ein leeres Ziel wie beim Restore (der Baum wird ja ersetzt);
+    # der echte Baum würde Symlinks nach aussen auflösen
+    with tarfile.open(archive, mode="r:xz") as tar, tempfile.TemporaryDirectory() as leer:
+        _check_members(tar, Path(leer))
+    actual = _read_manifest(archive)
+    missing = set(manifest) - set(actual)
+    if missing:
+        raise ValueError(f"{len(missing)} Datei(en) fehlen im Archiv")
+    for name, value in actual.items():
+        if name not in manifest:
+            raise ValueError(f"Unerwartete Datei im Archiv: {name}")
+        if value != manifest[name]:
+            raise ValueError(f"Prüfsumme stimmt nicht: {name}")
+
+
+def _check_remaining(project_root: Path, archive: Path) -> None:
+    """
+    Wiederaufnahme: Archiv existiert schon, der Baum ist evtl. teilweise
+    gelöscht. Alles, was noch da ist, muss unverändert im Archiv stehen.
+    """
+    archived = _read_manifest(archive)
+    for full, rel in _walk(project_root, (archive, archive.with_suffix(".xz.part"))):
+        if full.is_symlink():
+            actual = (tarfile.SYMTYPE, os.readlink(full))
+        elif full.is_dir():
+            continue
+        else:
+            with open(full, "rb") as f:
+                actual = _file_digest(f)
+        expected = archived.get(rel)
+        if expected and expected[0] == tarfile.LNKTYPE:
+            expected = archived.get(expected[1])
+        if actual != expected:
+            raise ValueError(
+                f"Archiv {archive.name} existiert bereits, {rel} fehlt darin oder wurde geändert"
+            )
+
+
+def _remove_tree(project_root: Path, archive: Path) -> None:
+    # Baum durch das Archiv ersetzen
+    for child in project_root.iterdir():
+        if child == archive.parent:
+            for sub in child.iterdir():
+                if sub != archive:
+                    shutil.rmtree(sub) if sub.is_dir() and not sub.is_symlink() else sub.unlink()
+        elif child.is_dir() and not child.is_symlink():
+            shutil.rmtree(child)
+        else:
+            child.unlink()
+
+
+def archive_folder(projektpfad: str) -> str:
+    """
+    Archiviert einen Projektordner und gibt den Pfad des Archivs zurück.
+    Läuft ohne DB-Zugriff → auch in einem Worker-Prozess nutzbar.
+
+    Existiert das Archiv schon (Abbruch beim Löschen des Baums), wird nicht
+    neu gepackt: Reste werden gegen das Archiv geprüft und dann entfernt.
+    """
+    project_root = resolve_project_path(projektpfad)
+    if not project_root.is_dir():
+        raise FileNotFoundError(f"Projektordner fehlt: {project_root}")
+
+    archive = _archive_path(project_root)
+    if archive.exists():
+        _check_remaining(project_root, archive)
+        _remove_tree(project_root, archive)
+        return str(archive)
+
+    archive.parent.mkdir(exist_ok=True)
+    tmp = archive.with_suffix(".xz.part")
+    manifest: dict[str, tuple] = {}
+
+    try:
+        with tarfile.open(tmp, mode="w:xz", preset=XZ_PRESET) as tar:
+            for full, rel in _walk(project_root, (archive, tmp)):
+                info = tar.gettarinfo(str(full), arcname=rel)
+                if info.issym() or info.islnk():
+                    tar.addfile(info)
+                    manifest[rel] = (info.type, info.linkname)
+                elif info.isfile():
+                    with open(full, "rb") as f:
+                        reader = _HashingReader(f)
+                        tar.addfile(info, reader)
+                    manifest[rel] = (info.size, reader.sha.hexdigest())
+                elif info.isdir():
+                    tar.addfile(info)
+
+        _verify(tmp, manifest)
+        tmp.replace(archive)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    _remove_tree(project_root, archive)
+    return str(archive)
+
+
+def restore_folder(projektpfad: str, archiv_pfad: str) -> None:
+    project_root = resolve_project_path(projektpfad)
+    archive = resolve_project_path(archiv_pfad)
+    if not archive.is_file():
+        raise FileNotFoundError(f"Archiv fehlt: {archive}")
+
+    with tarfile.open(archive, mode="r:xz") as tar:
+        # Gleiche Regeln wie beim Archivieren: keine absoluten Pfade, kein "..",
+        # keine Gerätedateien; Symlinks wie archiviert
+        _check_members(tar, project_root)
+        tar.extractall(project_root, filter=_restore_filter)
+    archive.unlink()
+
+
+def archive_project(db: Session, project: models.Project) -> models.Project:
+    # Transaktion vor dem langen Packen beenden (idle_in_transaction_session_timeout)
+    projektpfad = project.projektpfad
+    db.commit()
+    project.archiv_pfad = archive_folder(projektpfad)
+    project.archiviert_am = datetime.utcnow()
+    db.commit()
+    db.refresh(project)
+    return project
+
+
+def restore_project(db: Session, project: models.Project) -> models.Project:
+    projektpfad, archiv_pfad = project.projektpfad, project.archiv_pfad
+    db.commit()
+    restore_folder(projektpfad, archiv_pfad)
+    project.archiv_pfad = None
+    project.archiviert_am = None
+    db.commit()
+    db.refresh(project)
+    return project
+
+
+def archive_closed_projects(db: Session, workers: int = 2) -> dict:
+    """
+    Alle abgeschlossenen, noch nicht archivierten Projekte archivieren.
+    Komprimieren ist CPU-lastig → Prozess-Pool; die DB-Updates macht der
+    aufrufende Prozess.
+    """
+    projects = (
+        db.query(models.Project)
+        .filter(
+            models.Project.status == ARCHIV_STATUS,
+            models.Project.archiv_pfad.is_(None),
+            models.Project.projektpfad.is_not(None),
+        )
+        .all()
+    )
+    by_id = {p.id: p for p in projects}
+    pfade = {p.id: p.projektpfad for p in projects}
+    ok, fehler = [], {}
+    # Nicht während des Packens in einer offenen Transaktion warten
+    db.commit()
+
+    # spawn statt fork: der Webserver-Prozess hat Threads und DB-Verbindungen
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(archive_folder, pfade[pid]): pid for pid in by_id}
+        for fut, project_id in futures.items():
+            try:
+                archiv_pfad = fut.result()
+            except Exception as e:
+                fehler[project_id] = str(e)
+                continue
+            proj = by_id[project_id]
+            proj.archiv_pfad = archiv_pfad
+            proj.archiviert_am = datetime.utcnow()
+            db.commit()
+            ok.append(project_id)
+
+    return {"archiviert": ok, "fehler": fehler}
+
+
+def run_archive_batch(workers: int = 2) -> dict | None:
+    """
+    Batch unter dem Advisory Lock; None, wenn schon einer läuft.
+    Ein abgebrochener Batch (Worker-Neustart) wird beim nächsten Lauf
+    fortgesetzt, archive_folder nimmt halb ersetzte Ordner wieder auf.
+    """
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_KEY}).scalar():
+            return None
+        db = SessionLocal()
+        try:
+            return archive_closed_projects(db, workers=workers)
+        finally:
+            db.close()
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+
+
+def _batch_thread(workers: int) -> None:
+    try:
+        result = run_archive_batch(workers)
+        print("Archivierung:", result if result is not None else "läuft bereits in einem anderen Prozess")
+    except Exception as e:
+        print("Fehler in der Archivierung:", e)
+
+
+def start_archive_batch(workers: int = 2) -> bool:
+    """
+    Startet den Batch im Hintergrund und kehrt sofort zurück – dauert
+    länger als jeder Request-Timeout. False, wenn in diesem Prozess schon
+    einer läuft (andere Prozesse fängt der Lock ab).
+    """
+    global _batch
+    if _batch is not None and _batch.is_alive():
+        return False
+    _batch = threading.Thread(target=_batch_thread, args=(workers,), name="archivierung", daemon=True)
+    _batch.start()
+    return True
+
+
+if __name__ == "__main__":
+    # Batch z.B. per Cron: docker exec stech_backend python archive.py 4
+    import sys
+
+    result = run_archive_batch(workers=int(sys.argv[1]) if len(sys.argv) > 1 else 2)
+    print(result if result is not None else "Archivierung läuft bereits.")
@@ -0,0 +1,197 @@
+# backend/audit.py
+"""
+Audit-Log für Zeiteinträge und HR-Felder der Mitarbeiter.
+
+Ein AFTER-Trigger schreibt pro geänderter Zeile genau EINEN Eintrag in
+audit_log – in derselben Transaktion wie die Änderung, also auch für
+Set-basierte Updates (Neubewertung, Krank-Job, Sync). Gespeichert werden
+nur die geänderten Spalten als JSONB: {spalte: {"alt": …, "neu": …}}.
+
+audit_log ist append-only (UPDATE/DELETE/TRUNCATE per Trigger gesperrt)
+und nach Monat partitioniert; die Partitionen für die kommenden Monate
+legt der Tagesjob an, eine DEFAULT-Partition fängt den Rest auf.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import models
+from db import MIGRATION_LOCK_KEY
+
+# Mitarbeiter: nur vertrags-/lohnrelevante Felder und Rechte protokollieren
+EMPLOYEE_HR_FIELDS = [
+    "eintrittsdatum",
+    "austrittsdatum",
+    "pensum",
+    "stunden_pro_woche",
+    "lohnart",
+    "lohn",
+    "dreizehnter",
+    "kadervertrag",
+    "ferienanspruch",
+    "ferien_guthaben_stunden",
+    "ueberstunden_guthaben",
+    "saldo_stichtag",
+    "bvg_eintritt",
+    "bvg_pflichtig",
+    "krankentaggeld_versichert",
+    "unfallversicherung_priv",
+    "iban",
+    "bank",
+    "kostenstelle",
+    "krankentage",
+    "krank_seit",
+    "aktiv",
+    "is_admin",
+    "can_manage_projects",
+    "can_see_customers_projects",
+]
+
+# Trigger-Argumente leer = alle Spalten
+AUDIT_TABLES = {
+    "time_entries": [],
+    "employees": EMPLOYEE_HR_FIELDS,
+}
+
+# Werden von Triggern bzw. ORM bei jeder Änderung gesetzt → kein Inhalt
+_IGNORED = ["geändert_am", "change_seq", "change_xid"]
+
+PARTITIONS_AHEAD = 2
+
+_AUDIT_FUNCTION = """
+CREATE OR REPLACE FUNCTION audit_row() RETURNS trigger AS $$
+DECLARE
+    alt jsonb := CASE WHEN TG_OP = 'INSERT' THEN '{}'::jsonb ELSE to_jsonb(OLD) END;
+    neu jsonb := CASE WHEN TG_OP = 'DELETE' THEN '{}'::jsonb ELSE to_jsonb(NEW) END;
+    diff jsonb;
+BEGIN
+    SELECT jsonb_object_agg(k, jsonb_build_object('alt', alt -> k, 'neu', neu -> k))
+    INTO diff
+    FROM jsonb_object_keys(alt || neu) AS k
+    WHERE k <> ALL (ARRAY[%(ignored)s])
+      AND (TG_NARGS = 0 OR k = ANY (TG_ARGV))
+      AND COALESCE(alt -> k, 'null') IS DISTINCT FROM COALESCE(neu -> k, 'null');
+
+    IF diff IS NOT NULL THEN
+        INSERT INTO audit_log (zeit, tabelle, row_id, aktion, diff, txid)
+        VALUES (
+            now() AT TIME ZONE 'utc',
+            TG_TABLE_NAME,
+            ((CASE WHEN TG_OP = 'DELETE' THEN alt ELSE neu END) ->> 'id')::int,
+            TG_OP,
+            diff,
+            pg_current_xact_id()::text::bigint
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+""" % {"ignored": ", ".join(f"'{c}'" for c in _IGNORED)}
+
+_APPEND_ONLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION audit_log_append_only() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'audit_log ist append-only';
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _month_start(d: date, offset: int = 0) -> date:
+    m = d.year * 12 + d.month - 1 + offset
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def _create_partition(conn: Connection, von: date, bis: date) -> None:
+    name = f"audit_log_{von:%Y_%m}"
+    if conn.exec_driver_sql(f"SELECT to_regclass('{name}')").scalar() is not None:
+        return
+
+    bereich = f"zeit >= '{von}' AND zeit < '{bis}'"
+    create = f"CREATE TABLE {name} PARTITION OF audit_log FOR VALUES FROM ('{von}') TO ('{bis}')"
+    if not conn.exec_driver_sql(f"SELECT EXISTS (SELECT 1 FROM audit_log_default WHERE {bereich})").scalar():
+        conn.exec_driver_sql(create)
+        return
+
+    # Job kam zu spät, der Monat liegt schon in DEFAULT → sonst schlägt CREATE
+    # fehl. DEFAULT abhängen (die geklonten Append-only-Trigger fallen dabei
+    # weg), Zeilen umziehen und wieder anhängen – alles in dieser Transaktion.
+    conn.exec_driver_sql("ALTER TABLE audit_log DETACH PARTITION audit_log_default")
+    conn.exec_driver_sql(create)
+    conn.exec_driver_sql(f"INSERT INTO {name} SELECT * FROM audit_log_default WHERE {bereich}")
+    conn.exec_driver_sql(f"DELETE FROM audit_log_default WHERE {bereich}")
+    conn.exec_driver_sql("ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT")
+
+
+def ensure_partitions(conn: Connection, heute: date | None = None, ab: date | None = None) -> None:
+    """
+    Monatspartitionen vom aktuellen (bzw. von `ab`, z.B. beim Restore
+    älterer Daten) bis PARTITIONS_AHEAD Monate voraus. Läuft unter dem
+    Migrations-Lock, da jeder Worker den Tagesjob startet.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": MIGRATION_LOCK_KEY})
+    heute = heute or date.today()
+    start = _month_start(min(ab, heute) if ab else heute)
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT"
+    )
+    von = start
+    while von <= _month_start(heute, PARTITIONS_AHEAD):
+        bis = _month_start(von, 1)
+        _create_partition(conn, von, bis)
+        von = bis
+
+
+def install_audit(conn: Connection) -> None:
+    conn.exec_driver_sql(_AUDIT_FUNCTION)
+    conn.exec_driver_sql(_APPEND_ONLY_FUNCTION)
+
+    for table, fields in AUDIT_TABLES.items():
+        args = ", ".join(f"'{f}'" for f in fields)
+        conn.exec_driver_sql(
+            f"CREATE OR REPLACE TRIGGER trg_{table}_audit "
+            f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION audit_row({args})"
+        )
+
+    conn.exec_driver_sql(
+        "CREATE OR REPLACE TRIGGER trg_audit_log_append_only "
+        "BEFORE UPDATE OR DELETE ON audit_log "
+        "FOR EACH ROW EXECUTE FUNCTION audit_log_append_only()"
+    )
+    conn.exec_driver_sql(
+        "CREATE OR REPLACE TRIGGER trg_audit_log_no_truncate "
+        "BEFORE TRUNCATE ON audit_log "
+        "FOR EACH STATEMENT EXECUTE FUNCTION audit_log_append_only()"
+    )
+    ensure_partitions(conn)
+
+
+def ensure_audit_partitions(db: Session) -> None:
+    """
+    Tagesjob: Partitionen für die kommenden Monate anlegen.
+    """
+    ensure_partitions(db.connection())
+    db.commit()
+
+
+def query_audit(
+    db: Session,
+    tabelle: str | None = None,
+    row_id: int | None = None,
+    von: datetime | None = None,
+    bis: datetime | None = None,
+    limit: int = 200,
+) -> list[models.AuditLog]:
+    q = db.query(models.AuditLog)
+    if tabelle is not None:
+        q = q.filter(models.AuditLog.tabelle == tabelle)
+    if row_id is not None:
+        q = q.filter(models.AuditLog.row_id == row_id)
+    if von is not None:
+        q = q.filter(models.AuditLog.zeit >= von)
+    if bis is not None:
+        q = q.filter(models.AuditLog.zeit < bis)
+    return q.order_by(models.AuditLog.zeit.desc(), models.AuditLog.id.desc()).limit(limit).all()
@@ -0,0 +1,270 @@
+# backend/balances.py
+"""
+Ferien- und Überstundensalden.
+
+Pro Mitarbeiter und Tag führt balance_days die gebuchten Stunden, dazu
+balance_totals die laufende Summe ab Stichtag. Ein Trigger auf time_entries
+bucht bei jedem INSERT/UPDATE/DELETE nur die Differenz (alter Beitrag raus,
+neuer rein) in beide – auch für Set-basierte Änderungen (Krank-Job, Sync,
+Übermitteln). Ein Saldo per heute ist damit ein Zeilenzugriff; nur für ein
+Datum in der Vergangenheit werden die Tageszeilen danach abgezogen. Die
+Werktage zwischen Stichtag und Datum werden geschlossen berechnet
+(werktage() aus payroll.py: volle Wochen × 5 + Rest), nicht Tag für Tag gezählt.
+
+Pause und Ferien werden über activities.schluessel erkannt (Umbenennen
+ändert nichts), per Name nur bei Einträgen ohne activity_id.
+
+Regeln (wie Lohnlauf):
+- Ist        = Stunden ohne Pause (Ferien und Krank zählen als Ist)
+- Soll       = stunden_pro_woche × pensum/100 / 5 × Werktage (Mo–Fr)
+- Überstunden = Vortrag + Ist − Soll
+- Ferien     = Vortrag + Anspruch pro rata (Tage/Jahr × Soll/Tag × Kalendertage/365)
+               − bezogene Ferien-Stunden
+Vortrag = ueberstunden_guthaben / ferien_guthaben_stunden per saldo_stichtag
+(leer = Eintrittsdatum).
+"""
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from activities import FERIEN_SCHLUESSEL, FERIEN_TAETIGKEIT, PAUSE_SCHLUESSEL, PAUSE_TAETIGKEIT
+
+# Schlüssel der Tätigkeit; Name nur als Rückfall für Einträge ohne activity_id
+_ART_FUNCTION = """
+CREATE OR REPLACE FUNCTION balance_art(aktivitaet integer, taetigkeit varchar) RETURNS varchar AS $$
+    SELECT CASE
+        WHEN aktivitaet IS NOT NULL THEN (SELECT a.schluessel FROM activities a WHERE a.id = aktivitaet)
+        WHEN taetigkeit = '{pause}' THEN '{pause_key}'
+        WHEN taetigkeit = '{ferien}' THEN '{ferien_key}'
+    END
+$$ LANGUAGE sql STABLE
+""".format(
+    pause=PAUSE_TAETIGKEIT, pause_key=PAUSE_SCHLUESSEL,
+    ferien=FERIEN_TAETIGKEIT, ferien_key=FERIEN_SCHLUESSEL,
+)
+
+# Vorgänger, der Pause/Ferien am Namen erkannte
+_OLD_POST_FUNCTION = "balance_post(integer, date, integer, double precision, varchar, boolean)"
+
+_POST_FUNCTION = """
+CREATE OR REPLACE FUNCTION balance_post(
+    emp integer, tag date, vorzeichen integer,
+    stunden double precision, aktivitaet integer, taetigkeit varchar, uebermittelt boolean
+) RETURNS void AS $$
+DECLARE
+    art varchar := balance_art(aktivitaet, taetigkeit);
+BEGIN
+    IF emp IS NULL OR tag IS NULL OR stunden IS NULL OR art IS NOT DISTINCT FROM '{pause}' THEN
+        RETURN;
+    END IF;
+    INSERT INTO balance_days AS b (employee_id, datum, ist_stunden, uebermittelt_stunden, ferien_stunden)
+    VALUES (
+        emp, tag,
+        vorzeichen * stunden,
+        CASE WHEN uebermittelt THEN vorzeichen * stunden ELSE 0 END,
+        CASE WHEN art = '{ferien}' THEN vorzeichen * stunden ELSE 0 END
+    )
+    ON CONFLICT (employee_id, datum) DO UPDATE SET
+        ist_stunden = b.ist_stunden + EXCLUDED.ist_stunden,
+        uebermittelt_stunden = b.uebermittelt_stunden + EXCLUDED.uebermittelt_stunden,
+        ferien_stunden = b.ferien_stunden + EXCLUDED.ferien_stunden;
+
+    UPDATE balance_totals t SET
+        ist_stunden = t.ist_stunden + vorzeichen * stunden,
+        uebermittelt_stunden = t.uebermittelt_stunden
+            + CASE WHEN uebermittelt THEN vorzeichen * stunden ELSE 0 END,
+        ferien_stunden = t.ferien_stunden
+            + CASE WHEN art = '{ferien}' THEN vorzeichen * stunden ELSE 0 END
+    WHERE t.employee_id = emp AND (t.ab IS NULL OR tag >= t.ab);
+END
+$$ LANGUAGE plpgsql
+""".format(pause=PAUSE_SCHLUESSEL, ferien=FERIEN_SCHLUESSEL)
+
+# Summe ab Stichtag neu aufbauen – nur wenn sich der Stichtag ändert
+_REBUILD_FUNCTION = """
+CREATE OR REPLACE FUNCTION balance_rebuild_total(emp integer) RETURNS void AS $$
+    INSERT INTO balance_totals AS t (employee_id, ab, ist_stunden, uebermittelt_stunden, ferien_stunden)
+    SELECT
+        e.id,
+        COALESCE(e.saldo_stichtag, e.eintrittsdatum),
+        COALESCE(SUM(b.ist_stunden), 0),
+        COALESCE(SUM(b.uebermittelt_stunden), 0),
+        COALESCE(SUM(b.ferien_stunden), 0)
+    FROM employees e
+    LEFT JOIN balance_days b
+        ON b.employee_id = e.id
+       AND b.datum >= COALESCE(e.saldo_stichtag, e.eintrittsdatum, b.datum)
+    WHERE e.id = emp
+    GROUP BY e.id
+    ON CONFLICT (employee_id) DO UPDATE SET
+        ab = EXCLUDED.ab,
+        ist_stunden = EXCLUDED.ist_stunden,
+        uebermittelt_stunden = EXCLUDED.uebermittelt_stunden,
+        ferien_stunden = EXCLUDED.ferien_stunden
+$$ LANGUAGE sql
+"""
+
+_EMPLOYEE_FUNCTION = """
+CREATE OR REPLACE FUNCTION balance_employee() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT'
+       OR (OLD.saldo_stichtag, OLD.eintrittsdatum) IS DISTINCT FROM (NEW.saldo_stichtag, NEW.eintrittsdatum) THEN
+        PERFORM balance_rebuild_total(NEW.id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION balance_time_entry() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM balance_post(OLD.employee_id, OLD.datum, -1, OLD.dauer_stunden,
+                             OLD.activity_id, OLD.taetigkeit, OLD.uebermittelt);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM balance_post(NEW.employee_id, NEW.datum, 1, NEW.dauer_stunden,
+                             NEW.activity_id, NEW.taetigkeit, NEW.uebermittelt);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# UPDATE nur, wenn sich etwas Saldo-Relevantes ändert (z.B. nicht bei Details;
+# der Text zählt nur ohne activity_id)
+_TRIGGER = """
+CREATE OR REPLACE TRIGGER trg_time_entries_balance_upd
+AFTER UPDATE ON time_entries
+FOR EACH ROW
+WHEN ((OLD.employee_id, OLD.datum, OLD.dauer_stunden, OLD.activity_id,
+       CASE WHEN OLD.activity_id IS NULL THEN OLD.taetigkeit END, OLD.uebermittelt)
+      IS DISTINCT FROM
+      (NEW.employee_id, NEW.datum, NEW.dauer_stunden, NEW.activity_id,
+       CASE WHEN NEW.activity_id IS NULL THEN NEW.taetigkeit END, NEW.uebermittelt))
+EXECUTE FUNCTION balance_time_entry()
+"""
+
+_BACKFILL = """
+INSERT INTO balance_days (employee_id, datum, ist_stunden, uebermittelt_stunden, ferien_stunden)
+SELECT
+    employee_id,
+    datum,
+    SUM(dauer_stunden),
+    SUM(CASE WHEN uebermittelt THEN dauer_stunden ELSE 0 END),
+    SUM(CASE WHEN art = :ferien THEN dauer_stunden ELSE 0 END)
+FROM (
+    SELECT t.*, balance_art(t.activity_id, t.taetigkeit) AS art FROM time_entries t
+) t
+WHERE employee_id IS NOT NULL
+  AND datum IS NOT NULL
+  AND dauer_stunden IS NOT NULL
+  AND art IS DISTINCT FROM :pause
+GROUP BY employee_id, datum
+"""
+
+_BALANCE_SQL = text("""
+WITH emp AS (
+    SELECT
+        e.id AS employee_id,
+        e.name,
+        COALESCE(e.stunden_pro_woche, 42) * COALESCE(e.pensum, 100) / 100.0 / 5.0 AS soll_tag,
+        COALESCE(t.ab,
+                 (SELECT min(b.datum) FROM balance_days b WHERE b.employee_id = e.id),
+                 :datum) AS ab,
+        LEAST(:datum, COALESCE(e.austrittsdatum, :datum)) AS bis,
+        COALESCE(e.ferien_guthaben_stunden, 0) AS ferien_vortrag,
+        COALESCE(e.ueberstunden_guthaben, 0) AS ueberstunden_vortrag,
+        COALESCE(e.ferienanspruch, 0) AS ferienanspruch,
+        COALESCE(t.ist_stunden, 0) AS total_ist,
+        COALESCE(t.uebermittelt_stunden, 0) AS total_uebermittelt,
+        COALESCE(t.ferien_stunden, 0) AS total_ferien
+    FROM employees e
+    LEFT JOIN balance_totals t ON t.employee_id = e.id
+    WHERE (CAST(:employee_id AS integer) IS NULL AND e.aktiv IS TRUE)
+       OR e.id = :employee_id
+),
+summen AS (
+    -- laufende Summe minus die Tage nach dem Stichdatum (per heute: keine);
+    -- nur Tage ab Stichtag, nur die stecken in balance_totals
+    SELECT
+        emp.*,
+        total_ist - COALESCE(n.ist, 0) AS ist,
+        total_uebermittelt - COALESCE(n.uebermittelt, 0) AS uebermittelt,
+        total_ferien - COALESCE(n.ferien, 0) AS ferien_bezogen,
+        COALESCE(werktage(emp.ab, emp.bis), 0) AS werktage,
+        GREATEST(emp.bis - emp.ab + 1, 0) AS kalendertage
+    FROM emp
+    LEFT JOIN LATERAL (
+        SELECT SUM(ist_stunden) AS ist, SUM(uebermittelt_stunden) AS uebermittelt,
+               SUM(ferien_stunden) AS ferien
+        FROM balance_days b
+        WHERE b.employee_id = emp.employee_id AND b.datum > emp.bis AND b.datum >= emp.ab
+    ) n ON TRUE
+)
+SELECT
+    employee_id,
+    name,
+    ab AS stichtag,
+    CAST(:datum AS date) AS datum,
+    ROUND(ist::numeric, 2)::double precision AS stunden_ist,
+    ROUND(uebermittelt::numeric, 2)::double precision AS stunden_uebermittelt,
+    ROUND((werktage * soll_tag)::numeric, 2)::double precision AS stunden_soll,
+    ROUND((ueberstunden_vortrag + ist - werktage * soll_tag)::numeric, 2)::double precision
+        AS ueberstunden_saldo,
+    ROUND((ferienanspruch * soll_tag * kalendertage / 365.0)::numeric, 2)::double precision
+        AS ferien_anspruch,
+    ROUND(ferien_bezogen::numeric, 2)::double precision AS ferien_bezogen,
+    ROUND((ferien_vortrag + ferienanspruch * soll_tag * kalendertage / 365.0
+           - ferien_bezogen)::numeric, 2)::double precision AS ferien_saldo
+FROM summen
+ORDER BY employee_id
+""")
+
+
+def install_balances(conn: Connection) -> None:
+    """
+    Trigger anlegen und – nur beim ersten Mal bzw. nach dem Wechsel von
+    Namen auf Schlüssel – balance_days aus der Zeiterfassung und
+    balance_totals aus balance_days aufbauen.
+    """
+    conn.exec_driver_sql(_ART_FUNCTION)
+    conn.exec_driver_sql(_POST_FUNCTION)
+    conn.exec_driver_sql(_REBUILD_FUNCTION)
+    conn.exec_driver_sql(_EMPLOYEE_FUNCTION)
+    conn.exec_driver_sql(_TRIGGER_FUNCTION)
+    conn.exec_driver_sql(
+        "CREATE OR REPLACE TRIGGER trg_time_entries_balance "
+        "AFTER INSERT OR DELETE ON time_entries "
+        "FOR EACH ROW EXECUTE FUNCTION balance_time_entry()"
+    )
+    conn.exec_driver_sql(_TRIGGER)
+
+    conn.exec_driver_sql(
+        "CREATE OR REPLACE TRIGGER trg_employees_balance "
+        "AFTER INSERT OR UPDATE OF saldo_stichtag, eintrittsdatum ON employees "
+        "FOR EACH ROW EXECUTE FUNCTION balance_employee()"
+    )
+
+    # Bisher per Name gebucht → einmal neu aufbauen (umbenannte Ferien o.ä.)
+    if conn.exec_driver_sql(f"SELECT to_regprocedure('{_OLD_POST_FUNCTION}')").scalar() is not None:
+        conn.exec_driver_sql(f"DROP FUNCTION {_OLD_POST_FUNCTION}")
+        conn.exec_driver_sql("DELETE FROM balance_days")
+        conn.exec_driver_sql("DELETE FROM balance_totals")
+
+    if not conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM balance_days)").scalar():
+        conn.execute(text(_BACKFILL), {"ferien": FERIEN_SCHLUESSEL, "pause": PAUSE_SCHLUESSEL})
+    if not conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM balance_totals)").scalar():
+        conn.exec_driver_sql("SELECT balance_rebuild_total(id) FROM employees")
+
+
+def balances_as_of(db: Session, datum: date | None = None, employee_id: int | None = None) -> list[dict]:
+    """
+    Salden per `datum` (inkl.) für einen Mitarbeiter oder alle aktiven.
+    """
+    datum = datum or date.today()
+    rows = db.execute(_BALANCE_SQL, {"datum": datum, "employee_id": employee_id}).mappings().all()
+    return [dict(r) for r in rows]
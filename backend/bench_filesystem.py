@@ -0,0 +1,52 @@
+# backend/bench_filesystem.py
+"""
+Zeitvergleich Projektordner anlegen: bisherige Schleife (ein mkdir(parents=True)
+pro Template-Eintrag) gegen den Anlege-Plan mit Thread-Pool.
+
+Aufruf (am besten direkt auf dem Netzlaufwerk):
+    python bench_filesystem.py /srv/stech/projects/_bench 20
+"""
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from filesystem import FOLDER_TEMPLATE, provision_folders
+
+
+def legacy_loop(project_root: Path) -> None:
+    for rel in FOLDER_TEMPLATE:
+        (project_root / rel).mkdir(parents=True, exist_ok=True)
+
+
+def bench(fn, base: Path, runs: int) -> float:
+    times = []
+    for i in range(runs):
+        root = base / f"{fn.__name__}_{i}"
+        root.mkdir(parents=True)
+        t0 = time.perf_counter()
+        fn(root)
+        times.append(time.perf_counter() - t0)
+        shutil.rmtree(root)
+    return sum(times) / len(times)
+
+
+def main() -> None:
+    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(tempfile.mkdtemp())
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    base.mkdir(parents=True, exist_ok=True)
+
+    def plan_pool(root: Path) -> None:
+        provision_folders(root, FOLDER_TEMPLATE)
+
+    old = bench(legacy_loop, base, runs)
+    new = bench(plan_pool, base, runs)
+    print(f"Ziel: {base}  Läufe: {runs}")
+    print(f"bisherige Schleife : {old * 1000:8.2f} ms")
+    print(f"Plan + Thread-Pool : {new * 1000:8.2f} ms")
+    print(f"Faktor             : {old / new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# backend/bench_load.py
+"""
+Lasttest Zeiteinträge: startet das Backend nacheinander mit 1, 2 und 4
+gunicorn-Workern und misst Durchsatz und Latenz auf den Zeit-Endpoints.
+
+Aufruf (im Backend-Container, DATABASE_URL gesetzt):
+    python bench_load.py [dauer_s] [clients] [worker,...]
+    python bench_load.py 20 32 1,2,4
+
+Gemessen wird nur lesend (Liste + laufender Eintrag), die DB bleibt unverändert.
+Der Lastgenerator läuft selbst in Python-Threads auf demselben Rechner und
+belegt dabei CPU – die Faktoren sind daher eher eine Untergrenze.
+"""
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("BENCH_PORT", "8100"))
+
+
+def _get(conn: http.client.HTTPConnection, path: str) -> int:
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    resp.read()
+    return resp.status
+
+
+def _wait_ready(timeout: float = 60) -> None:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            conn = http.client.HTTPConnection(HOST, PORT, timeout=2)
+            if _get(conn, "/health/ready") == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Backend wurde nicht bereit")
+
+
+def _pick_employee() -> int:
+    conn = http.client.HTTPConnection(HOST, PORT, timeout=5)
+    conn.request("GET", "/employees/")
+    data = json.loads(conn.getresponse().read() or b"[]")
+    return data[0]["id"] if data else 1
+
+
+def _client(paths: list[str], stop_at: float, latencies: list, errors: list) -> None:
+    conn = http.client.HTTPConnection(HOST, PORT, timeout=30)
+    i = 0
+    while time.monotonic() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            status = _get(conn, path)
+        except OSError:
+            errors.append(path)
+            conn = http.client.HTTPConnection(HOST, PORT, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+        if status != 200:
+            errors.append(path)
+
+
+def run(workers: int, dauer: float, clients: int) -> dict:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{PORT}"}
+    proc = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready()
+        # "ready" meldet der erste Worker – den übrigen kurz Zeit zum Starten geben
+        time.sleep(1 + workers * 0.5)
+        emp = _pick_employee()
+        paths = [
+            f"/timeentries/?employee_id={emp}",
+            f"/timeentries/running?employee_id={emp}",
+            "/timeentries/?from=2000-01-01",
+        ]
+        latencies: list[float] = []
+        errors: list[str] = []
+        stop_at = time.monotonic() + dauer
+        threads = [
+            threading.Thread(target=_client, args=(paths, stop_at, latencies, errors))
+            for _ in range(clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "rps": len(latencies) / dauer,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        "fehler": len(errors),
+    }
+
+
+def main() -> None:
+    dauer = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    worker_list = [int(w) for w in sys.argv[3].split(",")] if len(sys.argv) > 3 else [1, 2, 4]
+
+    print(f"Dauer {dauer:.0f}s, {clients} Clients, Port {PORT}")
+    print(f"{'Worker':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'Fehler':>7} {'Faktor':>7}")
+    basis = None
+    for w in worker_list:
+        r = run(w, dauer, clients)
+        basis = basis or r["rps"]
+        print(f"{r['workers']:>6} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['fehler']:>7} {r['rps'] / basis if basis else 0:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# backend/billing.py
+"""
+Stundensätze: Der effektive Satz eines Zeiteintrags ist Project.stundensatz,
+sonst Customer.stundensatz_standard. Er wird beim Schreiben als Snapshot auf
+den Eintrag gelegt; den Betrag berechnet PostgreSQL (generierte Spalte).
+"""
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+
+
+def effective_rate(
+    db: Session,
+    project_id: int | None,
+    customer_id: int | None,
+) -> float | None:
+    if project_id is not None:
+        proj = db.get(models.Project, project_id)
+        if proj is not None:
+            if proj.stundensatz is not None:
+                return proj.stundensatz
+            # Projekt ohne eigenen Satz → Kunde des Projekts
+            customer_id = proj.customer_id
+    if customer_id is not None:
+        cust = db.get(models.Customer, customer_id)
+        if cust is not None:
+            return cust.stundensatz_standard
+    return None
+
+
+def apply_rate(db: Session, entry: models.TimeEntry) -> None:
+    entry.stundensatz = effective_rate(db, entry.project_id, entry.customer_id)
+
+
+# Ein UPDATE für alle betroffenen Einträge; der Betrag folgt über die generierte Spalte
+_RERATE_SQL = text("""
+UPDATE time_entries t
+SET stundensatz = COALESCE(p.stundensatz, c.stundensatz_standard)
+FROM projects p
+LEFT JOIN customers c ON c.id = p.customer_id
+WHERE t.project_id = p.id
+  AND p.id = :project_id
+  AND (:inkl_uebermittelt OR t.uebermittelt IS FALSE)
+  AND (CAST(:ab AS date) IS NULL OR t.datum >= :ab)
+  AND t.stundensatz IS DISTINCT FROM COALESCE(p.stundensatz, c.stundensatz_standard)
+""")
+
+
+def rerate_project(
+    db: Session,
+    project_id: int,
+    ab: date | None = None,
+    inkl_uebermittelt: bool = False,
+) -> int:
+    """
+    Neubewertung aller Einträge eines Projekts mit dem aktuellen Satz.
+    Gibt die Anzahl geänderter Einträge zurück (ohne Commit).
+    """
+    result = db.execute(
+        _RERATE_SQL,
+        {"project_id": project_id, "ab": ab, "inkl_uebermittelt": inkl_uebermittelt},
+    )
+    return result.rowcount
@@ -0,0 +1,140 @@
+# backend/changes.py
+"""
+Change-Feed: liefert alle seit einem Token eingefügten, geänderten oder
+gelöschten Kunden, Projekte und Zeiteinträge.
+
+Jede Zeile trägt per Trigger (siehe migrations.py) die Transaktions-ID
+(change_xid) und eine globale Sequenz (change_seq). Geliefert werden nur
+Zeilen aus Transaktionen, die älter als die älteste noch laufende sind
+(change_xid < xmin) – die sind abgeschlossen und ändern sich nicht mehr.
+
+Sortiert und geblättert wird nach (change_xid, change_seq), nicht nach der
+Sequenz allein: eine Transaktion mit kleinerer xid kann vor einer noch
+offenen eine grössere Sequenz ziehen und committen. Jede später sichtbare
+Zeile hat dagegen eine xid >= dem heutigen xmin, liegt also sicher hinter
+dem Token. Das Token ist "<xid>.<seq>"; "0" liefert alles. Nach einem
+Snapshot-Import (neuer Cluster, neue xids) beginnen Clients wieder bei 0.
+
+Stillstand: Eine SCHREIBENDE Transaktion, die offen bleibt (z.B. "idle in
+transaction"), hält xmin fest – bis sie endet, liefert der Feed nichts
+Neueres, für alle Clients. Lesende Transaktionen (Exporte, Snapshot) haben
+keine xid und halten ihn nicht an. Begrenzt durch DB_IDLE_TX_TIMEOUT (db.py).
+
+Grabsteine (deleted_rows) löscht der Tagesjob nach TOMBSTONE_RETENTION_DAYS.
+Die Position des jüngsten gelöschten steht in change_feed_horizon; ein
+älteres Token bekommt TokenVeraltet (→ 410, Client lädt mit since=0 neu).
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import cast, literal, text, tuple_
+from sqlalchemy.orm import Session
+
+import models
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "90"))
+
+_PRUNE_SQL = text("""
+WITH weg AS (
+    DELETE FROM deleted_rows WHERE geloescht_am < :grenze
+    RETURNING change_xid, change_seq
+), juengster AS (
+    SELECT change_xid, change_seq FROM weg
+    WHERE change_xid IS NOT NULL
+    ORDER BY change_xid DESC, change_seq DESC
+    LIMIT 1
+)
+INSERT INTO change_feed_horizon AS h (id, change_xid, change_seq, bereinigt_am)
+SELECT 1, change_xid, change_seq, now() AT TIME ZONE 'utc' FROM juengster
+ON CONFLICT (id) DO UPDATE SET
+    change_xid = EXCLUDED.change_xid,
+    change_seq = EXCLUDED.change_seq,
+    bereinigt_am = EXCLUDED.bereinigt_am
+WHERE (h.change_xid, h.change_seq) < (EXCLUDED.change_xid, EXCLUDED.change_seq)
+""")
+
+
+class TokenVeraltet(Exception):
+    """Token liegt vor gelöschten Grabsteinen – Feed muss neu geladen werden."""
+
+_FEED_MODELS = {
+    "customers": models.Customer,
+    "projects": models.Project,
+    "timeentries": models.TimeEntry,
+    "deleted": models.DeletedRow,
+}
+
+
+def parse_token(token: str) -> tuple[int, int]:
+    """
+    "<xid>.<seq>" → (xid, seq). Eine blosse Zahl (Token vor der Umstellung
+    auf xid-Ordnung) startet den Feed neu.
+    """
+    xid, sep, seq = token.partition(".")
+    if not sep:
+        int(token)  # ValueError bei Unsinn
+        return 0, 0
+    return int(xid), int(seq)
+
+
+def format_token(xid: int, seq: int) -> str:
+    return f"{xid}.{seq}"
+
+
+def prune_tombstones(db: Session) -> None:
+    """
+    Tagesjob: Grabsteine älter als TOMBSTONE_RETENTION_DAYS löschen und den
+    Horizont nachziehen.
+    """
+    grenze = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    db.execute(_PRUNE_SQL, {"grenze": grenze})
+    db.commit()
+
+
+def _check_horizon(db: Session, xid: int, seq: int) -> None:
+    if (xid, seq) == (0, 0):
+        return  # Volles Laden braucht keine Grabsteine
+    h = db.get(models.ChangeFeedHorizon, 1)
+    if h is not None and (xid, seq) < (int(h.change_xid), h.change_seq):
+        raise TokenVeraltet()
+
+
+def _committed(table: str):
+    return text(f"{table}.change_xid < pg_snapshot_xmin(pg_current_snapshot())")
+
+
+def get_changes(db: Session, since: str, limit: int = DEFAULT_LIMIT) -> dict:
+    """
+    Jede Tabelle liefert höchstens `limit` Zeilen (indexiert über
+    (change_xid, change_seq)). Danach werden die ersten `limit` Zeilen über
+    alle Tabellen genommen – so ist garantiert, dass alle Änderungen bis zum
+    neuen Token enthalten sind.
+    """
+    xid, seq = parse_token(since)
+    _check_horizon(db, xid, seq)
+    pos = tuple_(cast(literal(str(xid)), models.Xid8), literal(seq))
+
+    candidates = []
+    for key, model in _FEED_MODELS.items():
+        rows = (
+            db.query(model)
+            .filter(tuple_(model.change_xid, model.change_seq) > pos, _committed(model.__tablename__))
+            .order_by(model.change_xid.asc(), model.change_seq.asc())
+            .limit(limit + 1)
+            .all()
+        )
+        candidates.extend(((int(r.change_xid), r.change_seq), key, r) for r in rows)
+
+    candidates.sort(key=lambda c: c[0])
+    mehr = len(candidates) > limit
+    taken = candidates[:limit]
+
+    result = {key: [] for key in _FEED_MODELS}
+    for _, key, row in taken:
+        result[key].append(row)
+
+    result["token"] = format_token(*taken[-1][0]) if taken else since
+    result["mehr"] = mehr
+    return result
@@ -0,0 +1,83 @@
+# backend/check_archive.py
+"""
+Rundlauf Archivieren → Wiederherstellen an einem Testbaum mit allem, was in
+Projektordnern vorkommt: Dateien, leere Ordner, Hardlink, relativer,
+absoluter und nach aussen zeigender Symlink. Nach dem Restore muss der Baum
+dem Original entsprechen (Inhalt per SHA-256, Links per Ziel).
+
+Aufruf (Basisordner wie BASE_DIR, Standard ein Temp-Ordner):
+    python check_archive.py [/srv/stech/projects/_check]
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import archive
+import filesystem
+
+
+def build_tree(root: Path) -> None:
+    (root / "01_Projekt" / "leer").mkdir(parents=True)
+    (root / "02_CAD").mkdir()
+    (root / "01_Projekt" / "notiz.txt").write_text("Notiz\n", encoding="utf-8")
+    (root / "02_CAD" / "teil.step").write_bytes(os.urandom(256 * 1024))
+    os.link(root / "01_Projekt" / "notiz.txt", root / "02_CAD" / "notiz_hardlink.txt")
+    os.symlink("../01_Projekt/notiz.txt", root / "02_CAD" / "relativ")
+    os.symlink("/etc/hostname", root / "02_CAD" / "absolut")
+    os.symlink("../../ausserhalb", root / "02_CAD" / "nach_aussen")
+    os.symlink("01_Projekt", root / "ordner_link")
+
+
+def snapshot(root: Path) -> dict[str, tuple]:
+    state = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            full = Path(dirpath) / name
+            rel = full.relative_to(root).as_posix()
+            if full.is_symlink():
+                state[rel] = ("link", os.readlink(full))
+            elif full.is_dir():
+                state[rel] = ("dir",)
+            else:
+                state[rel] = ("file", hashlib.sha256(full.read_bytes()).hexdigest())
+    return state
+
+
+def main() -> int:
+    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(tempfile.mkdtemp())
+    base.mkdir(parents=True, exist_ok=True)
+    # Prüfung läuft unter dem angegebenen Basisordner statt BASE_DIR
+    filesystem.BASE_DIR = base
+    root = base / "2026" / "0001_Check"
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    try:
+        build_tree(root)
+        before = snapshot(root)
+
+        archiv_pfad = archive.archive_folder(str(root))
+        rest = [p.name for p in root.iterdir()]
+        print("archiviert:", archiv_pfad, "Rest:", rest)
+        if rest != [archive.ARCHIV_ORDNER]:
+            print("FEHLER: Baum wurde nicht ersetzt")
+            return 1
+
+        archive.restore_folder(str(root), archiv_pfad)
+        after = snapshot(root)
+        after.pop(archive.ARCHIV_ORDNER, None)
+        if before != after:
+            for rel in sorted(set(before) | set(after)):
+                if before.get(rel) != after.get(rel):
+                    print("FEHLER:", rel, before.get(rel), "→", after.get(rel))
+            return 1
+        print(f"ok: {len(before)} Einträge nach dem Restore identisch")
+        return 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# backend/check_routing.py
+"""
+Prüft das Lese-/Schreib-Routing gegen zwei laufende Postgres-Instanzen
+(docker-compose.replica.yml) oder einen Ersatz (DATABASE_REPLICA_URL auf eine
+zweite, unabhängige Instanz – dann nur Schritt 1 und 2).
+
+1. Statisch: welche Endpunkte welche Session bekommen; schreibende Methoden
+   dürfen nie auf dem Replikat landen.
+2. Verbindungen: Primär- und Lese-Session zeigen auf verschiedene Server,
+   das Replikat ist im Recovery-Modus.
+3. Read-your-writes: Wert auf dem Primär schreiben und sofort über
+   get_fresh_read_db mit dem Token des Schreibzugriffs (X-Write-LSN) lesen –
+   muss immer den neuen Wert liefern (Replikat, falls schon eingespielt,
+   sonst Primär).
+
+Läuft im Replikat-Setup automatisch einmal nach dem Start (Dienst
+routing_check in docker-compose.replica.yml), von Hand:
+    docker exec stech_backend python check_routing.py [durchlaeufe]
+"""
+import sys
+from types import SimpleNamespace
+
+from fastapi.routing import APIRoute
+from sqlalchemy import text
+
+from db import HAS_REPLICA, SessionLocal, ReadSessionLocal, engine, read_engine, write_lsn
+from main import app, get_db, get_fresh_read_db, get_read_db
+
+_DEPS = {get_db: "primär", get_read_db: "replikat", get_fresh_read_db: "replikat, falls aktuell"}
+_CHECK_TABLE = "routing_check"
+
+
+def check_routes() -> bool:
+    ok = True
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        used = [_DEPS[d.call] for d in route.dependant.dependencies if d.call in _DEPS]
+        if not used:
+            continue
+        methods = ",".join(sorted(route.methods))
+        schreibend = bool(route.methods - {"GET", "HEAD"})
+        falsch = schreibend and any(u != "primär" for u in used)
+        ok &= not falsch
+        print(f"{'FEHLER ' if falsch else ''}{methods:<7} {route.path:<42} → {', '.join(used)}")
+    return ok
+
+
+def _server(session) -> tuple:
+    return session.execute(
+        text("SELECT inet_server_addr(), inet_server_port(), pg_is_in_recovery()")
+    ).one()
+
+
+def check_connections() -> bool:
+    with SessionLocal() as primary, ReadSessionLocal() as replica:
+        p, r = _server(primary), _server(replica)
+    print(f"Primär:   {p[0]}:{p[1]} recovery={p[2]}")
+    print(f"Lesen:    {r[0]}:{r[1]} recovery={r[2]}")
+    if not HAS_REPLICA:
+        print("Kein DATABASE_REPLICA_URL gesetzt → alle Sessions auf dem Primär.")
+        return tuple(p) == tuple(r)
+    if tuple(p[:2]) == tuple(r[:2]):
+        print("FEHLER: Lese-Session zeigt auf den Primär.")
+        return False
+    if not r[2]:
+        print("Hinweis: Lese-Instanz ist kein Standby (Ersatz-Setup) – Read-your-writes wird übersprungen.")
+    return True
+
+
+def check_read_your_writes(durchlaeufe: int) -> bool:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {_CHECK_TABLE} (id integer PRIMARY KEY, wert bigint)"
+        )
+        conn.exec_driver_sql(
+            f"INSERT INTO {_CHECK_TABLE} VALUES (1, 0) ON CONFLICT (id) DO UPDATE SET wert = 0"
+        )
+
+    treffer = {"replikat": 0, "primär": 0}
+    fehler = 0
+    try:
+        for i in range(1, durchlaeufe + 1):
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"UPDATE {_CHECK_TABLE} SET wert = {i} WHERE id = 1")
+            # wie die Middleware nach einem POST/PUT: Token für den Client
+            request = SimpleNamespace(headers={"X-Write-LSN": write_lsn()})
+
+            gen = get_fresh_read_db(request)
+            session = next(gen)
+            try:
+                wert = session.execute(text(f"SELECT wert FROM {_CHECK_TABLE} WHERE id = 1")).scalar()
+                quelle = "replikat" if session.get_bind() is read_engine else "primär"
+            finally:
+                gen.close()
+
+            treffer[quelle] += 1
+            if wert != i:
+                fehler += 1
+                print(f"FEHLER: Durchlauf {i} las {wert} von {quelle}")
+    finally:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {_CHECK_TABLE}")
+
+    print(f"Read-your-writes: {durchlaeufe} Durchläufe, vom Replikat {treffer['replikat']}, "
+          f"Ausweichen auf Primär {treffer['primär']}, veraltete Werte {fehler}")
+    return fehler == 0
+
+
+def main() -> None:
+    durchlaeufe = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print("== Endpunkte ==")
+    ok = check_routes()
+    print("\n== Verbindungen ==")
+    ok &= check_connections()
+
+    with ReadSessionLocal() as replica:
+        standby = HAS_REPLICA and replica.execute(text("SELECT pg_is_in_recovery()")).scalar()
+    if standby:
+        print("\n== Read-your-writes ==")
+        ok &= check_read_your_writes(durchlaeufe)
+
+    print("\nOK" if ok else "\nFEHLER")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,88 @@
+from datetime import date, datetime, time, timedelta
+
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from models import TimeEntry
 
+
+def entry_timestamps(datum: date, start: time, ende: time) -> tuple[datetime, datetime]:
+    """
+    Gleiche Logik wie die generierten Spalten start_ts/ende_ts:
+    Ende vor Start → Ende am Folgetag.
+    """
+    start_ts = datetime.combine(datum, start)
+    ende_ts = datetime.combine(datum, ende)
+    if ende < start:
+        ende_ts += timedelta(days=1)
+    return start_ts, ende_ts
+
+
+def timeentry_filters(
+    employee_id: int | None = None,
+    customer_id: int | None = None,
+    project_id: int | None = None,
+    from_: date | None = None,
+    to: date | None = None,
+) -> list:
+    """
+    Gemeinsame Filter für Listen- und Export-Endpunkte.
+    """
+    conds = []
+    if employee_id:
+        conds.append(TimeEntry.employee_id == employee_id)
+    if customer_id:
+        conds.append(TimeEntry.customer_id == customer_id)
+    if project_id:
+        conds.append(TimeEntry.project_id == project_id)
+    if from_:
+        conds.append(TimeEntry.datum >= from_)
+    if to:
+        conds.append(TimeEntry.datum <= to)
+    return conds
+
+
+def get_running_entry(db: Session, employee_id: int) -> TimeEntry | None:
+    """
+    Offener Live-Stempel-Eintrag für diesen Mitarbeiter:
+    start gesetzt, ende NULL, uebermittelt = False.
+    """
+    return (
+        db.query(TimeEntry)
+        .filter(
+            TimeEntry.employee_id == employee_id,
+            TimeEntry.start.is_not(None),
+            TimeEntry.ende.is_(None),
+            TimeEntry.uebermittelt.is_(False),
+        )
+        .order_by(TimeEntry.datum.desc(), TimeEntry.start.desc())
+        .first()
+    )
+
+
 def check_no_overlap(
     db: Session,
     employee_id: int,
+    datum: date,
     start,
     ende,
     entry_id: int | None = None,
 ):
     """
     Prüft, ob es für diesen Mitarbeiter bereits einen Eintrag gibt,
-    der sich mit [start, ende] überschneidet.
+    der sich mit [start, ende] überschneidet (auch über Mitternacht).
     """
     if start is None or ende is None:
         return  # Wenn noch kein Ende gesetzt, ggf. später prüfen
 
+    start_ts, ende_ts = entry_timestamps(datum, start, ende)
+
     q = db.query(TimeEntry).filter(TimeEntry.employee_id == employee_id)
 
     if entry_id is not None:
         q = q.filter(TimeEntry.id != entry_id)
 
     # Overlap-Bedingung: (start < anderes_ende) und (ende > anderer_start)
-    q = q.filter(TimeEntry.start < ende, TimeEntry.ende > start)
+    q = q.filter(TimeEntry.start_ts < ende_ts, TimeEntry.ende_ts > start_ts)
 
     if db.query(q.exists()).scalar():
         raise HTTPException(
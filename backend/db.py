@@ -1,11 +1,138 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import os
+import re
+import threading
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional: Lesereplikat für Auswertungen (Jahresansichten, Exporte, Salden)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# Pool pro Prozess: Bei mehreren Workern (gunicorn.conf.py) teilen sich alle
+# Worker das Budget DB_POOL_BUDGET, damit max_connections von Postgres reicht:
+# (pool_size + max_overflow) × Worker <= Budget, Overflow inklusive.
+# Unter gunicorn setzt gunicorn.conf.py WEB_CONCURRENCY auf die tatsächlich
+# gestartete Worker-Zahl (auch bei -w N).
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_POOL_BUDGET = int(os.getenv("DB_POOL_BUDGET", "20"))
+_PER_WORKER = max(1, DB_POOL_BUDGET // WEB_CONCURRENCY)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(min(2, _PER_WORKER // 3))))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(max(1, _PER_WORKER - DB_MAX_OVERFLOW))))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+if (DB_POOL_SIZE + DB_MAX_OVERFLOW) * WEB_CONCURRENCY > DB_POOL_BUDGET:
+    raise ValueError(
+        f"DB-Pool zu gross: ({DB_POOL_SIZE} + {DB_MAX_OVERFLOW} Overflow) × {WEB_CONCURRENCY} "
+        f"Worker > DB_POOL_BUDGET {DB_POOL_BUDGET}"
+    )
+# Eigener Pool für das Replikat (eigenes max_connections), Standard wie Primär
+DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+# So lange gilt die zuletzt gelesene WAL-Position des Primärs pro Worker
+REPLICA_LSN_TTL = float(os.getenv("REPLICA_LSN_TTL", "1"))
+
+# Offene Transaktionen ohne Aktivität beenden (Sekunden, 0 = aus): eine
+# schreibende Transaktion, die offen liegen bleibt, hält den Change-Feed an
+DB_IDLE_TX_TIMEOUT = int(os.getenv("DB_IDLE_TX_TIMEOUT", "300"))
+
+# Advisory Lock für Schema-Änderungen (Migrationen, Audit-Partitionen)
+MIGRATION_LOCK_KEY = 280002
+
+# Lesende Transaktionen bekommen keine xid und halten den Feed nicht an –
+# lange, langsam abgeholte Exporte nehmen sich vom Timeout aus
+NO_IDLE_TX_TIMEOUT = "SET LOCAL idle_in_transaction_session_timeout = 0"
+
+
+def _create_engine(url: str, pool_size: int):
+    # pool_pre_ping: nach einem DB-Neustart keine toten Verbindungen aus dem Pool ausgeben
+    return create_engine(
+        url,
+        future=True,
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        connect_args={"options": f"-c idle_in_transaction_session_timeout={DB_IDLE_TX_TIMEOUT * 1000}"},
+    )
+
+
+engine = _create_engine(DATABASE_URL, DB_POOL_SIZE)
+# Ohne Replikat lesen alle Endpunkte vom Primär
+read_engine = _create_engine(DATABASE_REPLICA_URL, DB_REPLICA_POOL_SIZE) if DATABASE_REPLICA_URL else engine
+HAS_REPLICA = read_engine is not engine
 
-engine = create_engine(DATABASE_URL, future=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, future=True)
+
+
+_LSN_RE = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+# Zuletzt bekannte WAL-Position des Primärs (pro Worker-Prozess)
+_primary_lsn = {"wert": None, "zeit": 0.0}
+_primary_lsn_lock = threading.Lock()
+
+
+def _lsn_key(lsn: str) -> int:
+    hi, lo = lsn.split("/")
+    return (int(hi, 16) << 32) | int(lo, 16)
+
+
+def valid_lsn(lsn: str | None) -> bool:
+    return bool(lsn) and bool(_LSN_RE.match(lsn))
+
+
+def _remember_lsn(lsn: str) -> None:
+    with _primary_lsn_lock:
+        alt = _primary_lsn["wert"]
+        if alt is None or _lsn_key(lsn) >= _lsn_key(alt):
+            _primary_lsn["wert"] = lsn
+        _primary_lsn["zeit"] = time.monotonic()
+
+
+def write_lsn() -> str:
+    """
+    Aktuelle WAL-Position des Primärs nach einem Schreibzugriff – geht als
+    Token (X-Write-LSN) an den Client und in den Cache dieses Workers.
+    """
+    with engine.connect() as conn:
+        lsn = str(conn.execute(text("SELECT pg_current_wal_lsn()")).scalar())
+    _remember_lsn(lsn)
+    return lsn
+
+
+def primary_lsn() -> str:
+    """
+    WAL-Position des Primärs, höchstens REPLICA_LSN_TTL Sekunden alt – nicht
+    jeder Lesezugriff soll eine Primär-Verbindung belegen.
+    """
+    with _primary_lsn_lock:
+        lsn, zeit = _primary_lsn["wert"], _primary_lsn["zeit"]
+    if lsn is not None and time.monotonic() - zeit < REPLICA_LSN_TTL:
+        return lsn
+    return write_lsn()
+
+
+def replica_caught_up(replica: Session, token: str | None = None) -> bool:
+    """
+    Read-your-writes: True, wenn das Replikat alles bis zur Ziel-Position
+    eingespielt hat. Ziel ist das Token des Clients (WAL-Position nach seinem
+    letzten Schreibzugriff) – dann ohne Primär-Abfrage –, sonst die gecachte
+    Position des Primärs (höchstens REPLICA_LSN_TTL alt).
+    Replikat nicht erreichbar → False (Aufrufer weicht auf den Primär aus).
+    """
+    if not HAS_REPLICA:
+        return True
+    try:
+        lsn = token if valid_lsn(token) else primary_lsn()
+        # pg_last_wal_replay_lsn() ist NULL auf einer Instanz, die kein Standby ist
+        return bool(replica.execute(
+            text("SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), TRUE)"),
+            {"lsn": lsn},
+        ).scalar())
+    except OperationalError:
+        replica.rollback()
+        return False
+
 
 Base = declarative_base()
 
@@ -21,4 +148,4 @@ def get_db():
         finally:
             db.close()
 
-    return Depends(_get_db)
\ No newline at end of file
+    return Depends(_get_db)
\ No newline at end of file
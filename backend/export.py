@@ -0,0 +1,179 @@
+# backend/export.py
+"""
+CSV/XLSX-Export von Zeiteinträgen für die Buchhaltung.
+
+Die Zeilen kommen über einen serverseitigen Cursor (yield_per) aus der DB
+und werden blockweise geschrieben – auch ein Jahresexport aller Mitarbeiter
+liegt nie komplett im Speicher des Workers.
+"""
+import csv
+import io
+import tempfile
+import zlib
+from typing import Iterable, Iterator
+
+import xlsxwriter
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+import models
+from db import NO_IDLE_TX_TIMEOUT
+
+# Wie viele Zeilen pro Fetch vom Cursor geholt / pro Block geschrieben werden
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_HEADER = [
+    "ID",
+    "Datum",
+    "Start",
+    "Ende",
+    "Pause (min)",
+    "Dauer (h)",
+    "Mitarbeiter",
+    "Kunde",
+    "Projekt",
+    "Tätigkeit",
+    "Details",
+    "Betrag",
+    "Übermittelt",
+]
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+def export_filename(fmt: str, from_, to, gzip: bool) -> str:
+    von = from_.isoformat() if from_ else "anfang"
+    bis = to.isoformat() if to else "heute"
+    name = f"Zeiten_{von}_{bis}.{EXPORT_FORMATS[fmt][1]}"
+    return name + ".gz" if gzip else name
+
+
+def iter_export_rows(db: Session, filters: list) -> Iterator[tuple]:
+    """
+    Liefert die Exportzeilen direkt als Tupel (ohne ORM-Objekte).
+    """
+    TE = models.TimeEntry
+    stmt = (
+        select(
+            TE.id,
+            TE.datum,
+            TE.start,
+            TE.ende,
+            TE.pause_min,
+            TE.dauer_stunden,
+            models.Employee.name,
+            models.Customer.firma,
+            models.Project.titel,
+            func.coalesce(models.Activity.name, TE.taetigkeit),
+            TE.details,
+            TE.betrag,
+            TE.uebermittelt,
+        )
+        .join(models.Employee, TE.employee_id == models.Employee.id)
+        .outerjoin(models.Customer, TE.customer_id == models.Customer.id)
+        .outerjoin(models.Project, TE.project_id == models.Project.id)
+        .outerjoin(models.Activity, TE.activity_id == models.Activity.id)
+        .where(*filters)
+        .order_by(TE.datum.asc(), TE.start.asc(), TE.id.asc())
+        .execution_options(stream_results=True, yield_per=BATCH_SIZE)
+    )
+    for row in db.execute(stmt):
+        yield tuple(row)
+
+
+def _csv_value(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "ja" if v else "nein"
+    if isinstance(v, float):
+        return f"{v:.2f}"
+    return v
+
+
+def iter_csv(rows: Iterable[tuple], header: list[str] = EXPORT_HEADER) -> Iterator[bytes]:
+    """
+    CSV mit ';' und BOM, damit Excel (CH) Umlaute und Spalten korrekt öffnet.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    buf.write("\ufeff")
+    writer.writerow(header)
+
+    for i, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(v) for v in row])
+        if i % BATCH_SIZE == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate(0)
+
+    rest = buf.getvalue()
+    if rest:
+        yield rest.encode("utf-8")
+
+
+def iter_xlsx(rows: Iterable[tuple]) -> Iterator[bytes]:
+    """
+    XLSX ist ein ZIP und kann nicht zeilenweise gesendet werden. xlsxwriter
+    schreibt im constant_memory-Modus Zeile für Zeile in eine temporäre Datei,
+    die danach in Blöcken gestreamt wird.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as tmp:
+        wb = xlsxwriter.Workbook(tmp.name, {"constant_memory": True})
+        ws = wb.add_worksheet("Zeiten")
+        fmt_date = wb.add_format({"num_format": "dd.mm.yyyy"})
+        fmt_time = wb.add_format({"num_format": "hh:mm"})
+        fmt_num = wb.add_format({"num_format": "0.00"})
+
+        ws.write_row(0, 0, EXPORT_HEADER)
+        for r, row in enumerate(rows, start=1):
+            (id_, datum, start, ende, pause, dauer, ma, kunde, projekt,
+             taetigkeit, details, betrag, uebermittelt) = row
+            ws.write_number(r, 0, id_)
+            ws.write_datetime(r, 1, datum, fmt_date)
+            if start is not None:
+                ws.write_datetime(r, 2, start, fmt_time)
+            if ende is not None:
+                ws.write_datetime(r, 3, ende, fmt_time)
+            if pause is not None:
+                ws.write_number(r, 4, pause)
+            if dauer is not None:
+                ws.write_number(r, 5, dauer, fmt_num)
+            ws.write_string(r, 6, ma or "")
+            ws.write_string(r, 7, kunde or "")
+            ws.write_string(r, 8, projekt or "")
+            ws.write_string(r, 9, taetigkeit or "")
+            ws.write_string(r, 10, details or "")
+            if betrag is not None:
+                ws.write_number(r, 11, betrag, fmt_num)
+            ws.write_boolean(r, 12, bool(uebermittelt))
+        wb.close()
+
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    comp = zlib.compressobj(wbits=31)  # 31 = gzip-Header
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def iter_export(db: Session, filters: list, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    # Der Client holt den Stream evtl. langsam ab → Session liegt zwischen
+    # den Blöcken "idle in transaction"; rein lesend, hält den Feed nicht an
+    db.execute(text(NO_IDLE_TX_TIMEOUT))
+    rows = iter_export_rows(db, filters)
+    chunks = iter_xlsx(rows) if fmt == "xlsx" else iter_csv(rows)
+    return iter_gzip(chunks) if gzip else chunks
@@ -1,7 +1,9 @@
 # backend/filesystem.py
 import os
 import re
-from pathlib import Path
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 from datetime import datetime
 
 # Template-Struktur relativ zum Projektordner
@@ -42,6 +44,12 @@ FOLDER_TEMPLATE = [
 # Basis-Verzeichnis für Projekte im Container
 BASE_DIR = Path("/srv/stech/projects")
 
+# Vorlagedateien für Ordner-Templates: vorlagen_dir muss hier drunter liegen
+VORLAGEN_ROOT = Path(os.getenv("VORLAGEN_ROOT", "/srv/stech/vorlagen"))
+
+# Parallele mkdir/copy-Aufrufe (lohnt sich auf dem Netzlaufwerk)
+FOLDER_WORKERS = int(os.getenv("FOLDER_WORKERS", "8"))
+
 _slug_re = re.compile(r"[^a-zA-Z0-9]+")
 
 def slugify(text: str) -> str:
@@ -59,6 +67,8 @@ def create_project_folders(
     customer_firma: str,
     project_id: int,
     project_title: str,
+    template: list[str] | None = None,
+    vorlagen_dir: str | None = None,
 ) -> Path:
     """
     Legt die Projektordner an mit Schema:
@@ -92,8 +102,99 @@ def create_project_folders(
     project_root = year_dir / folder_name
     project_root.mkdir(parents=True, exist_ok=True)
 
-    # Unterordner laut Template anlegen
-    for rel in FOLDER_TEMPLATE:
-        (project_root / rel).mkdir(parents=True, exist_ok=True)
+    # Unterordner laut Template anlegen; ohne Template in der DB gilt die
+    # Standardstruktur (leere Templates lehnt die API ab)
+    provision_folders(project_root, template or FOLDER_TEMPLATE, vorlagen_dir)
+
+    return project_root
+
+
+def build_folder_plan(template: list[str]) -> list[list[str]]:
+    """
+    Macht aus der Template-Liste einen minimalen Anlege-Plan:
+    jedes Verzeichnis (inkl. Zwischenebenen) genau einmal, gruppiert nach Tiefe.
+    Innerhalb einer Ebene sind die Einträge unabhängig → parallel anlegbar.
+    """
+    dirs: set[PurePosixPath] = set()
+    for rel in template:
+        p = PurePosixPath(rel.strip().strip("/"))
+        if not p.parts or ".." in p.parts:
+            continue
+        while p.parts:
+            dirs.add(p)
+            p = p.parent
+
+    levels: dict[int, list[str]] = {}
+    for d in dirs:
+        levels.setdefault(len(d.parts), []).append(str(d))
+    return [sorted(levels[depth]) for depth in sorted(levels)]
+
+
+def _mkdir(path: Path) -> None:
+    # Eltern existieren laut Plan bereits → kein parents=True, kein Hochlaufen
+    path.mkdir(exist_ok=True)
+
+
+def _copy_file(src: Path, dst: Path) -> None:
+    if not dst.exists():
+        shutil.copy2(src, dst)
 
-    return project_root
\ No newline at end of file
+
+def resolve_vorlagen_dir(vorlagen_dir: str) -> Path:
+    """
+    Vorlagen-Verzeichnis relativ zu VORLAGEN_ROOT (oder absolut darunter).
+    Alles ausserhalb – auch per ".." oder Symlink – wird abgelehnt.
+    """
+    root = VORLAGEN_ROOT.resolve()
+    path = (root / vorlagen_dir).resolve()
+    if path != root and root not in path.parents:
+        raise ValueError(f"Vorlagen-Verzeichnis muss unter {VORLAGEN_ROOT} liegen.")
+    return path
+
+
+def resolve_project_path(path: str | Path) -> Path:
+    """
+    Pfad unterhalb von BASE_DIR (Projektordner, Archiv, Exportziel).
+    Alles ausserhalb – auch per ".." oder Symlink – wird abgelehnt.
+    """
+    p = Path(path).resolve()
+    if BASE_DIR.resolve() not in p.parents:
+        raise ValueError(f"Pfad liegt nicht unter {BASE_DIR}: {p}")
+    return p
+
+
+def provision_folders(
+    project_root: Path,
+    template: list[str],
+    vorlagen_dir: str | None = None,
+) -> None:
+    """
+    Legt die Ordner Ebene für Ebene mit einem kleinen Thread-Pool an und
+    kopiert optional Vorlagedateien (Struktur relativ zu vorlagen_dir).
+    """
+    plan = build_folder_plan(template)
+
+    with ThreadPoolExecutor(max_workers=FOLDER_WORKERS) as pool:
+        for level in plan:
+            # list() wartet auf die Ebene und reicht Fehler weiter
+            list(pool.map(_mkdir, (project_root / rel for rel in level)))
+
+        if vorlagen_dir:
+            try:
+                src_root = resolve_vorlagen_dir(vorlagen_dir)
+            except ValueError as e:
+                # Altbestand vor der Prüfung im Endpunkt: nichts kopieren
+                print("Warnung:", e, vorlagen_dir)
+                return
+            if not src_root.is_dir():
+                print("Warnung: Vorlagen-Verzeichnis fehlt:", vorlagen_dir)
+                return
+            files = [p for p in src_root.rglob("*") if p.is_file()]
+            # Zielordner für Dateien ausserhalb des Templates nachziehen
+            extra = {str(f.parent.relative_to(src_root)) for f in files} - {"."}
+            for level in build_folder_plan(sorted(extra)):
+                list(pool.map(_mkdir, (project_root / rel for rel in level)))
+            list(pool.map(
+                lambda f: _copy_file(f, project_root / f.relative_to(src_root)),
+                files,
+            ))
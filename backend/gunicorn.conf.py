@@ -0,0 +1,66 @@
+# backend/gunicorn.conf.py
+"""
+Mehrprozess-Betrieb: gunicorn als Prozessmanager, uvicorn-Worker für ASGI.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Anzahl Worker über WEB_CONCURRENCY oder `-w N`. Massgebend ist, was gunicorn
+tatsächlich startet: on_starting schreibt diese Zahl nach WEB_CONCURRENCY
+zurück, db.py liest sie für die Pool-Grösse pro Worker. Jeder Worker
+importiert main.py selbst, d.h. Engine und Pool entstehen erst nach dem Fork.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Nicht vorladen: sonst würde die Engine im Master angelegt und ihre
+# Verbindungen in alle Worker vererbt
+preload_app = False
+
+# Grosse Exporte / Lohnläufe dürfen länger laufen als der Standard (30 s)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # -w N auf der Kommandozeile übersteuert `workers` oben; die Worker erben
+    # die Umgebung beim Fork und rechnen ihr Pool-Budget mit dieser Zahl
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+
+    import sys
+
+    db = sys.modules.get("db")
+    if db is not None and db.WEB_CONCURRENCY != server.cfg.workers:
+        # --preload: db.py wurde schon mit der alten Zahl importiert
+        raise RuntimeError(
+            f"DB-Pool für {db.WEB_CONCURRENCY} Worker berechnet, gunicorn startet "
+            f"{server.cfg.workers}: WEB_CONCURRENCY statt -w setzen"
+        )
+
+
+def nworkers_changed(server, new_value, old_value):
+    # Beim Start (old_value None) und bei TTIN/TTOU: neue Worker rechnen mit
+    # der neuen Zahl, laufende behalten ihren Pool
+    os.environ["WEB_CONCURRENCY"] = str(new_value)
+    if old_value is not None and new_value > old_value:
+        server.log.warning(
+            "Worker %s → %s: laufende Worker behalten ihren Pool, DB_POOL_BUDGET "
+            "gilt erst nach einem Neustart wieder", old_value, new_value
+        )
+
+
+def post_fork(server, worker):
+    # Falls doch mit --preload gestartet: geerbte Pool-Verbindungen verwerfen,
+    # ohne sie für den Elternprozess zu schliessen
+    import sys
+
+    db = sys.modules.get("db")
+    if db is not None:
+        db.engine.dispose(close=False)
+        db.read_engine.dispose(close=False)
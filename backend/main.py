@@ -1,27 +1,49 @@
 # backend/main.py
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import or_
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import date, datetime
 from pathlib import Path
 import shutil
+import tarfile
 
-from db import SessionLocal, engine, Base
+from startup import check_ready, misrouted_writes, startup
+from db import HAS_REPLICA, ReadSessionLocal, SessionLocal, engine, read_engine, replica_caught_up, write_lsn
 import models
 from schemas import (
     CustomerCreate, CustomerRead,
     ProjectCreate, ProjectRead,
     EmployeeCreate, EmployeeRead, EmployeeUpdate,
     TimeEntryCreate, TimeEntryRead, TimeEntryUpdate,
+    SyncRequest, SyncResponse,
+    ChangesResponse,
+    ActivityCreate, ActivityRead, ActivityUpdate, ActivitySuggestion,
+    PayrollRunRead,
+    SupplierCreate, SupplierRead, SupplierUpdate, SupplierTotals,
+    SupplierInvoiceCreate, SupplierInvoiceRead, SupplierInvoiceUpdate,
+    FolderTemplateCreate, FolderTemplateRead, FolderTemplateUpdate,
+    AuditLogRead,
+    BalanceRead,
 )
-from filesystem import create_project_folders
-from crud_timeentries import check_no_overlap
-
-# -------------------------------------------------
-# DB Schema anlegen
-# -------------------------------------------------
-Base.metadata.create_all(bind=engine)
+from filesystem import create_project_folders, resolve_project_path, resolve_vorlagen_dir
+from crud_timeentries import check_no_overlap, get_running_entry, timeentry_filters
+from export import EXPORT_FORMATS, export_filename, iter_csv, iter_export
+from sickdays import end_sick_period, fill_sick_days, is_sick_entry
+from scheduler import start_scheduler, stop_scheduler
+from sync import apply_stamp_events
+from changes import DEFAULT_LIMIT, MAX_LIMIT, TokenVeraltet, get_changes
+from activities import assign_activity, bump_usage, find_activity, suggest_activities
+from billing import apply_rate, rerate_project
+from payroll import LINE_COLUMNS, create_payroll_run, preview_payroll
+from suppliers import check_invoice_file, find_suppliers, normalize_tags, open_invoices, supplier_totals
+from audit import query_audit
+from balances import balances_as_of
+from archive import ARCHIV_STATUS, archive_project, restore_project, start_archive_batch
 
 app = FastAPI()
 
@@ -40,8 +62,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read-your-writes-Token (siehe get_fresh_read_db)
+    expose_headers=["X-Write-LSN"],
 )
 
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+@app.middleware("http")
+async def write_lsn_header(request: Request, call_next):
+    """
+    Mit Replikat: nach jedem erfolgreichen Schreibzugriff die WAL-Position
+    des Primärs als X-Write-LSN mitgeben. Der Client schickt sie bei
+    Lesezugriffen zurück → Vergleich ohne Primär-Abfrage.
+    """
+    response = await call_next(request)
+    if HAS_REPLICA and request.method in _WRITE_METHODS and response.status_code < 400:
+        try:
+            response.headers["X-Write-LSN"] = await run_in_threadpool(write_lsn)
+        except OperationalError:
+            pass
+    return response
+
+
+@app.on_event("startup")
+def on_startup():
+    # DB abwarten, Schema/Migrationen, Pool vorwärmen (nicht mehr beim Import)
+    startup(engine, read_engine)
+    falsch = misrouted_writes(app, {get_read_db, get_fresh_read_db})
+    if falsch:
+        raise RuntimeError(f"Schreibende Endpunkte auf dem Replikat: {', '.join(falsch)}")
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_scheduler()
+
 
 def get_db():
     db = SessionLocal()
@@ -51,31 +108,91 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """
+    Nur lesende Auswertungen → Replikat (falls konfiguriert, darf kurz nachhinken).
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_fresh_read_db(request: Request):
+    """
+    Lesen mit Read-your-writes: Replikat nur, wenn es den letzten
+    Schreibzugriff des Clients (Header X-Write-LSN) bzw. den gecachten Stand
+    des Primärs schon eingespielt hat, sonst Primär.
+    """
+    replica = ReadSessionLocal()
+    try:
+        if replica_caught_up(replica, request.headers.get("X-Write-LSN")):
+            yield replica
+            return
+    finally:
+        replica.close()
+    yield from get_db()
+
+
 @app.get("/")
 def root():
     return {"msg": "STech Backend + PostgreSQL laufen!"}
 
 
-# -------------------------------------------------
-# Helper: Dauer berechnen
-# -------------------------------------------------
+@app.get("/health/live")
+def health_live():
+    # Prozess lebt – bewusst ohne DB
+    return {"ok": True}
+
+
+@app.get("/health/ready")
+def health_ready():
+    result = check_ready(engine, read_engine)
+    return JSONResponse(result, status_code=200 if result["ok"] else 503)
+
+
+# ============================================================
+#  C H A N G E - F E E D
+# ============================================================
 
-def compute_duration(entry: models.TimeEntry) -> None:
+@app.get("/changes", response_model=ChangesResponse)
+def list_changes(
+    since: str = "0",
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
     """
-    Berechnet entry.dauer_stunden aus start/ende/pause_min.
-    NOP, wenn start oder ende fehlen.
+    Inkrementeller Sync für Frontend-Caches und Buchhaltung:
+    since=0 liefert alles, danach immer das zurückgegebene Token mitgeben.
+    410: Token älter als die aufbewahrten Grabsteine → neu mit since=0.
     """
-    if not entry.start or not entry.ende:
-        return
+    try:
+        return get_changes(db, since, limit)
+    except TokenVeraltet:
+        raise HTTPException(status_code=410, detail="Token zu alt – bitte mit since=0 neu laden.")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiges Token.")
 
-    start_min = entry.start.hour * 60 + entry.start.minute
-    end_min = entry.ende.hour * 60 + entry.ende.minute
-    diff = max(0, end_min - start_min)
 
-    pause = entry.pause_min or 0
-    eff_min = max(0, diff - pause)
+# ============================================================
+#  A U D I T
+# ============================================================
 
-    entry.dauer_stunden = eff_min / 60.0
+@app.get("/audit/", response_model=List[AuditLogRead])
+def list_audit(
+    tabelle: Optional[Literal["time_entries", "employees"]] = None,
+    row_id: Optional[int] = None,
+    von: Optional[datetime] = None,
+    bis: Optional[datetime] = None,
+    limit: int = Query(200, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Admin: Änderungsprotokoll, neueste zuerst.
+    Typisch: ?tabelle=time_entries&row_id=123 oder ein Zeitraum von/bis (UTC).
+    """
+    return query_audit(db, tabelle=tabelle, row_id=row_id, von=von, bis=bis, limit=limit)
 
 
 # ============================================================
@@ -155,12 +272,20 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(db_project)
 
-    # Ordnerstruktur anlegen
+    # Ordnerstruktur anlegen (Template je nach Projekttyp, sonst Standard)
+    template = (
+        db.query(models.FolderTemplate)
+        .filter(models.FolderTemplate.ist_offerte.is_(bool(db_project.ist_offerte)))
+        .order_by(models.FolderTemplate.id)
+        .first()
+    )
     try:
         project_path = create_project_folders(
             customer_firma=customer.firma,
             project_id=db_project.id,
             project_title=db_project.titel,
+            template=template.pfade if template else None,
+            vorlagen_dir=template.vorlagen_dir if template else None,
         )
         db_project.projektpfad = str(project_path)
         db.commit()
@@ -183,6 +308,69 @@ def list_projects(db: Session = Depends(get_db)):
     return projects
 
 
+@app.post("/projects/{project_id}/rerate")
+def rerate_project_entries(
+    project_id: int,
+    ab: Optional[date] = None,
+    inkl_uebermittelt: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Admin: Einträge des Projekts mit dem aktuellen Stundensatz neu bewerten
+    (z.B. nach Satzänderung). Standard: nur noch nicht übermittelte Einträge.
+    """
+    proj = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not proj:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+
+    count = rerate_project(db, project_id, ab=ab, inkl_uebermittelt=inkl_uebermittelt)
+    db.commit()
+    return {"ok": True, "count": count}
+
+
+@app.post("/projects/archive_closed", status_code=202)
+def archive_closed(workers: int = Query(2, ge=1, le=16)):
+    """
+    Admin: alle Projekte mit Status "Abgeschlossen" archivieren (Prozess-Pool).
+    Läuft im Hintergrund; Fortschritt über archiv_pfad der Projekte.
+    """
+    if not start_archive_batch(workers=workers):
+        raise HTTPException(status_code=409, detail="Archivierung läuft bereits.")
+    return {"gestartet": True}
+
+
+@app.post("/projects/{project_id}/archive", response_model=ProjectRead)
+def archive_single_project(project_id: int, db: Session = Depends(get_db)):
+    proj = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not proj:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+    if proj.status != ARCHIV_STATUS:
+        raise HTTPException(status_code=400, detail="Nur abgeschlossene Projekte können archiviert werden.")
+    if proj.archiv_pfad:
+        raise HTTPException(status_code=400, detail="Projekt ist bereits archiviert.")
+    if not proj.projektpfad:
+        raise HTTPException(status_code=400, detail="Projekt hat keinen Projektordner.")
+
+    try:
+        return archive_project(db, proj)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Archivierung fehlgeschlagen: {e}")
+
+
+@app.post("/projects/{project_id}/restore", response_model=ProjectRead)
+def restore_single_project(project_id: int, db: Session = Depends(get_db)):
+    proj = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not proj:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+    if not proj.archiv_pfad:
+        raise HTTPException(status_code=400, detail="Projekt ist nicht archiviert.")
+
+    try:
+        return restore_project(db, proj)
+    except (OSError, ValueError, tarfile.TarError) as e:
+        raise HTTPException(status_code=500, detail=f"Wiederherstellen fehlgeschlagen: {e}")
+
+
 @app.delete("/projects/{project_id}")
 def delete_project(project_id: int, db: Session = Depends(get_db)):
     proj = db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -211,6 +399,243 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
     return {"ok": True}
 
 
+# ------------------------------------------------------------
+#  Ordner-Templates für Projekte
+# ------------------------------------------------------------
+
+def _check_vorlagen_dir(vorlagen_dir: Optional[str]) -> None:
+    if not vorlagen_dir:
+        return
+    try:
+        resolve_vorlagen_dir(vorlagen_dir)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/folder-templates/", response_model=List[FolderTemplateRead])
+def list_folder_templates(db: Session = Depends(get_db)):
+    return db.query(models.FolderTemplate).order_by(models.FolderTemplate.id).all()
+
+
+@app.post("/folder-templates/", response_model=FolderTemplateRead)
+def create_folder_template(tpl: FolderTemplateCreate, db: Session = Depends(get_db)):
+    _check_vorlagen_dir(tpl.vorlagen_dir)
+    db_tpl = models.FolderTemplate(**tpl.model_dump())
+    db.add(db_tpl)
+    db.commit()
+    db.refresh(db_tpl)
+    return db_tpl
+
+
+@app.put("/folder-templates/{template_id}", response_model=FolderTemplateRead)
+def update_folder_template(
+    template_id: int,
+    tpl: FolderTemplateUpdate,
+    db: Session = Depends(get_db),
+):
+    db_tpl = db.query(models.FolderTemplate).filter(models.FolderTemplate.id == template_id).first()
+    if not db_tpl:
+        raise HTTPException(status_code=404, detail="Ordner-Template nicht gefunden")
+
+    data = tpl.model_dump(exclude_unset=True)
+    _check_vorlagen_dir(data.get("vorlagen_dir"))
+    for field, value in data.items():
+        setattr(db_tpl, field, value)
+
+    db.commit()
+    db.refresh(db_tpl)
+    return db_tpl
+
+
+@app.delete("/folder-templates/{template_id}")
+def delete_folder_template(template_id: int, db: Session = Depends(get_db)):
+    db_tpl = db.query(models.FolderTemplate).filter(models.FolderTemplate.id == template_id).first()
+    if not db_tpl:
+        raise HTTPException(status_code=404, detail="Ordner-Template nicht gefunden")
+
+    db.delete(db_tpl)
+    db.commit()
+    return {"ok": True}
+
+
+# ============================================================
+#  L I E F E R A N T E N
+# ============================================================
+
+@app.post("/suppliers/", response_model=SupplierRead)
+def create_supplier(supplier: SupplierCreate, db: Session = Depends(get_db)):
+    data = supplier.model_dump()
+    data["taetigkeitsbereiche"] = normalize_tags(data["taetigkeitsbereiche"])
+
+    db_supplier = models.Supplier(**data)
+    db.add(db_supplier)
+    db.commit()
+    db.refresh(db_supplier)
+    return db_supplier
+
+
+@app.get("/suppliers/", response_model=List[SupplierRead])
+def list_suppliers(
+    taetigkeit: Optional[str] = None,
+    nur_aktive: bool = True,
+    db: Session = Depends(get_db),
+):
+    """
+    Lieferanten, optional gefiltert nach Tätigkeitsbereich
+    (z.B. ?taetigkeit=pneumatik → GIN-Index-Lookup).
+    """
+    return find_suppliers(db, taetigkeit=taetigkeit, nur_aktive=nur_aktive)
+
+
+@app.get("/suppliers/totals", response_model=List[SupplierTotals])
+def list_supplier_totals(
+    supplier_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    return supplier_totals(db, supplier_id=supplier_id)
+
+
+@app.put("/suppliers/{supplier_id}", response_model=SupplierRead)
+def update_supplier(supplier_id: int, supplier: SupplierUpdate, db: Session = Depends(get_db)):
+    db_supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+    if not db_supplier:
+        raise HTTPException(status_code=404, detail="Lieferant nicht gefunden")
+
+    data = supplier.model_dump(exclude_unset=True)
+    if "taetigkeitsbereiche" in data:
+        data["taetigkeitsbereiche"] = normalize_tags(data["taetigkeitsbereiche"])
+    for field, value in data.items():
+        setattr(db_supplier, field, value)
+
+    db.commit()
+    db.refresh(db_supplier)
+    return db_supplier
+
+
+@app.delete("/suppliers/{supplier_id}")
+def delete_supplier(supplier_id: int, db: Session = Depends(get_db)):
+    db_supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+    if not db_supplier:
+        raise HTTPException(status_code=404, detail="Lieferant nicht gefunden")
+
+    has_invoices = db.query(models.SupplierInvoice).filter(
+        models.SupplierInvoice.supplier_id == supplier_id
+    ).first()
+    if has_invoices:
+        raise HTTPException(
+            status_code=400,
+            detail="Lieferant hat noch Rechnungen und kann nicht gelöscht werden.",
+        )
+
+    db.delete(db_supplier)
+    db.commit()
+    return {"ok": True}
+
+
+def _check_supplier_invoice(db: Session, supplier_id: int, project_id: Optional[int], datei: Optional[str]):
+    supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+    if not supplier:
+        raise HTTPException(status_code=404, detail="Lieferant nicht gefunden")
+    proj = None
+    if project_id is not None:
+        proj = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if not proj:
+            raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+    if datei:
+        try:
+            check_invoice_file(proj, datei)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/supplier-invoices/", response_model=SupplierInvoiceRead)
+def create_supplier_invoice(invoice: SupplierInvoiceCreate, db: Session = Depends(get_db)):
+    _check_supplier_invoice(db, invoice.supplier_id, invoice.project_id, invoice.datei)
+
+    db_invoice = models.SupplierInvoice(**invoice.model_dump(), bezahlt=False)
+    db.add(db_invoice)
+    db.commit()
+    db.refresh(db_invoice)
+    return db_invoice
+
+
+@app.get("/supplier-invoices/open", response_model=List[SupplierInvoiceRead])
+def list_open_supplier_invoices(
+    faellig_bis: Optional[date] = None,
+    supplier_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Offene Eingangsrechnungen nach Fälligkeit (älteste zuerst).
+    """
+    return open_invoices(db, faellig_bis=faellig_bis, supplier_id=supplier_id, project_id=project_id)
+
+
+@app.post("/supplier-invoices/{invoice_id}/bezahlt", response_model=SupplierInvoiceRead)
+def mark_supplier_invoice_paid(
+    invoice_id: int,
+    bezahlt_am: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    db_invoice = db.query(models.SupplierInvoice).filter(models.SupplierInvoice.id == invoice_id).first()
+    if not db_invoice:
+        raise HTTPException(status_code=404, detail="Rechnung nicht gefunden")
+
+    db_invoice.bezahlt = True
+    db_invoice.bezahlt_am = bezahlt_am or date.today()
+    db.commit()
+    db.refresh(db_invoice)
+    return db_invoice
+
+
+@app.put("/supplier-invoices/{invoice_id}", response_model=SupplierInvoiceRead)
+def update_supplier_invoice(
+    invoice_id: int,
+    invoice: SupplierInvoiceUpdate,
+    db: Session = Depends(get_db),
+):
+    db_invoice = db.query(models.SupplierInvoice).filter(models.SupplierInvoice.id == invoice_id).first()
+    if not db_invoice:
+        raise HTTPException(status_code=404, detail="Rechnung nicht gefunden")
+
+    data = invoice.model_dump(exclude_unset=True)
+    if "supplier_id" in data and data["supplier_id"] is None:
+        raise HTTPException(status_code=400, detail="Lieferant ist ein Pflichtfeld.")
+    for field in ("rechnungsdatum", "faellig_am", "betrag", "bezahlt"):
+        if field in data and data[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} darf nicht leer sein.")
+    _check_supplier_invoice(
+        db,
+        data.get("supplier_id", db_invoice.supplier_id),
+        data.get("project_id", db_invoice.project_id),
+        data.get("datei", db_invoice.datei),
+    )
+
+    for field, value in data.items():
+        setattr(db_invoice, field, value)
+    # bezahlt und bezahlt_am passend halten
+    if not db_invoice.bezahlt:
+        db_invoice.bezahlt_am = None
+    elif db_invoice.bezahlt_am is None:
+        db_invoice.bezahlt_am = date.today()
+
+    db.commit()
+    db.refresh(db_invoice)
+    return db_invoice
+
+
+@app.delete("/supplier-invoices/{invoice_id}")
+def delete_supplier_invoice(invoice_id: int, db: Session = Depends(get_db)):
+    db_invoice = db.query(models.SupplierInvoice).filter(models.SupplierInvoice.id == invoice_id).first()
+    if not db_invoice:
+        raise HTTPException(status_code=404, detail="Rechnung nicht gefunden")
+
+    db.delete(db_invoice)
+    db.commit()
+    return {"ok": True}
+
+
 # ============================================================
 #  M I T A R B E I T E R
 # ============================================================
@@ -242,6 +667,7 @@ def create_employee(emp: EmployeeCreate, db: Session = Depends(get_db)):
         ferienanspruch=emp.ferienanspruch,
         ferien_guthaben_stunden=emp.ferien_guthaben_stunden,
         ueberstunden_guthaben=emp.ueberstunden_guthaben,
+        saldo_stichtag=emp.saldo_stichtag,
         bvg_eintritt=emp.bvg_eintritt,
         bvg_pflichtig=emp.bvg_pflichtig,
         krankentaggeld_versichert=emp.krankentaggeld_versichert,
@@ -254,6 +680,7 @@ def create_employee(emp: EmployeeCreate, db: Session = Depends(get_db)):
         qualifikationen=emp.qualifikationen,
         notizen_intern=emp.notizen_intern,
         krankentage=emp.krankentage,
+        krank_seit=emp.krank_seit,
         aktiv=emp.aktiv,
         erstellt_von=emp.erstellt_von,
         is_admin=emp.is_admin,
@@ -286,6 +713,150 @@ def update_employee(emp_id: int, emp: EmployeeUpdate, db: Session = Depends(get_
     return db_emp
 
 
+@app.get("/balances/", response_model=List[BalanceRead])
+def list_balances(
+    datum: Optional[date] = None,
+    employee_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Ferien- und Überstundensalden per `datum` (Standard: heute) für alle
+    aktiven Mitarbeiter oder einen einzelnen.
+    """
+    return balances_as_of(db, datum=datum, employee_id=employee_id)
+
+
+@app.get("/employees/{emp_id}/balance", response_model=BalanceRead)
+def get_employee_balance(emp_id: int, datum: Optional[date] = None, db: Session = Depends(get_read_db)):
+    rows = balances_as_of(db, datum=datum, employee_id=emp_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden")
+    return rows[0]
+
+
+@app.post("/employees/{emp_id}/krank", response_model=EmployeeRead)
+def report_sick(
+    emp_id: int,
+    seit: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Mitarbeiter krank melden. Ab `seit` (Standard: heute) bucht der Tagesjob
+    jeden Werktag die Soll-Stunden als "Krank", bis wieder eingestempelt wird.
+    """
+    db_emp = db.query(models.Employee).filter(models.Employee.id == emp_id).first()
+    if not db_emp:
+        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden")
+
+    db_emp.krank_seit = seit or date.today()
+    db_emp.krank_gebucht_bis = None
+    db.commit()
+
+    # Rückwirkende Meldung: vergangene Tage sofort buchen (heute erst im nächsten Lauf)
+    fill_sick_days(db)
+    db.refresh(db_emp)
+    return db_emp
+
+
+@app.post("/employees/{emp_id}/gesund", response_model=EmployeeRead)
+def end_sick(emp_id: int, db: Session = Depends(get_db)):
+    db_emp = db.query(models.Employee).filter(models.Employee.id == emp_id).first()
+    if not db_emp:
+        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden")
+
+    if db_emp.krank_seit is not None:
+        end_sick_period(db, db_emp, date.today())
+    db.commit()
+    db.refresh(db_emp)
+    return db_emp
+
+
+# ============================================================
+#  T Ä T I G K E I T E N
+# ============================================================
+
+@app.get("/activities/", response_model=List[ActivityRead])
+def list_activities(
+    include_inactive: bool = False,
+    db: Session = Depends(get_db),
+):
+    q = db.query(models.Activity)
+    if not include_inactive:
+        q = q.filter(models.Activity.aktiv.is_(True))
+    return q.order_by(models.Activity.name).all()
+
+
+@app.get("/activities/suggestions", response_model=List[ActivitySuggestion])
+def activity_suggestions(
+    employee_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """
+    Meistgenutzte Tätigkeiten dieses Mitarbeiters (aus den Zählern, ohne Historien-Scan).
+    """
+    return [
+        {**ActivityRead.model_validate(act).model_dump(), "anzahl": anzahl}
+        for act, anzahl in suggest_activities(db, employee_id, limit)
+    ]
+
+
+@app.post("/activities/", response_model=ActivityRead)
+def create_activity(activity: ActivityCreate, db: Session = Depends(get_db)):
+    name = activity.name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="Name ist ein Pflichtfeld.")
+    if find_activity(db, name):
+        raise HTTPException(status_code=400, detail="Tätigkeit existiert bereits.")
+
+    db_act = models.Activity(name=name, aktiv=activity.aktiv)
+    db.add(db_act)
+    db.commit()
+    db.refresh(db_act)
+    return db_act
+
+
+@app.put("/activities/{activity_id}", response_model=ActivityRead)
+def update_activity(activity_id: int, activity: ActivityUpdate, db: Session = Depends(get_db)):
+    db_act = db.query(models.Activity).filter(models.Activity.id == activity_id).first()
+    if not db_act:
+        raise HTTPException(status_code=404, detail="Tätigkeit nicht gefunden")
+
+    data = activity.model_dump(exclude_unset=True)
+    if "name" in data:
+        name = (data["name"] or "").strip()
+        other = find_activity(db, name)
+        if not name or (other and other.id != activity_id):
+            raise HTTPException(status_code=400, detail="Name fehlt oder existiert bereits.")
+        data["name"] = name
+        # Einträge bleiben unverändert, angezeigt wird der Name über activity_id
+
+    for field, value in data.items():
+        setattr(db_act, field, value)
+
+    db.commit()
+    db.refresh(db_act)
+    return db_act
+
+
+@app.delete("/activities/{activity_id}")
+def delete_activity(activity_id: int, db: Session = Depends(get_db)):
+    db_act = db.query(models.Activity).filter(models.Activity.id == activity_id).first()
+    if not db_act:
+        raise HTTPException(status_code=404, detail="Tätigkeit nicht gefunden")
+
+    used = db.query(models.TimeEntry).filter(models.TimeEntry.activity_id == activity_id).first()
+    if used:
+        raise HTTPException(
+            status_code=400,
+            detail="Tätigkeit wird in Zeiteinträgen verwendet – bitte deaktivieren statt löschen.",
+        )
+
+    db.delete(db_act)
+    db.commit()
+    return {"ok": True}
+
+
 # ============================================================
 #  Z E I T E I N T R Ä G E
 # ============================================================
@@ -302,6 +873,7 @@ def create_time_entry(entry: TimeEntryCreate, db: Session = Depends(get_db)):
         check_no_overlap(
             db=db,
             employee_id=entry.employee_id,
+            datum=entry.datum,
             start=entry.start,
             ende=entry.ende,
         )
@@ -314,18 +886,31 @@ def create_time_entry(entry: TimeEntryCreate, db: Session = Depends(get_db)):
         start=entry.start,
         ende=entry.ende,
         pause_min=entry.pause_min,
-        dauer_stunden=entry.dauer_stunden,
+        # dauer_stunden berechnet die DB; der Client-Wert zählt nur ohne start/ende
+        dauer_stunden_manuell=entry.dauer_stunden,
         taetigkeit=entry.taetigkeit,
+        activity_id=entry.activity_id,
         details=entry.details,
-        betrag=entry.betrag,
+        # betrag berechnet die DB aus Dauer × Stundensatz; Client-Wert nur ohne Satz
+        betrag_manuell=entry.betrag,
         quelle_datei=entry.quelle_datei,
         externe_id=entry.externe_id,
         quelle_system=entry.quelle_system or "api",
         uebermittelt=False,
     )
 
-    # Dauer berechnen wenn start & ende vorhanden
-    compute_duration(db_entry)
+    assign_activity(db, db_entry)
+    bump_usage(db, db_entry.employee_id, db_entry.activity_id)
+    apply_rate(db, db_entry)
+
+    # Erstes Einstempeln beendet eine Krankmeldung (nachträgliche Einträge vor
+    # Krankheitsbeginn nicht)
+    if (
+        emp.krank_seit is not None
+        and not is_sick_entry(db, db_entry)
+        and db_entry.datum >= emp.krank_seit
+    ):
+        end_sick_period(db, emp, db_entry.datum)
 
     db.add(db_entry)
     db.commit()
@@ -335,25 +920,16 @@ def create_time_entry(entry: TimeEntryCreate, db: Session = Depends(get_db)):
 
 @app.get("/timeentries/", response_model=List[TimeEntryRead])
 def list_time_entries(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_fresh_read_db),
     employee_id: Optional[int] = None,
     customer_id: Optional[int] = None,
     project_id: Optional[int] = None,
     from_: Optional[date] = Query(None, alias="from"),
     to: Optional[date] = None,
 ):
-    q = db.query(models.TimeEntry)
-
-    if employee_id:
-        q = q.filter(models.TimeEntry.employee_id == employee_id)
-    if customer_id:
-        q = q.filter(models.TimeEntry.customer_id == customer_id)
-    if project_id:
-        q = q.filter(models.TimeEntry.project_id == project_id)
-    if from_:
-        q = q.filter(models.TimeEntry.datum >= from_)
-    if to:
-        q = q.filter(models.TimeEntry.datum <= to)
+    q = db.query(models.TimeEntry).filter(
+        *timeentry_filters(employee_id, customer_id, project_id, from_, to)
+    )
 
     entries = q.order_by(
         models.TimeEntry.datum.asc(),
@@ -363,29 +939,95 @@ def list_time_entries(
     return entries
 
 
+@app.get("/timeentries/export")
+def export_time_entries(
+    db: Session = Depends(get_read_db),
+    format: str = "csv",
+    employee_id: Optional[int] = None,
+    customer_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    gzip: bool = False,
+    in_projektordner: bool = False,
+):
+    """
+    Export der Zeiteinträge als CSV oder XLSX (gleiche Filter wie die Liste).
+    - Standard: Download als Stream
+    - in_projektordner=true: Datei wird in <projektpfad>/03_Kaufmännisch
+      des Projekts (project_id Pflicht) geschrieben
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format muss 'csv' oder 'xlsx' sein.")
+
+    filters = timeentry_filters(employee_id, customer_id, project_id, from_, to)
+    filename = export_filename(format, from_, to, gzip)
+
+    if in_projektordner:
+        if not project_id:
+            raise HTTPException(status_code=400, detail="Für den Export in den Projektordner ist project_id nötig.")
+        proj = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if not proj:
+            raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+        if not proj.projektpfad or not Path(proj.projektpfad).is_dir():
+            raise HTTPException(status_code=400, detail="Projekt hat keinen gültigen Projektordner.")
+        try:
+            # Projektordner und Zieldatei prüfen: auch 03_Kaufmännisch oder die
+            # Datei selbst könnten Symlinks nach ausserhalb sein
+            target = resolve_project_path(
+                resolve_project_path(proj.projektpfad) / "03_Kaufmännisch" / filename
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            for chunk in iter_export(db, filters, format, gzip):
+                f.write(chunk)
+        return {"ok": True, "pfad": str(target)}
+
+    def stream():
+        # Eigene Session: der Stream läuft erst nach dem Return dieses Endpunkts
+        stream_db = ReadSessionLocal()
+        try:
+            yield from iter_export(stream_db, filters, format, gzip)
+        finally:
+            stream_db.close()
+
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[format][0]
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.get("/timeentries/running", response_model=Optional[TimeEntryRead])
 def get_running_time_entry(
     employee_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_fresh_read_db),
 ):
     """
     Offener Live-Stempel-Eintrag für diesen Mitarbeiter:
     start gesetzt, ende NULL, uebermittelt = False.
+    Liest vom Replikat nur, wenn es aktuell ist (direkt nach dem Stempeln).
     """
-    e = (
-        db.query(models.TimeEntry)
-        .filter(
-            models.TimeEntry.employee_id == employee_id,
-            models.TimeEntry.ende.is_(None),
-            models.TimeEntry.uebermittelt.is_(False),
-        )
-        .order_by(
-            models.TimeEntry.datum.desc(),
-            models.TimeEntry.start.desc()
-        )
-        .first()
-    )
-    return e
+    return get_running_entry(db, employee_id)
+
+
+@app.post("/timeentries/sync", response_model=SyncResponse)
+def sync_time_entries(req: SyncRequest, db: Session = Depends(get_db)):
+    """
+    Offline-Warteschlange abarbeiten: alle Stempel-Events in einer Transaktion,
+    Antwort enthält das Ergebnis pro Event und den aktuellen Serverstand.
+    """
+    ergebnisse = apply_stamp_events(db, req.events)
+    db.commit()
+
+    running = {
+        emp_id: get_running_entry(db, emp_id)
+        for emp_id in {ev.employee_id for ev in req.events}
+    }
+    return {"ergebnisse": ergebnisse, "running": running}
 
 
 @app.put("/timeentries/{entry_id}", response_model=TimeEntryRead)
@@ -400,20 +1042,37 @@ def update_time_entry(
 
     # Generisches Update
     data = entry_update.model_dump(exclude_unset=True)
+    if "dauer_stunden" in data:
+        data["dauer_stunden_manuell"] = data.pop("dauer_stunden")
+    if "betrag" in data:
+        data["betrag_manuell"] = data.pop("betrag")
+    old_activity_id = db_entry.activity_id
     for field, value in data.items():
         setattr(db_entry, field, value)
 
+    # Tätigkeit geändert → FK neu auflösen und Zähler umbuchen
+    if "taetigkeit" in data or "activity_id" in data:
+        if "activity_id" not in data:
+            db_entry.activity_id = None
+        assign_activity(db, db_entry)
+        if db_entry.activity_id != old_activity_id:
+            bump_usage(db, db_entry.employee_id, old_activity_id, -1)
+            bump_usage(db, db_entry.employee_id, db_entry.activity_id)
+
+    # Kunde/Projekt geändert → Satz neu auflösen
+    if "project_id" in data or "customer_id" in data:
+        apply_rate(db, db_entry)
+
     # Overlap prüfen, wenn start & ende vorhanden
     if db_entry.start is not None and db_entry.ende is not None:
         check_no_overlap(
             db=db,
             employee_id=db_entry.employee_id,
+            datum=db_entry.datum,
             start=db_entry.start,
             ende=db_entry.ende,
             entry_id=db_entry.id,
         )
-        # Dauer neu berechnen
-        compute_duration(db_entry)
 
     db.commit()
     db.refresh(db_entry)
@@ -444,6 +1103,7 @@ def delete_time_entry(entry_id: int, db: Session = Depends(get_db)):
         except Exception as e:
             print("Warnung beim Löschen der TimeEntry-Datei:", e)
 
+    bump_usage(db, db_entry.employee_id, db_entry.activity_id, -1)
     db.delete(db_entry)
     db.commit()
     return {"ok": True}
@@ -461,14 +1121,17 @@ def submit_open_timeentries(
     """
     Markiert alle Einträge dieses Mitarbeiters als 'uebermittelt',
     die:
-        - ein Ende haben
+        - ein Ende haben (oder reine Stundenbuchungen ohne Start sind, z.B. Krank)
         - noch nicht uebermittelt wurden.
     """
     q = (
         db.query(models.TimeEntry)
         .filter(
             models.TimeEntry.employee_id == employee_id,
-            models.TimeEntry.ende.is_not(None),
+            or_(
+                models.TimeEntry.ende.is_not(None),
+                models.TimeEntry.start.is_(None),
+            ),
             models.TimeEntry.uebermittelt.is_(False),
         )
     )
@@ -482,3 +1145,65 @@ def submit_open_timeentries(
 
     db.commit()
     return {"ok": True, "count": count}
+
+
+# ============================================================
+#  L O H N L A U F
+# ============================================================
+
+@app.post("/payroll/runs", response_model=PayrollRunRead)
+def run_payroll(
+    monat: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    speichern: bool = True,
+    erstellt_von: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Lohnlauf für einen Monat (z.B. monat=2025-11).
+    speichern=false → Was-wäre-wenn, nichts wird geschrieben.
+    """
+    if not speichern:
+        return preview_payroll(db, monat)
+    return create_payroll_run(db, monat, erstellt_von=erstellt_von)
+
+
+@app.get("/payroll/runs", response_model=List[PayrollRunRead])
+def list_payroll_runs(db: Session = Depends(get_read_db)):
+    # Übersicht ohne Zeilen
+    runs = db.query(models.PayrollRun).order_by(models.PayrollRun.monat.desc(), models.PayrollRun.id.desc()).all()
+    return [
+        PayrollRunRead(
+            id=r.id,
+            monat=r.monat,
+            werktage=r.werktage,
+            erstellt_am=r.erstellt_am,
+            erstellt_von=r.erstellt_von,
+        )
+        for r in runs
+    ]
+
+
+@app.get("/payroll/runs/{run_id}", response_model=PayrollRunRead)
+def get_payroll_run(run_id: int, db: Session = Depends(get_read_db)):
+    run = db.query(models.PayrollRun).filter(models.PayrollRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Lohnlauf nicht gefunden")
+    return run
+
+
+@app.get("/payroll/runs/{run_id}/export")
+def export_payroll_run(run_id: int, db: Session = Depends(get_read_db)):
+    """
+    Lohnlauf als CSV (eine Zeile pro Mitarbeiter) für die Lohnbuchhaltung.
+    """
+    run = db.query(models.PayrollRun).filter(models.PayrollRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Lohnlauf nicht gefunden")
+
+    rows = [tuple(getattr(line, c) for c in LINE_COLUMNS) for line in run.lines]
+    filename = f"Lohnlauf_{run.monat.strftime('%Y-%m')}_{run.id}.csv"
+    return StreamingResponse(
+        iter_csv(rows, header=LINE_COLUMNS),
+        media_type=EXPORT_FORMATS["csv"][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,320 @@
+# backend/migrations.py
+"""
+Einmalige Schema-Anpassungen für bestehende Datenbanken.
+
+`Base.metadata.create_all` legt nur fehlende Tabellen an, ändert aber keine
+bestehenden. Alles, was an einer laufenden DB nachgezogen werden muss, steht
+hier als idempotenter Schritt (prüft zuerst, ob er schon gelaufen ist).
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from activities import DEFAULT_ACTIVITIES, SYSTEM_ACTIVITIES
+from audit import install_audit
+from balances import install_balances
+from db import MIGRATION_LOCK_KEY, Base
+from filesystem import FOLDER_TEMPLATE
+from payroll import install_payroll
+from models import (
+    TIMEENTRY_START_TS_SQL,
+    TIMEENTRY_ENDE_TS_SQL,
+    TIMEENTRY_DAUER_SQL,
+    TIMEENTRY_BETRAG_SQL,
+)
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _timeentries_generated_columns(conn: Connection) -> None:
+    """
+    dauer_stunden wird zur generierten Spalte (inkl. Schichten über Mitternacht),
+    start_ts/ende_ts kommen dazu. Der alte Wert bleibt als dauer_stunden_manuell
+    erhalten (Fallback für Einträge ohne start/ende).
+    Beim Hinzufügen einer STORED-Spalte berechnet PostgreSQL alle bestehenden
+    Zeilen neu → das ist gleichzeitig der Backfill.
+    """
+    cols = _columns(conn, "time_entries")
+    if "dauer_stunden_manuell" in cols:
+        return
+
+    conn.execute(text(
+        "ALTER TABLE time_entries RENAME COLUMN dauer_stunden TO dauer_stunden_manuell"
+    ))
+    conn.execute(text(
+        f"ALTER TABLE time_entries "
+        f"ADD COLUMN start_ts TIMESTAMP GENERATED ALWAYS AS ({TIMEENTRY_START_TS_SQL}) STORED, "
+        f"ADD COLUMN ende_ts TIMESTAMP GENERATED ALWAYS AS ({TIMEENTRY_ENDE_TS_SQL}) STORED, "
+        f"ADD COLUMN dauer_stunden DOUBLE PRECISION GENERATED ALWAYS AS ({TIMEENTRY_DAUER_SQL}) STORED"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_employee_start_ts "
+        "ON time_entries (employee_id, start_ts)"
+    ))
+
+
+def _employees_krank_seit(conn: Connection) -> None:
+    if "krank_seit" in _columns(conn, "employees"):
+        return
+    conn.execute(text("ALTER TABLE employees ADD COLUMN krank_seit DATE"))
+
+
+def _employees_krank_gebucht_bis(conn: Connection) -> None:
+    if "krank_gebucht_bis" in _columns(conn, "employees"):
+        return
+    conn.execute(text("ALTER TABLE employees ADD COLUMN krank_gebucht_bis DATE"))
+
+
+CHANGE_FEED_TABLES = ["customers", "projects", "time_entries"]
+
+
+def _change_feed(conn: Connection) -> None:
+    """
+    Change-Feed für /changes: globale Sequenz + Trigger, die bei jedem
+    INSERT/UPDATE change_seq, change_xid und geändert_am setzen und bei
+    DELETE einen Grabstein in deleted_rows schreiben.
+    Alles mit CREATE OR REPLACE / IF NOT EXISTS → darf bei jedem Start laufen.
+    """
+    conn.exec_driver_sql("CREATE SEQUENCE IF NOT EXISTS change_seq")
+
+    conn.exec_driver_sql("""
+        CREATE OR REPLACE FUNCTION change_feed_touch() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_seq := nextval('change_seq');
+            NEW.change_xid := pg_current_xact_id();
+            NEW."geändert_am" := now() AT TIME ZONE 'utc';
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    conn.exec_driver_sql("""
+        CREATE OR REPLACE FUNCTION change_feed_deleted() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO deleted_rows (change_seq, tabelle, row_id, geloescht_am, change_xid)
+            VALUES (nextval('change_seq'), TG_TABLE_NAME, OLD.id,
+                    now() AT TIME ZONE 'utc', pg_current_xact_id());
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    conn.exec_driver_sql(
+        "ALTER TABLE deleted_rows ADD COLUMN IF NOT EXISTS change_xid xid8"
+    )
+
+    for table in CHANGE_FEED_TABLES:
+        conn.exec_driver_sql(
+            f'ALTER TABLE {table} '
+            f'ADD COLUMN IF NOT EXISTS "geändert_am" TIMESTAMP, '
+            f'ADD COLUMN IF NOT EXISTS change_seq BIGINT, '
+            f'ADD COLUMN IF NOT EXISTS change_xid xid8'
+        )
+        conn.exec_driver_sql(
+            f"CREATE OR REPLACE TRIGGER trg_{table}_change_touch "
+            f"BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION change_feed_touch()"
+        )
+        conn.exec_driver_sql(
+            f"CREATE OR REPLACE TRIGGER trg_{table}_change_deleted "
+            f"AFTER DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION change_feed_deleted()"
+        )
+        # Backfill: Trigger vergibt die Sequenz für bestehende Zeilen
+        conn.exec_driver_sql(f"UPDATE {table} SET change_seq = NULL WHERE change_seq IS NULL")
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_change_seq ON {table} (change_seq)"
+        )
+
+    # Token des Feeds = (change_xid, change_seq), siehe changes.py
+    for table in CHANGE_FEED_TABLES + ["deleted_rows"]:
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_change_pos ON {table} (change_xid, change_seq)"
+        )
+
+
+def _activities(conn: Connection) -> None:
+    """
+    Tätigkeiten als Tabelle: Startbestand anlegen, activity_id aus dem
+    bisherigen Freitext nachtragen und die Nutzungszähler einmalig aus der
+    Historie aufbauen (danach werden sie nur noch inkrementell geführt).
+    """
+    cols = _columns(conn, "time_entries")
+    is_new = "activity_id" not in cols
+
+    # Startbestand nur in eine leere Tabelle – sonst kämen umbenannte
+    # Tätigkeiten unter dem alten Namen zurück
+    seeded = conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM activities)").scalar()
+    for name in [] if seeded else DEFAULT_ACTIVITIES:
+        conn.execute(
+            text(
+                "INSERT INTO activities (name, aktiv, erstellt_am) "
+                "VALUES (:name, TRUE, now() AT TIME ZONE 'utc') "
+                "ON CONFLICT (name) DO NOTHING"
+            ),
+            {"name": name},
+        )
+
+    if not is_new:
+        return
+
+    conn.exec_driver_sql(
+        "ALTER TABLE time_entries ADD COLUMN activity_id INTEGER REFERENCES activities(id)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_activity_id ON time_entries (activity_id)"
+    )
+    conn.exec_driver_sql("""
+        UPDATE time_entries t
+        SET activity_id = a.id
+        FROM activities a
+        WHERE lower(trim(t.taetigkeit)) = lower(a.name)
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO activity_usage (employee_id, activity_id, anzahl, zuletzt)
+        SELECT employee_id, activity_id, count(*), max(erstellt_am)
+        FROM time_entries
+        WHERE activity_id IS NOT NULL
+        GROUP BY employee_id, activity_id
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def _timeentries_betrag(conn: Connection) -> None:
+    """
+    betrag wird zur generierten Spalte (Dauer × Stundensatz-Snapshot).
+    Der bisherige Wert bleibt als betrag_manuell, der Snapshot wird für
+    bestehende Einträge einmalig aus Projekt/Kunde nachgetragen.
+    """
+    if "betrag_manuell" in _columns(conn, "time_entries"):
+        return
+
+    conn.exec_driver_sql("ALTER TABLE time_entries RENAME COLUMN betrag TO betrag_manuell")
+    conn.exec_driver_sql("ALTER TABLE time_entries ADD COLUMN stundensatz DOUBLE PRECISION")
+    conn.exec_driver_sql("""
+        UPDATE time_entries t
+        SET stundensatz = COALESCE(p.stundensatz, c.stundensatz_standard)
+        FROM time_entries t2
+        LEFT JOIN projects p ON p.id = t2.project_id
+        LEFT JOIN customers c ON c.id = COALESCE(p.customer_id, t2.customer_id)
+        WHERE t.id = t2.id
+    """)
+    conn.exec_driver_sql(
+        f"ALTER TABLE time_entries ADD COLUMN betrag DOUBLE PRECISION "
+        f"GENERATED ALWAYS AS ({TIMEENTRY_BETRAG_SQL}) STORED"
+    )
+
+
+def _payroll_immutable(conn: Connection) -> None:
+    """
+    Lohnläufe sind Snapshots: UPDATE/DELETE wird von der DB abgelehnt.
+    Dazu die Funktion werktage() für Soll und Pro-rata.
+    """
+    install_payroll(conn)
+    conn.exec_driver_sql("""
+        CREATE OR REPLACE FUNCTION payroll_immutable() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'Lohnläufe sind unveränderlich';
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ("payroll_runs", "payroll_lines"):
+        conn.exec_driver_sql(
+            f"CREATE OR REPLACE TRIGGER trg_{table}_immutable "
+            f"BEFORE UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION payroll_immutable()"
+        )
+
+
+def _folder_templates(conn: Connection) -> None:
+    """
+    Bisheriges FOLDER_TEMPLATE als Standard für Offerten und Aufträge anlegen.
+    """
+    for name, ist_offerte in (("Auftrag", False), ("Offerte", True)):
+        conn.execute(
+            text(
+                "INSERT INTO folder_templates (name, ist_offerte, pfade, erstellt_am) "
+                "VALUES (:name, :ist_offerte, :pfade, now() AT TIME ZONE 'utc') "
+                "ON CONFLICT (name) DO NOTHING"
+            ),
+            {"name": name, "ist_offerte": ist_offerte, "pfade": FOLDER_TEMPLATE},
+        )
+
+
+def _projects_archiv(conn: Connection) -> None:
+    cols = _columns(conn, "projects")
+    if "archiv_pfad" not in cols:
+        conn.execute(text("ALTER TABLE projects ADD COLUMN archiv_pfad VARCHAR"))
+    if "archiviert_am" not in cols:
+        conn.execute(text("ALTER TABLE projects ADD COLUMN archiviert_am TIMESTAMP"))
+
+
+def _audit_log(conn: Connection) -> None:
+    """
+    Audit-Trigger, Append-only-Sperre und Monatspartitionen (siehe audit.py).
+    """
+    install_audit(conn)
+
+
+def _balances(conn: Connection) -> None:
+    """
+    Saldo-Stichtag für den Vortrag, balance_days-Trigger und einmaliger Aufbau.
+    """
+    if "saldo_stichtag" not in _columns(conn, "employees"):
+        conn.execute(text("ALTER TABLE employees ADD COLUMN saldo_stichtag DATE"))
+    # Pause/Ferien über den Schlüssel → Spalte muss schon da sein (idempotent)
+    _activities_schluessel(conn)
+    install_balances(conn)
+
+
+def _activities_schluessel(conn: Connection) -> None:
+    """
+    Systemtätigkeiten (Pause, Krank, Ferien) bekommen einen festen Schlüssel:
+    bestehende Zeile per Name zuordnen, fehlende anlegen.
+    """
+    if "schluessel" not in _columns(conn, "activities"):
+        conn.exec_driver_sql("ALTER TABLE activities ADD COLUMN schluessel VARCHAR")
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_activities_schluessel ON activities (schluessel)"
+        )
+    for key, name in SYSTEM_ACTIVITIES.items():
+        params = {"key": key, "name": name}
+        conn.execute(text(
+            "UPDATE activities SET schluessel = :key "
+            "WHERE lower(name) = lower(:name) AND schluessel IS NULL "
+            "AND NOT EXISTS (SELECT 1 FROM activities WHERE schluessel = :key)"
+        ), params)
+        conn.execute(text(
+            "INSERT INTO activities (name, schluessel, aktiv, erstellt_am) "
+            "SELECT :name, :key, TRUE, now() AT TIME ZONE 'utc' "
+            "WHERE NOT EXISTS (SELECT 1 FROM activities WHERE schluessel = :key) "
+            "ON CONFLICT DO NOTHING"
+        ), params)
+
+
+# Reihenfolge ist relevant – neue Schritte immer unten anhängen
+MIGRATIONS = [
+    _timeentries_generated_columns,
+    _employees_krank_seit,
+    _change_feed,
+    _activities,
+    _timeentries_betrag,
+    _payroll_immutable,
+    _folder_templates,
+    _projects_archiv,
+    _audit_log,
+    _balances,
+    _employees_krank_gebucht_bis,
+    _activities_schluessel,
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Fehlende Tabellen anlegen und alle Schritte ausführen – in EINER Transaktion.
+    """
+    with engine.begin() as conn:
+        # Serialisiert create_all + Migrationen, falls mehrere Prozesse gleichzeitig starten
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": MIGRATION_LOCK_KEY})
+        Base.metadata.create_all(bind=conn)
+        for step in MIGRATIONS:
+            step(conn)
@@ -10,12 +10,54 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     Text,
+    Computed,
+    Index,
+    BigInteger,
+    FetchedValue,
+    UniqueConstraint,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import UserDefinedType
 from datetime import datetime
 from db import Base
 
 
+class Xid8(UserDefinedType):
+    """
+    PostgreSQL-Transaktions-ID (xid8) – für den Change-Feed (siehe changes.py).
+    """
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "xid8"
+
+
+# ------------------------------------------------------------
+#  Generierte Spalten für Zeiteinträge (werden von PostgreSQL berechnet)
+# ------------------------------------------------------------
+# Ende vor Start = Schicht über Mitternacht → Ende gehört zum Folgetag.
+TIMEENTRY_START_TS_SQL = "datum + start"
+TIMEENTRY_ENDE_TS_SQL = (
+    "datum + ende + CASE WHEN ende < start THEN interval '1 day' ELSE interval '0' END"
+)
+# Dauer in Stunden abzüglich Pause; ohne start/ende gilt der manuell gelieferte Wert
+TIMEENTRY_DAUER_SQL = (
+    "CASE WHEN start IS NOT NULL AND ende IS NOT NULL THEN "
+    "GREATEST(0, EXTRACT(EPOCH FROM (ende - start "
+    "+ CASE WHEN ende < start THEN interval '1 day' ELSE interval '0' END)) / 3600.0 "
+    "- COALESCE(pause_min, 0) / 60.0)::double precision "
+    "ELSE dauer_stunden_manuell END"
+)
+# Betrag = Dauer × Stundensatz-Snapshot; ohne Satz gilt der manuell gelieferte Betrag.
+# (Generierte Spalten dürfen sich nicht gegenseitig referenzieren → Dauer-Ausdruck eingebettet)
+TIMEENTRY_BETRAG_SQL = (
+    "CASE WHEN stundensatz IS NOT NULL THEN "
+    f"ROUND((({TIMEENTRY_DAUER_SQL}) * stundensatz)::numeric, 2)::double precision "
+    "ELSE betrag_manuell END"
+)
+
+
 class Customer(Base):
     __tablename__ = "customers"
 
@@ -39,6 +81,11 @@ class Customer(Base):
 
     erstellt_am = Column(DateTime, default=datetime.utcnow)
 
+    # Change-Feed (werden per Trigger gesetzt, siehe migrations.py)
+    geändert_am = Column(DateTime, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    change_seq = Column(BigInteger, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    change_xid = Column(Xid8, server_default=FetchedValue(), server_onupdate=FetchedValue())
+
     # Beziehungen
     projects = relationship("Project", back_populates="customer")
     time_entries = relationship("TimeEntry", back_populates="customer")
@@ -56,9 +103,101 @@ class Project(Base):
     status = Column(String, default="neu")
     projektpfad = Column(String, nullable=True)
 
+    # Archivierung (siehe archive.py): gesetzt, solange der Ordner als tar.xz vorliegt
+    archiv_pfad = Column(String, nullable=True)
+    archiviert_am = Column(DateTime, nullable=True)
+
+    # Change-Feed (werden per Trigger gesetzt, siehe migrations.py)
+    geändert_am = Column(DateTime, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    change_seq = Column(BigInteger, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    change_xid = Column(Xid8, server_default=FetchedValue(), server_onupdate=FetchedValue())
+
     # Beziehungen
     customer = relationship("Customer", back_populates="projects")
     time_entries = relationship("TimeEntry", back_populates="project")
+    supplier_invoices = relationship("SupplierInvoice", back_populates="project")
+
+
+class FolderTemplate(Base):
+    """
+    Ordnerstruktur für neue Projekte, je Projekttyp (Offerte / Auftrag).
+    pfade relativ zum Projektordner, vorlagen_dir optional mit Vorlagedateien.
+    """
+    __tablename__ = "folder_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    ist_offerte = Column(Boolean, default=False, nullable=False, index=True)
+    pfade = Column(ARRAY(String), nullable=False, default=list)
+    vorlagen_dir = Column(String, nullable=True)
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+
+
+class Supplier(Base):
+    __tablename__ = "suppliers"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    firma = Column(String, nullable=False, index=True)
+    kontaktperson = Column(String, nullable=True)
+    adresse = Column(String, nullable=True)
+    plz = Column(String, nullable=True)
+    ort = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    telefon = Column(String, nullable=True)
+    webseite = Column(String, nullable=True)
+
+    # Tätigkeitsbereich als Tags (klein geschrieben), z.B. ["pneumatik", "laserschneiden"]
+    taetigkeitsbereiche = Column(ARRAY(String), nullable=False, default=list)
+    notizen = Column(Text, nullable=True)
+    aktiv = Column(Boolean, default=True, nullable=False)
+
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+
+    # Beziehungen
+    invoices = relationship("SupplierInvoice", back_populates="supplier")
+
+    __table_args__ = (
+        # "Welche Lieferanten können X?" → taetigkeitsbereiche @> ARRAY['x'] nutzt diesen Index
+        Index("ix_suppliers_taetigkeitsbereiche", "taetigkeitsbereiche", postgresql_using="gin"),
+    )
+
+
+class SupplierInvoice(Base):
+    """
+    Eingangsrechnung eines Lieferanten, optional einem Projekt zugeordnet
+    (Datei liegt dann unter 03_Kaufmännisch/03_Rechnungen/01_Eingang).
+    """
+    __tablename__ = "supplier_invoices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True, index=True)
+
+    rechnungsnummer = Column(String, nullable=True)
+    rechnungsdatum = Column(Date, nullable=False)
+    faellig_am = Column(Date, nullable=False)
+    betrag = Column(Float, nullable=False)
+    beschreibung = Column(String, nullable=True)
+    datei = Column(String, nullable=True)
+
+    bezahlt = Column(Boolean, default=False, nullable=False)
+    bezahlt_am = Column(Date, nullable=True)
+
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+
+    # Beziehungen
+    supplier = relationship("Supplier", back_populates="invoices")
+    project = relationship("Project", back_populates="supplier_invoices")
+
+    __table_args__ = (
+        # Offene Rechnungen nach Fälligkeit – Teilindex nur über unbezahlte
+        Index(
+            "ix_supplier_invoices_offen_faellig",
+            "faellig_am",
+            postgresql_where=(bezahlt.is_(False)),
+        ),
+    )
 
 
 class Employee(Base):
@@ -94,8 +233,10 @@ class Employee(Base):
     kadervertrag = Column(Boolean, default=False)
 
     ferienanspruch = Column(Float)  # Tage/Jahr
+    # Saldo-Vortrag per saldo_stichtag; laufende Salden: siehe balances.py
     ferien_guthaben_stunden = Column(Float, default=0.0)
     ueberstunden_guthaben = Column(Float, default=0.0)
+    saldo_stichtag = Column(Date, nullable=True)  # leer = ab Eintritt
 
     # Versicherungen
     bvg_eintritt = Column(Date)
@@ -116,6 +257,8 @@ class Employee(Base):
 
     # Sonstiges
     krankentage = Column(Float, default=0)
+    krank_seit = Column(Date, nullable=True)  # gesetzt = krank gemeldet (Tagesjob bucht "Krank")
+    krank_gebucht_bis = Column(Date, nullable=True)  # bis hier hat der Tagesjob schon gebucht
     aktiv = Column(Boolean, default=True)
 
     # System
@@ -145,11 +288,22 @@ class TimeEntry(Base):
     start = Column(Time, nullable=True)
     ende = Column(Time, nullable=True)
     pause_min = Column(Integer, nullable=True)          # Pause in Minuten
-    dauer_stunden = Column(Float, nullable=True)
+    # Nur für Einträge ohne start/ende (z.B. CSV-Import mit reiner Stundenangabe)
+    dauer_stunden_manuell = Column(Float, nullable=True)
+
+    # Von PostgreSQL berechnet – nie direkt schreiben
+    start_ts = Column(DateTime, Computed(TIMEENTRY_START_TS_SQL, persisted=True))
+    ende_ts = Column(DateTime, Computed(TIMEENTRY_ENDE_TS_SQL, persisted=True))
+    dauer_stunden = Column(Float, Computed(TIMEENTRY_DAUER_SQL, persisted=True))
 
-    taetigkeit = Column(String, nullable=True)
+    taetigkeit = Column(String, nullable=True)          # Text bleibt für Altbestand/Anzeige
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=True, index=True)
     details = Column(String, nullable=True)
-    betrag = Column(Float, nullable=True)
+
+    # Effektiver Stundensatz beim Schreiben (Projekt, sonst Kunde) – siehe billing.py
+    stundensatz = Column(Float, nullable=True)
+    betrag_manuell = Column(Float, nullable=True)
+    betrag = Column(Float, Computed(TIMEENTRY_BETRAG_SQL, persisted=True))
 
     # Für CSV-Import / Stempel-App
     quelle_datei = Column(String, nullable=True)        # z.B. "Export_April.xlsx"
@@ -162,7 +316,193 @@ class TimeEntry(Base):
 
     erstellt_am = Column(DateTime, default=datetime.utcnow)
 
+    # Change-Feed (werden per Trigger gesetzt, siehe migrations.py)
+    geändert_am = Column(DateTime, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    change_seq = Column(BigInteger, index=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    change_xid = Column(Xid8, server_default=FetchedValue(), server_onupdate=FetchedValue())
+
     # Beziehungen
     employee = relationship("Employee", back_populates="time_entries")
     customer = relationship("Customer", back_populates="time_entries")
-    project = relationship("Project", back_populates="time_entries")
\ No newline at end of file
+    project = relationship("Project", back_populates="time_entries")
+    activity = relationship("Activity")
+
+    __table_args__ = (
+        Index("ix_time_entries_employee_start_ts", "employee_id", "start_ts"),
+    )
+
+    @property
+    def anzeige_taetigkeit(self) -> str | None:
+        # Aktueller Name der Tätigkeit; der gespeicherte Text bleibt unverändert
+        return self.activity.name if self.activity is not None else self.taetigkeit
+
+
+class Activity(Base):
+    __tablename__ = "activities"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    # Fester Schlüssel für Tätigkeiten, die das System selbst bucht (Name darf sich ändern)
+    schluessel = Column(String, nullable=True, unique=True)
+    aktiv = Column(Boolean, default=True, nullable=False)
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+
+
+class ActivityUsage(Base):
+    """
+    Zähler pro Mitarbeiter und Tätigkeit für die "meistgenutzt"-Vorschläge.
+    Wird bei jedem Buchen/Ändern/Löschen inkrementell nachgeführt.
+    """
+    __tablename__ = "activity_usage"
+
+    employee_id = Column(Integer, ForeignKey("employees.id"), primary_key=True)
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True)
+    anzahl = Column(Integer, nullable=False, default=0)
+    zuletzt = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_activity_usage_ranking", "employee_id", "anzahl", "zuletzt"),
+    )
+
+
+class SyncEvent(Base):
+    """
+    Bereits verarbeitete Stempel-Events aus der Offline-Warteschlange.
+    Die ID erzeugt der Client → ein erneut gesendetes Event wird nicht doppelt gebucht.
+    """
+    __tablename__ = "sync_events"
+
+    id = Column(String, primary_key=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    typ = Column(String, nullable=False)                # "start" / "pause" / "stop"
+    status = Column(String, nullable=False)             # "ok" / "ignoriert" / "konflikt"
+    meldung = Column(String, nullable=True)
+    time_entry_id = Column(Integer, ForeignKey("time_entries.id", ondelete="SET NULL"), nullable=True)
+    verarbeitet_am = Column(DateTime, default=datetime.utcnow)
+
+
+class DeletedRow(Base):
+    """
+    Grabsteine für den Change-Feed: gelöschte Kunden/Projekte/Zeiteinträge.
+    Wird per Trigger befüllt.
+    """
+    __tablename__ = "deleted_rows"
+
+    change_seq = Column(BigInteger, primary_key=True, autoincrement=False)
+    tabelle = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    geloescht_am = Column(DateTime, nullable=False)
+    change_xid = Column(Xid8, nullable=True)
+
+
+class ChangeFeedHorizon(Base):
+    """
+    Position des jüngsten gelöschten Grabsteins (eine Zeile). Ältere Tokens
+    würden Löschungen verpassen → Client muss mit since=0 neu laden.
+    """
+    __tablename__ = "change_feed_horizon"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    change_xid = Column(Xid8, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    bereinigt_am = Column(DateTime, nullable=False)
+
+
+class PayrollRun(Base):
+    """
+    Lohnlauf für einen Monat. Läufe und ihre Zeilen sind unveränderlich
+    (Trigger in migrations.py) – Korrektur = neuer Lauf.
+    """
+    __tablename__ = "payroll_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    monat = Column(Date, nullable=False, index=True)    # erster Tag des Monats
+    werktage = Column(Integer, nullable=False)
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+    erstellt_von = Column(String, nullable=True)
+
+    lines = relationship("PayrollLine", back_populates="run", order_by="PayrollLine.employee_id")
+
+
+class PayrollLine(Base):
+    """
+    Snapshot pro Mitarbeiter: Vertragsdaten zum Zeitpunkt des Laufs + Resultate.
+    """
+    __tablename__ = "payroll_lines"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("payroll_runs.id"), nullable=False)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+
+    name = Column(String)
+    lohnart = Column(String)
+    lohn = Column(Float)
+    pensum = Column(Float)
+    dreizehnter = Column(Boolean)
+    kadervertrag = Column(Boolean)
+    bvg_pflichtig = Column(Boolean)
+    kinderanzahl = Column(Integer)
+
+    stunden_soll = Column(Float)
+    stunden_ist = Column(Float)
+    ueberstunden = Column(Float)        # ist − soll (Monatslohn, ohne Kader)
+    brutto = Column(Float)
+    rueckstellung_13 = Column(Float)    # Anteil 13. Monatslohn
+
+    run = relationship("PayrollRun", back_populates="lines")
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "employee_id", name="uq_payroll_lines_run_employee"),
+    )
+
+
+class AuditLog(Base):
+    """
+    Append-only Protokoll aller Änderungen an Zeiteinträgen und HR-Feldern
+    der Mitarbeiter. Wird per Trigger in derselben Transaktion geschrieben
+    (siehe audit.py), monatlich partitioniert nach `zeit`.
+    diff = {spalte: {"alt": …, "neu": …}} – nur geänderte Spalten.
+    """
+    __tablename__ = "audit_log"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    zeit = Column(DateTime, primary_key=True)   # Partitionsschlüssel muss Teil des PK sein
+    tabelle = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    aktion = Column(String, nullable=False)     # INSERT / UPDATE / DELETE
+    diff = Column(JSONB, nullable=False)
+    txid = Column(BigInteger, nullable=False)   # gleiche Transaktion = gleicher Wert
+
+    __table_args__ = (
+        Index("ix_audit_log_tabelle_row_zeit", "tabelle", "row_id", "zeit"),
+        Index("ix_audit_log_zeit", "zeit", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (zeit)"},
+    )
+
+
+class BalanceDay(Base):
+    """
+    Stunden pro Mitarbeiter und Tag für Ferien-/Überstundensalden.
+    Wird ausschliesslich per Trigger auf time_entries geführt (balances.py).
+    """
+    __tablename__ = "balance_days"
+
+    employee_id = Column(Integer, ForeignKey("employees.id"), primary_key=True)
+    datum = Column(Date, primary_key=True)
+    ist_stunden = Column(Float, nullable=False, default=0)
+    uebermittelt_stunden = Column(Float, nullable=False, default=0)
+    ferien_stunden = Column(Float, nullable=False, default=0)
+
+
+class BalanceTotal(Base):
+    """
+    Laufende Summe von balance_days je Mitarbeiter ab dem Saldo-Stichtag
+    (`ab`, leer = alle Tage). Wird per Trigger nachgeführt (balances.py).
+    """
+    __tablename__ = "balance_totals"
+
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    ab = Column(Date, nullable=True)
+    ist_stunden = Column(Float, nullable=False, default=0)
+    uebermittelt_stunden = Column(Float, nullable=False, default=0)
+    ferien_stunden = Column(Float, nullable=False, default=0)
@@ -0,0 +1,178 @@
+# backend/payroll.py
+"""
+Lohnlauf: Für einen Monat werden die übermittelten Stunden aller aktiven
+Mitarbeiter in EINER Aggregat-Abfrage geholt und Brutto, 13. Monatslohn
+und Überstunden direkt in SQL für alle Mitarbeiter gleichzeitig berechnet.
+Ein gespeicherter Lauf ist ein unveränderlicher Snapshot (INSERT … SELECT).
+
+Regeln (bewusst einfach, Abzüge/Sozialversicherungen nicht enthalten):
+- Werktage (Mo–Fr, SQL-Funktion werktage()) pro Mitarbeiter: nur die Tage
+  zwischen Ein- und Austritt
+- Soll  = stunden_pro_woche × pensum/100 / 5 × Werktage des Mitarbeiters
+- Ist   = Summe dauer_stunden der übermittelten Einträge ohne Pause
+  (Tätigkeit mit Schlüssel "pause"; ohne activity_id per Name)
+- Brutto: Stundenlohn → Ist × lohn, Monatslohn → lohn × Werktage des
+  Mitarbeiters / Werktage des Monats (Ein-/Austritt im Monat anteilig)
+- 13. Monatslohn (falls vereinbart): Rückstellung Brutto / 12
+- Überstunden: Ist − Soll bei Monatslohn ohne Kadervertrag, sonst 0
+"""
+import calendar
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import models
+from activities import PAUSE_SCHLUESSEL, PAUSE_TAETIGKEIT
+
+LINE_COLUMNS = [
+    "employee_id",
+    "name",
+    "lohnart",
+    "lohn",
+    "pensum",
+    "dreizehnter",
+    "kadervertrag",
+    "bvg_pflichtig",
+    "kinderanzahl",
+    "stunden_soll",
+    "stunden_ist",
+    "ueberstunden",
+    "brutto",
+    "rueckstellung_13",
+]
+
+# Werktage (Mo–Fr) von–bis inkl.: volle Wochen × 5 plus Werktage im Rest
+# (p = Wochentag des Starts, 0 = Montag; Rest läuft evtl. ins nächste Wochenende)
+WERKTAGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION werktage(von date, bis date) RETURNS integer AS $$
+    SELECT CASE WHEN n <= 0 THEN 0 ELSE
+        5 * (n / 7) + GREATEST(0, LEAST(p + mod(n, 7), 5) - p) + GREATEST(0, p + mod(n, 7) - 7)
+    END
+    FROM (SELECT bis - von + 1 AS n, EXTRACT(ISODOW FROM von)::integer - 1 AS p) x
+$$ LANGUAGE sql IMMUTABLE
+"""
+
+_CALC_SQL = """
+WITH stunden AS (
+    SELECT t.employee_id, SUM(t.dauer_stunden) AS ist
+    FROM time_entries t
+    LEFT JOIN activities a ON a.id = t.activity_id
+    WHERE t.datum BETWEEN :von AND :bis
+      AND t.uebermittelt IS TRUE
+      AND a.schluessel IS DISTINCT FROM :pause_key
+      AND (t.activity_id IS NOT NULL OR COALESCE(t.taetigkeit, '') <> :pause)
+    GROUP BY t.employee_id
+),
+basis AS (
+    SELECT
+        e.id AS employee_id,
+        e.name,
+        e.lohnart,
+        COALESCE(e.lohn, 0) AS lohn,
+        COALESCE(e.pensum, 100) AS pensum,
+        COALESCE(e.dreizehnter, TRUE) AS dreizehnter,
+        COALESCE(e.kadervertrag, FALSE) AS kadervertrag,
+        COALESCE(e.bvg_pflichtig, FALSE) AS bvg_pflichtig,
+        COALESCE(e.kinderanzahl, 0) AS kinderanzahl,
+        lower(COALESCE(e.lohnart, '')) = 'stundenlohn' AS ist_stundenlohn,
+        COALESCE(e.stunden_pro_woche, 42) * COALESCE(e.pensum, 100) / 100.0 / 5.0 * w.tage AS soll,
+        w.tage,
+        COALESCE(s.ist, 0) AS ist
+    FROM employees e
+    LEFT JOIN stunden s ON s.employee_id = e.id
+    CROSS JOIN LATERAL (
+        SELECT werktage(GREATEST(:von, COALESCE(e.eintrittsdatum, :von)),
+                        LEAST(:bis, COALESCE(e.austrittsdatum, :bis))) AS tage
+    ) w
+    WHERE e.aktiv IS TRUE
+      AND (e.eintrittsdatum IS NULL OR e.eintrittsdatum <= :bis)
+      AND (e.austrittsdatum IS NULL OR e.austrittsdatum >= :von)
+),
+brutto AS (
+    SELECT b.*, CASE WHEN ist_stundenlohn THEN ist * lohn
+                     ELSE lohn * tage / NULLIF(:werktage, 0)::double precision END AS brutto
+    FROM basis b
+)
+SELECT
+    employee_id,
+    name,
+    lohnart,
+    lohn,
+    pensum,
+    dreizehnter,
+    kadervertrag,
+    bvg_pflichtig,
+    kinderanzahl,
+    ROUND(soll::numeric, 2)::double precision AS stunden_soll,
+    ROUND(ist::numeric, 2)::double precision AS stunden_ist,
+    CASE WHEN ist_stundenlohn OR kadervertrag THEN 0
+         ELSE ROUND((ist - soll)::numeric, 2)::double precision END AS ueberstunden,
+    ROUND(brutto::numeric, 2)::double precision AS brutto,
+    CASE WHEN dreizehnter THEN ROUND((brutto / 12.0)::numeric, 2)::double precision
+         ELSE 0 END AS rueckstellung_13
+FROM brutto
+"""
+
+_PREVIEW_SQL = text(_CALC_SQL + " ORDER BY employee_id")
+
+_STORE_SQL = text(
+    f"INSERT INTO payroll_lines (run_id, {', '.join(LINE_COLUMNS)}) "
+    f"SELECT :run_id, {', '.join(LINE_COLUMNS)} FROM ({_CALC_SQL}) x"
+)
+
+
+def month_bounds(monat: str) -> tuple[date, date]:
+    """'2025-11' → (2025-11-01, 2025-11-30)"""
+    year, month = (int(x) for x in monat.split("-"))
+    last = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last)
+
+
+def install_payroll(conn: Connection) -> None:
+    conn.exec_driver_sql(WERKTAGE_FUNCTION)
+
+
+def _params(db: Session, von: date, bis: date) -> dict:
+    return {
+        "von": von,
+        "bis": bis,
+        "werktage": db.execute(text("SELECT werktage(:von, :bis)"), {"von": von, "bis": bis}).scalar(),
+        "pause": PAUSE_TAETIGKEIT,
+        "pause_key": PAUSE_SCHLUESSEL,
+    }
+
+
+def preview_payroll(db: Session, monat: str) -> dict:
+    """
+    Was-wäre-wenn: rechnet den ganzen Betrieb durch, ohne zu speichern.
+    """
+    von, bis = month_bounds(monat)
+    params = _params(db, von, bis)
+    rows = db.execute(_PREVIEW_SQL, params).mappings().all()
+    return {
+        "id": None,
+        "monat": von,
+        "werktage": params["werktage"],
+        "erstellt_am": None,
+        "erstellt_von": None,
+        "lines": [dict(r) for r in rows],
+    }
+
+
+def create_payroll_run(db: Session, monat: str, erstellt_von: str | None = None) -> models.PayrollRun:
+    """
+    Speichert einen Lauf als Snapshot: Berechnung und Insert in einem Statement.
+    """
+    von, bis = month_bounds(monat)
+    params = _params(db, von, bis)
+
+    run = models.PayrollRun(monat=von, werktage=params["werktage"], erstellt_von=erstellt_von)
+    db.add(run)
+    db.flush()
+
+    db.execute(_STORE_SQL, {**params, "run_id": run.id})
+    db.commit()
+    db.refresh(run)
+    return run
@@ -0,0 +1,68 @@
+# backend/scheduler.py
+"""
+Einfacher Tages-Scheduler im Backend-Prozess.
+
+Jeder Job läuft einmal beim Start (Nachholen nach Ausfällen) und danach
+täglich zur Uhrzeit aus JOB_ZEIT (Standard 05:00, Container-Zeitzone).
+Jobs müssen idempotent sein.
+"""
+import os
+import threading
+from datetime import datetime, time, timedelta
+from typing import Callable
+
+from audit import ensure_audit_partitions
+from changes import prune_tombstones
+from db import SessionLocal
+from sickdays import fill_sick_days
+
+JOB_ZEIT = time.fromisoformat(os.getenv("JOB_ZEIT", "05:00"))
+
+DAILY_JOBS: list[Callable] = [
+    fill_sick_days,
+    ensure_audit_partitions,
+    prune_tombstones,
+]
+
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def run_daily_jobs() -> None:
+    for job in DAILY_JOBS:
+        db = SessionLocal()
+        try:
+            job(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Fehler im Tagesjob {job.__name__}:", e)
+        finally:
+            db.close()
+
+
+def _seconds_until_next_run(now: datetime) -> float:
+    nxt = datetime.combine(now.date(), JOB_ZEIT)
+    if nxt <= now:
+        nxt += timedelta(days=1)
+    return (nxt - now).total_seconds()
+
+
+def _loop() -> None:
+    run_daily_jobs()
+    while not _stop.wait(_seconds_until_next_run(datetime.now())):
+        run_daily_jobs()
+
+
+def start_scheduler() -> None:
+    global _thread
+    if _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="tagesjobs", daemon=True)
+    _thread.start()
+
+
+def stop_scheduler() -> None:
+    global _thread
+    _stop.set()
+    _thread = None
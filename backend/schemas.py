@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 from datetime import date, time, datetime
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, model_validator
 
 # ============================================================
 #  C U S T O M E R
@@ -52,6 +52,7 @@ class CustomerCreate(CustomerBase):
 class CustomerRead(CustomerBase):
     id: int
     erstellt_am: datetime
+    geändert_am: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -76,6 +77,10 @@ class ProjectCreate(ProjectBase):
 class ProjectRead(ProjectBase):
     id: int
     projektpfad: Optional[str] = None
+    archiv_pfad: Optional[str] = None
+    archiviert_am: Optional[datetime] = None
+
+    geändert_am: Optional[datetime] = None
 
     # Anzeigezweck
     customer_firma: Optional[str] = None
@@ -83,6 +88,151 @@ class ProjectRead(ProjectBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class FolderTemplateBase(BaseModel):
+    name: str
+    ist_offerte: bool = False
+    pfade: List[str]
+    vorlagen_dir: Optional[str] = None
+
+
+def _check_pfade(pfade: Optional[List[str]]) -> None:
+    if pfade is not None and not [p for p in pfade if p.strip().strip("/")]:
+        raise ValueError("Mindestens ein Ordner muss angegeben werden.")
+
+
+class FolderTemplateCreate(FolderTemplateBase):
+    """
+    Validierung:
+    - pfade: mindestens ein Ordner (sonst gälte stillschweigend die Standardstruktur)
+    - vorlagen_dir: prüft der Endpunkt (muss unter VORLAGEN_ROOT liegen)
+    """
+
+    @model_validator(mode="after")
+    def validate_required_fields(self):
+        _check_pfade(self.pfade)
+        return self
+
+
+class FolderTemplateUpdate(BaseModel):
+    name: Optional[str] = None
+    ist_offerte: Optional[bool] = None
+    pfade: Optional[List[str]] = None
+    vorlagen_dir: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_required_fields(self):
+        _check_pfade(self.pfade)
+        return self
+
+
+class FolderTemplateRead(FolderTemplateBase):
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============================================================
+#  L I E F E R A N T E N
+# ============================================================
+
+class SupplierBase(BaseModel):
+    firma: str
+    kontaktperson: Optional[str] = None
+    adresse: Optional[str] = None
+    plz: Optional[str] = None
+    ort: Optional[str] = None
+    email: Optional[str] = None
+    telefon: Optional[str] = None
+    webseite: Optional[str] = None
+    taetigkeitsbereiche: List[str] = []
+    notizen: Optional[str] = None
+    aktiv: bool = True
+
+
+class SupplierCreate(SupplierBase):
+    """
+    Validierung:
+    - Pflichtfelder: firma, mindestens ein Tätigkeitsbereich
+    """
+
+    @model_validator(mode="after")
+    def validate_required_fields(self):
+        if not self.firma or not self.firma.strip():
+            raise ValueError("Firma ist ein Pflichtfeld.")
+        if not [t for t in self.taetigkeitsbereiche if t.strip()]:
+            raise ValueError("Mindestens ein Tätigkeitsbereich muss angegeben werden.")
+        return self
+
+
+class SupplierUpdate(BaseModel):
+    firma: Optional[str] = None
+    kontaktperson: Optional[str] = None
+    adresse: Optional[str] = None
+    plz: Optional[str] = None
+    ort: Optional[str] = None
+    email: Optional[str] = None
+    telefon: Optional[str] = None
+    webseite: Optional[str] = None
+    taetigkeitsbereiche: Optional[List[str]] = None
+    notizen: Optional[str] = None
+    aktiv: Optional[bool] = None
+
+
+class SupplierRead(SupplierBase):
+    id: int
+    erstellt_am: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SupplierTotals(BaseModel):
+    supplier_id: int
+    firma: str
+    anzahl: int
+    total: float
+    offen: float
+    bezahlt: float
+    naechste_faelligkeit: Optional[date] = None
+
+
+class SupplierInvoiceBase(BaseModel):
+    supplier_id: int
+    project_id: Optional[int] = None
+    rechnungsnummer: Optional[str] = None
+    rechnungsdatum: date
+    faellig_am: date
+    betrag: float
+    beschreibung: Optional[str] = None
+    # relativ zu <projektpfad>/03_Kaufmännisch/03_Rechnungen/01_Eingang (ohne Projekt: nur Dateiname)
+    datei: Optional[str] = None
+
+
+class SupplierInvoiceCreate(SupplierInvoiceBase):
+    pass
+
+
+class SupplierInvoiceUpdate(BaseModel):
+    supplier_id: Optional[int] = None
+    project_id: Optional[int] = None
+    rechnungsnummer: Optional[str] = None
+    rechnungsdatum: Optional[date] = None
+    faellig_am: Optional[date] = None
+    betrag: Optional[float] = None
+    beschreibung: Optional[str] = None
+    datei: Optional[str] = None
+    bezahlt: Optional[bool] = None
+    bezahlt_am: Optional[date] = None
+
+
+class SupplierInvoiceRead(SupplierInvoiceBase):
+    id: int
+    bezahlt: bool
+    bezahlt_am: Optional[date] = None
+    erstellt_am: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 # ============================================================
 #  M I T A R B E I T E R
 # ============================================================
@@ -119,6 +269,7 @@ class EmployeeBase(BaseModel):
     ferienanspruch: Optional[float] = None
     ferien_guthaben_stunden: Optional[float] = 0.0
     ueberstunden_guthaben: Optional[float] = 0.0
+    saldo_stichtag: Optional[date] = None
 
     # Versicherungen
     bvg_eintritt: Optional[date] = None
@@ -139,6 +290,7 @@ class EmployeeBase(BaseModel):
 
     # Sonstiges
     krankentage: Optional[float] = 0.0
+    krank_seit: Optional[date] = None
     aktiv: Optional[bool] = True
     erstellt_von: Optional[str] = None
 
@@ -181,6 +333,7 @@ class EmployeeUpdate(BaseModel):
     ferienanspruch: Optional[float] = None
     ferien_guthaben_stunden: Optional[float] = None
     ueberstunden_guthaben: Optional[float] = None
+    saldo_stichtag: Optional[date] = None
 
     bvg_eintritt: Optional[date] = None
     bvg_pflichtig: Optional[bool] = None
@@ -197,6 +350,7 @@ class EmployeeUpdate(BaseModel):
     notizen_intern: Optional[str] = None
 
     krankentage: Optional[float] = None
+    krank_seit: Optional[date] = None
     aktiv: Optional[bool] = None
 
     is_admin: Optional[bool] = None
@@ -211,6 +365,37 @@ class EmployeeRead(EmployeeBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ============================================================
+#  T Ä T I G K E I T E N
+# ============================================================
+
+class ActivityBase(BaseModel):
+    name: str
+    aktiv: bool = True
+
+
+class ActivityCreate(ActivityBase):
+    pass
+
+
+class ActivityUpdate(BaseModel):
+    name: Optional[str] = None
+    aktiv: Optional[bool] = None
+
+
+class ActivityRead(ActivityBase):
+    id: int
+    schluessel: Optional[str] = None
+    erstellt_am: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ActivitySuggestion(ActivityRead):
+    # Wie oft der Mitarbeiter diese Tätigkeit gebucht hat
+    anzahl: int
+
+
 # ============================================================
 #  Z E I T E I N T R Ä G E
 # ============================================================
@@ -227,6 +412,7 @@ class TimeEntryBase(BaseModel):
     dauer_stunden: Optional[float] = None
 
     taetigkeit: Optional[str] = None
+    activity_id: Optional[int] = None
     details: Optional[str] = None
     betrag: Optional[float] = None
 
@@ -239,12 +425,19 @@ class TimeEntryCreate(TimeEntryBase):
 
 class TimeEntryRead(TimeEntryBase):
     id: int
+    # Name über activity_id (Umbenennen ändert alte Einträge nicht)
+    taetigkeit: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("anzeige_taetigkeit", "taetigkeit")
+    )
+    # Effektiver Satz beim Schreiben; betrag = dauer_stunden × stundensatz
+    stundensatz: Optional[float] = None
     projektpfad: Optional[str] = None
     customer_firma: Optional[str] = None
     employee_name: Optional[str] = None
     uebermittelt: bool
     uebermittelt_am: Optional[datetime] = None
     erstellt_am: datetime
+    geändert_am: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -257,10 +450,143 @@ class TimeEntryUpdate(BaseModel):
     pause_min: Optional[int] = None
     dauer_stunden: Optional[float] = None
     taetigkeit: Optional[str] = None
+    activity_id: Optional[int] = None
     details: Optional[str] = None
     customer_id: Optional[int] = None
     project_id: Optional[int] = None
     betrag: Optional[float] = None
     # Admin darf das sperren/entsperren
     uebermittelt: Optional[bool] = None
-    uebermittelt_am: Optional[datetime] = None
\ No newline at end of file
+    uebermittelt_am: Optional[datetime] = None
+
+
+# ============================================================
+#  O F F L I N E - S Y N C
+# ============================================================
+
+class StampEvent(BaseModel):
+    # Vom Client erzeugte, eindeutige ID (Idempotenz-Schlüssel)
+    id: str
+    typ: Literal["start", "pause", "stop"]
+    employee_id: int
+    datum: date
+    zeit: time
+
+    # nur für "start"
+    customer_id: Optional[int] = None
+    project_id: Optional[int] = None
+    taetigkeit: Optional[str] = None
+    activity_id: Optional[int] = None
+    details: Optional[str] = None
+
+
+class SyncRequest(BaseModel):
+    events: List[StampEvent]
+
+
+class SyncResult(BaseModel):
+    id: str
+    status: str                     # "ok" / "ignoriert" / "konflikt"
+    meldung: Optional[str] = None
+    time_entry_id: Optional[int] = None
+
+
+class SyncResponse(BaseModel):
+    ergebnisse: List[SyncResult]
+    # Laufender Eintrag je betroffenem Mitarbeiter (Serverstand nach dem Sync)
+    running: dict[int, Optional[TimeEntryRead]]
+
+
+# ============================================================
+#  C H A N G E - F E E D
+# ============================================================
+
+class DeletedRowRead(BaseModel):
+    tabelle: str
+    row_id: int
+    geloescht_am: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChangesResponse(BaseModel):
+    # Beim nächsten Aufruf als ?since=<token> mitgeben ("<xid>.<seq>")
+    token: str
+    # True = Limit erreicht, sofort mit neuem Token weiterholen
+    mehr: bool
+    customers: List[CustomerRead]
+    projects: List[ProjectRead]
+    timeentries: List[TimeEntryRead]
+    deleted: List[DeletedRowRead]
+
+
+# ============================================================
+#  L O H N L A U F
+# ============================================================
+
+class PayrollLineRead(BaseModel):
+    employee_id: int
+    name: Optional[str] = None
+    lohnart: Optional[str] = None
+    lohn: Optional[float] = None
+    pensum: Optional[float] = None
+    dreizehnter: Optional[bool] = None
+    kadervertrag: Optional[bool] = None
+    bvg_pflichtig: Optional[bool] = None
+    kinderanzahl: Optional[int] = None
+
+    stunden_soll: float
+    stunden_ist: float
+    ueberstunden: float
+    brutto: float
+    rueckstellung_13: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PayrollRunRead(BaseModel):
+    # id = None → Was-wäre-wenn-Lauf (nicht gespeichert)
+    id: Optional[int] = None
+    monat: date
+    werktage: int
+    erstellt_am: Optional[datetime] = None
+    erstellt_von: Optional[str] = None
+    lines: List[PayrollLineRead] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============================================================
+#  A U D I T
+# ============================================================
+
+class AuditLogRead(BaseModel):
+    id: int
+    zeit: datetime
+    tabelle: str
+    row_id: int
+    aktion: str
+    diff: Dict[str, Any]
+    txid: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============================================================
+#  S A L D E N
+# ============================================================
+
+class BalanceRead(BaseModel):
+    employee_id: int
+    name: Optional[str] = None
+    stichtag: Optional[date] = None     # Beginn der Saldoberechnung (Vortrag)
+    datum: date                         # Saldo per (inkl.)
+
+    stunden_ist: float
+    stunden_uebermittelt: float
+    stunden_soll: float
+    ueberstunden_saldo: float
+
+    ferien_anspruch: float
+    ferien_bezogen: float
+    ferien_saldo: float
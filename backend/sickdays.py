@@ -0,0 +1,165 @@
+# backend/sickdays.py
+"""
+Krank-Funktion: Für krank gemeldete Mitarbeiter werden die Soll-Stunden
+jedes Arbeitstags automatisch mit Kunde "Intern" und Tätigkeit "Krank"
+gebucht, bis der Mitarbeiter wieder einstempelt.
+
+Gebucht wird nur bis gestern – der laufende Tag erst beim nächsten Lauf, so
+bekommt der Tag der Rückkehr keinen Krank-Eintrag. krank_gebucht_bis merkt
+sich, bis wohin schon gebucht wurde; von Hand gelöschte Krank-Einträge
+werden darum nicht erneut angelegt und nicht doppelt gezählt.
+"""
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+from activities import SYSTEM_ACTIVITIES, system_activity
+
+KRANK_SCHLUESSEL = "krank"
+KRANK_TAETIGKEIT = SYSTEM_ACTIVITIES[KRANK_SCHLUESSEL]
+KRANK_QUELLE = "krank"
+INTERN_KUNDE = os.getenv("INTERN_KUNDE", "Intern")
+
+# Verhindert doppelte Läufe, wenn mehrere Prozesse den Job starten
+_LOCK_KEY = 280001
+
+# Ein Statement für alle (bzw. einen) kranken Mitarbeiter:
+# - alle Werktage (Mo–Fr) ab krank_seit bzw. nach krank_gebucht_bis bis :bis
+#   (höchstens bis zum Austritt), die noch keinen Krank-Eintrag haben
+# - Stunden/Tag = stunden_pro_woche * pensum / 100 / 5
+# - krankentage und die Nutzungszähler (activity_usage) werden um die Anzahl
+#   neu gebuchter Tage erhöht (kein Neuzählen)
+# Die Tätigkeit wird über ihren Schlüssel gesucht, nicht über den Namen.
+_FILL_SQL = text("""
+WITH intern AS (
+    SELECT id, stundensatz_standard FROM customers WHERE firma = :intern_kunde ORDER BY id LIMIT 1
+),
+krank AS (
+    SELECT id, name FROM activities WHERE schluessel = :schluessel
+),
+kranke AS (
+    SELECT
+        e.id,
+        COALESCE(e.stunden_pro_woche, 42) * COALESCE(e.pensum, 100) / 100.0 / 5.0 AS soll_tag,
+        GREATEST(e.krank_seit, e.krank_gebucht_bis + 1) AS von,
+        LEAST(CAST(:bis AS date), COALESCE(e.austrittsdatum, CAST(:bis AS date))) AS bis
+    FROM employees e
+    WHERE e.krank_seit IS NOT NULL
+      AND e.aktiv IS TRUE
+      AND (CAST(:employee_id AS integer) IS NULL OR e.id = :employee_id)
+),
+ins AS (
+    INSERT INTO time_entries (
+        employee_id, customer_id, datum, dauer_stunden_manuell,
+        taetigkeit, activity_id, stundensatz, quelle_system, uebermittelt, erstellt_am
+    )
+    SELECT
+        k.id,
+        (SELECT id FROM intern),
+        d.tag::date,
+        k.soll_tag,
+        COALESCE((SELECT name FROM krank), :taetigkeit),
+        (SELECT id FROM krank),
+        (SELECT stundensatz_standard FROM intern),
+        :quelle,
+        FALSE,
+        now() AT TIME ZONE 'utc'
+    FROM kranke k
+    CROSS JOIN LATERAL generate_series(k.von, k.bis, interval '1 day') AS d(tag)
+    WHERE EXTRACT(ISODOW FROM d.tag) < 6
+      AND NOT EXISTS (
+          SELECT 1 FROM time_entries t
+          WHERE t.employee_id = k.id
+            AND t.datum = d.tag::date
+            AND (t.activity_id = (SELECT id FROM krank) OR t.taetigkeit = :taetigkeit)
+      )
+    RETURNING employee_id, activity_id
+),
+usage AS (
+    INSERT INTO activity_usage AS u (employee_id, activity_id, anzahl, zuletzt)
+    SELECT employee_id, activity_id, count(*), now() AT TIME ZONE 'utc'
+    FROM ins
+    WHERE activity_id IS NOT NULL
+    GROUP BY employee_id, activity_id
+    ON CONFLICT (employee_id, activity_id) DO UPDATE SET
+        anzahl = u.anzahl + EXCLUDED.anzahl,
+        zuletzt = EXCLUDED.zuletzt
+)
+UPDATE employees e
+SET krankentage = COALESCE(e.krankentage, 0) + COALESCE(c.n, 0),
+    krank_gebucht_bis = GREATEST(e.krank_gebucht_bis, k.bis)
+FROM kranke k
+LEFT JOIN (SELECT employee_id, count(*) AS n FROM ins GROUP BY employee_id) c
+    ON c.employee_id = k.id
+WHERE e.id = k.id
+""")
+
+# Rückkehr: automatisch gebuchte Krank-Tage ab dem Tag der Rückkehr entfernen
+_END_SQL = text("""
+WITH del AS (
+    DELETE FROM time_entries
+    WHERE employee_id = :employee_id
+      AND datum >= :ab
+      AND quelle_system = :quelle
+    RETURNING id, activity_id
+),
+usage AS (
+    UPDATE activity_usage u
+    SET anzahl = GREATEST(u.anzahl - c.n, 0)
+    FROM (SELECT activity_id, count(*) AS n FROM del GROUP BY activity_id) c
+    WHERE u.employee_id = :employee_id AND u.activity_id = c.activity_id
+)
+UPDATE employees
+SET krankentage = GREATEST(COALESCE(krankentage, 0) - (SELECT count(*) FROM del), 0),
+    krank_seit = NULL,
+    krank_gebucht_bis = NULL
+WHERE id = :employee_id
+""")
+
+
+def _params(**kw) -> dict:
+    return {
+        "intern_kunde": INTERN_KUNDE,
+        "schluessel": KRANK_SCHLUESSEL,
+        "taetigkeit": KRANK_TAETIGKEIT,
+        "quelle": KRANK_QUELLE,
+        **kw,
+    }
+
+
+def is_sick_entry(db: Session, entry: models.TimeEntry) -> bool:
+    act = system_activity(db, KRANK_SCHLUESSEL)
+    if act is not None and entry.activity_id is not None:
+        return entry.activity_id == act.id
+    return entry.taetigkeit == KRANK_TAETIGKEIT
+
+
+def fill_sick_days(db: Session, heute: date | None = None) -> int:
+    """
+    Bucht fehlende Krank-Tage bis einschliesslich gestern (bezogen auf `heute`).
+    Gibt die Anzahl bearbeiteter kranker Mitarbeiter zurück.
+    """
+    heute = heute or date.today()
+    db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_KEY})
+    result = db.execute(_FILL_SQL, _params(bis=heute - timedelta(days=1), employee_id=None))
+    db.commit()
+    return result.rowcount
+
+
+def end_sick_period(db: Session, emp, datum: date) -> None:
+    """
+    Mitarbeiter arbeitet wieder ab `datum` (ohne Commit): Krank-Tage davor
+    noch nachbuchen, automatische Krank-Einträge ab `datum` löschen und die
+    Krankmeldung beenden.
+    """
+    ab = min(datum, date.today())
+    db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_KEY})
+    db.execute(_FILL_SQL, _params(bis=ab - timedelta(days=1), employee_id=emp.id))
+    db.execute(
+        _END_SQL,
+        {"quelle": KRANK_QUELLE, "ab": ab, "employee_id": emp.id},
+    )
+    db.expire(emp, ["krankentage", "krank_seit", "krank_gebucht_bis"])
@@ -0,0 +1,291 @@
+# backend/snapshot.py
+"""
+Vollständiger Daten-Snapshot (Export/Import) – statt "rm -rf db" bei
+Schemaänderungen.
+
+Export: alle Tabellen in FK-Reihenfolge, innerhalb EINER Transaktion
+(REPEATABLE READ → konsistenter Stand), per COPY … TO STDOUT als CSV
+gestreamt und je Tabelle gzip-komprimiert. Das Archiv ist ein .tar mit
+einem Member pro Tabelle plus manifest.json (Spalten, Zeilenzahl, SHA-256
+des CSV-Stroms).
+
+Import: in eine frische DB (Schema per run_migrations), Trigger und
+FK-Prüfungen während des Ladens aus (session_replication_role = replica),
+Daten per COPY … FROM STDIN, danach Sequenzen nachziehen und jede Tabelle
+erneut per COPY auslesen → Zeilenzahl und Prüfsumme müssen mit dem Manifest
+übereinstimmen, sonst Rollback. Alles in konstantem Speicher.
+
+    python snapshot.py export /srv/stech/backup/stech_2025-11-30.tar
+    python snapshot.py import /srv/stech/backup/stech_2025-11-30.tar
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import tarfile
+import tempfile
+import time
+from datetime import date, datetime
+
+from sqlalchemy import Integer
+from sqlalchemy.engine import Connection
+
+from audit import ensure_partitions
+from db import NO_IDLE_TX_TIMEOUT, Base, engine
+from migrations import run_migrations
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+GZIP_LEVEL = 6
+
+# Diese Tabellen müssen für einen Import leer sein (sonst --force)
+_CORE_TABLES = ["customers", "projects", "employees", "time_entries"]
+
+# change_xid stammt aus dem alten Cluster und wäre in der neuen DB bedeutungslos.
+# '2' = FrozenTransactionId → Zeilen gelten für den Change-Feed als committed.
+_COLUMN_OVERRIDES = {"change_xid": "'2'::xid8"}
+
+
+class _HashingWriter:
+    """
+    Dateiobjekt für copy_expert: hasht den CSV-Strom und leitet ihn weiter.
+    """
+
+    def __init__(self, target=None):
+        self._target = target
+        self.sha = hashlib.sha256()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.sha.update(data)
+        if self._target is not None:
+            self._target.write(data)
+        return len(data)
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table_columns(conn: Connection, table: str) -> list[str]:
+    # Generierte Spalten können nicht per COPY geschrieben werden
+    return list(conn.exec_driver_sql(
+        "SELECT attname FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attnum > 0 "
+        "AND NOT attisdropped AND attgenerated = '' ORDER BY attnum",
+        (table,),
+    ).scalars())
+
+
+def _select_sql(table, columns: list[str]) -> str:
+    cols = ", ".join(
+        f"{_COLUMN_OVERRIDES[c]} AS {_q(c)}" if c in _COLUMN_OVERRIDES else _q(c)
+        for c in columns
+    )
+    order = ", ".join(_q(c.name) for c in table.primary_key.columns)
+    return f"SELECT {cols} FROM {_q(table.name)} ORDER BY {order}"
+
+
+def _copy_out(conn: Connection, sql: str, writer) -> None:
+    cur = conn.connection.cursor()
+    try:
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", writer)
+    finally:
+        cur.close()
+
+
+def _set_output_format(conn: Connection) -> None:
+    # Gleiche Textdarstellung beim Export und bei der Prüfung nach dem Import
+    conn.exec_driver_sql("SET LOCAL datestyle = 'ISO, YMD'")
+    conn.exec_driver_sql("SET LOCAL timezone = 'UTC'")
+    conn.exec_driver_sql("SET LOCAL extra_float_digits = 1")
+
+
+def export_snapshot(path: str) -> dict:
+    manifest = {
+        "version": FORMAT_VERSION,
+        "erstellt_am": datetime.utcnow().isoformat(),
+        "tabellen": [],
+    }
+    opts = {"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+    with engine.connect().execution_options(**opts) as conn, tarfile.open(path, mode="w") as tar:
+        _set_output_format(conn)
+        # Zwischen den Tabellen wird nur lokal geschrieben; lesend → kein xid
+        conn.exec_driver_sql(NO_IDLE_TX_TIMEOUT)
+
+        for table in Base.metadata.sorted_tables:
+            t0 = time.perf_counter()
+            columns = _table_columns(conn, table.name)
+            sql = _select_sql(table, columns)
+            rows = conn.exec_driver_sql(f"SELECT count(*) FROM {_q(table.name)}").scalar()
+
+            member = f"{len(manifest['tabellen']):02d}_{table.name}.csv.gz"
+            with tempfile.TemporaryFile() as tmp:
+                with gzip.GzipFile(fileobj=tmp, mode="wb", compresslevel=GZIP_LEVEL) as gz:
+                    writer = _HashingWriter(gz)
+                    _copy_out(conn, sql, writer)
+                info = tarfile.TarInfo(member)
+                info.size = tmp.tell()
+                info.mtime = int(time.time())
+                tmp.seek(0)
+                tar.addfile(info, tmp)
+
+            entry = {
+                "name": table.name,
+                "datei": member,
+                "spalten": columns,
+                "zeilen": rows,
+                "sha256": writer.sha.hexdigest(),
+            }
+            if table.name == "audit_log":
+                ab = conn.exec_driver_sql("SELECT min(zeit) FROM audit_log").scalar()
+                entry["ab"] = ab.date().isoformat() if ab else None
+            manifest["tabellen"].append(entry)
+            print(f"{table.name:<22} {rows:>10} Zeilen  {time.perf_counter() - t0:6.1f}s")
+
+        data = json.dumps(manifest, indent=2, ensure_ascii=False).encode()
+        info = tarfile.TarInfo(MANIFEST)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+
+    return manifest
+
+
+def _reset_sequences(conn: Connection) -> None:
+    for table in Base.metadata.sorted_tables:
+        for col in table.primary_key.columns:
+            if not isinstance(col.type, Integer):
+                continue
+            conn.exec_driver_sql(
+                f"SELECT setval(seq, COALESCE(m, 1), m IS NOT NULL) FROM "
+                f"(SELECT pg_get_serial_sequence(%s, %s) AS seq, "
+                f"(SELECT max({_q(col.name)}) FROM {_q(table.name)}) AS m) s "
+                f"WHERE seq IS NOT NULL",
+                (table.name, col.name),
+            )
+    # Globale Sequenz des Change-Feeds über alle Tabellen mit change_seq
+    conn.exec_driver_sql(
+        "SELECT setval('change_seq', GREATEST("
+        "(SELECT COALESCE(max(change_seq), 0) FROM customers), "
+        "(SELECT COALESCE(max(change_seq), 0) FROM projects), "
+        "(SELECT COALESCE(max(change_seq), 0) FROM time_entries), "
+        "(SELECT COALESCE(max(change_seq), 0) FROM deleted_rows), 1))"
+    )
+
+
+def _check_manifest(conn: Connection, manifest: dict) -> None:
+    """
+    Vor dem TRUNCATE: jede Tabelle und Spalte des Snapshots muss es im
+    aktuellen Schema geben. Fehlende Spalten im Snapshot sind ok, solange
+    sie NULL oder einen Default zulassen (Snapshot aus älterer Version).
+    """
+    tables = {t.name for t in Base.metadata.sorted_tables}
+    fehler = []
+    for t in manifest["tabellen"]:
+        if t["name"] not in tables:
+            fehler.append(f"Tabelle {t['name']} gibt es im aktuellen Schema nicht mehr")
+            continue
+        vorhanden = _table_columns(conn, t["name"])
+        for col in t["spalten"]:
+            if col not in vorhanden:
+                fehler.append(f"Spalte {t['name']}.{col} gibt es im aktuellen Schema nicht mehr")
+        pflicht = conn.exec_driver_sql(
+            "SELECT attname FROM pg_attribute a "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped "
+            "AND attgenerated = '' AND attnotnull AND NOT atthasdef AND attidentity = ''",
+            (t["name"],),
+        ).scalars()
+        for col in pflicht:
+            if col not in t["spalten"]:
+                fehler.append(f"Pflichtspalte {t['name']}.{col} fehlt im Snapshot")
+    if fehler:
+        raise ValueError("Snapshot passt nicht zum Schema:\n  " + "\n  ".join(fehler))
+
+
+def import_snapshot(path: str, force: bool = False) -> dict:
+    # Schema (Tabellen, Trigger, Partitionen) auf aktuellen Stand bringen
+    run_migrations(engine)
+
+    with tarfile.open(path, mode="r") as tar:
+        manifest = json.load(tar.extractfile(MANIFEST))
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unbekannte Snapshot-Version: {manifest.get('version')}")
+
+        with engine.begin() as conn:
+            _check_manifest(conn, manifest)
+            if not force:
+                for name in _CORE_TABLES:
+                    if conn.exec_driver_sql(f"SELECT EXISTS (SELECT 1 FROM {_q(name)})").scalar():
+                        raise ValueError(f"Tabelle {name} ist nicht leer (--force zum Überschreiben)")
+
+            # Trigger (Change-Feed, Audit, Append-only) und FK-Prüfungen aus
+            conn.exec_driver_sql("SET LOCAL session_replication_role = replica")
+            _set_output_format(conn)
+
+            names = [t["name"] for t in manifest["tabellen"]]
+            # Von den Migrationen angelegte Standarddaten (Tätigkeiten, Templates) ersetzen
+            conn.exec_driver_sql(
+                f"TRUNCATE {', '.join(_q(n) for n in names)} RESTART IDENTITY CASCADE"
+            )
+            for t in manifest["tabellen"]:
+                if t["name"] == "audit_log" and t.get("ab"):
+                    ensure_partitions(conn, ab=date.fromisoformat(t["ab"]))
+
+            cur = conn.connection.cursor()
+            try:
+                for t in manifest["tabellen"]:
+                    t0 = time.perf_counter()
+                    cols = ", ".join(_q(c) for c in t["spalten"])
+                    with gzip.GzipFile(fileobj=tar.extractfile(t["datei"]), mode="rb") as gz:
+                        cur.copy_expert(
+                            f"COPY {_q(t['name'])} ({cols}) FROM STDIN WITH (FORMAT csv)", gz
+                        )
+                    print(f"{t['name']:<22} {t['zeilen']:>10} Zeilen  {time.perf_counter() - t0:6.1f}s")
+            finally:
+                cur.close()
+
+            _reset_sequences(conn)
+            if "balance_totals" not in names:
+                # Snapshot aus einer Version ohne laufende Saldo-Summen
+                conn.exec_driver_sql("SELECT balance_rebuild_total(id) FROM employees")
+
+            # Prüfung: gleiche Abfrage wie beim Export → gleiche Bytes
+            tables = {t.name: t for t in Base.metadata.sorted_tables}
+            for t in manifest["tabellen"]:
+                rows = conn.exec_driver_sql(f"SELECT count(*) FROM {_q(t['name'])}").scalar()
+                writer = _HashingWriter()
+                _copy_out(conn, _select_sql(tables[t["name"]], t["spalten"]), writer)
+                sha_ok = writer.sha.hexdigest() == t["sha256"]
+                if rows != t["zeilen"] or not sha_ok:
+                    raise ValueError(
+                        f"Prüfung fehlgeschlagen für {t['name']}: {rows}/{t['zeilen']} Zeilen, "
+                        f"Prüfsumme {'ok' if sha_ok else 'falsch'}"
+                    )
+            print("Zeilenzahlen und Prüfsummen stimmen.")
+
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="STech Daten-Snapshot")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_exp = sub.add_parser("export", help="alle Tabellen in ein .tar schreiben")
+    p_exp.add_argument("datei")
+    p_imp = sub.add_parser("import", help="Snapshot in eine frische DB laden")
+    p_imp.add_argument("datei")
+    p_imp.add_argument("--force", action="store_true", help="vorhandene Daten überschreiben")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.cmd == "export":
+        export_snapshot(args.datei)
+    else:
+        import_snapshot(args.datei, force=args.force)
+    print(f"Fertig in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
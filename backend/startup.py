@@ -0,0 +1,149 @@
+# backend/startup.py
+"""
+Start des Backends und Health-Checks.
+
+Beim Import passiert nichts mit der DB. Erst das Startup-Event wartet auf die
+DB (Retry mit Backoff), führt Schema/Migrationen aus und wärmt den
+Connection-Pool vor. Die Dauer jeder Phase wird beim Start ausgegeben und
+unter /health/ready mitgeliefert.
+"""
+import os
+import time
+
+# Referenzzeitpunkt der Kaltstart-Messung: vor den Backend-Imports gesetzt,
+# main.py importiert dieses Modul als erstes Backend-Modul
+_T0 = time.perf_counter()
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from filesystem import BASE_DIR  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "10"))
+DB_CONNECT_BACKOFF = float(os.getenv("DB_CONNECT_BACKOFF", "0.25"))
+DB_CONNECT_BACKOFF_MAX = float(os.getenv("DB_CONNECT_BACKOFF_MAX", "5"))
+POOL_WARMUP = int(os.getenv("POOL_WARMUP", "2"))
+
+# Messwerte des Starts in Millisekunden; "bereit" erst nach erfolgreichem Start
+STARTUP: dict = {"bereit": False, "phasen_ms": {}}
+
+
+def _mark(phase: str, t_start: float) -> float:
+    now = time.perf_counter()
+    STARTUP["phasen_ms"][phase] = round((now - t_start) * 1000, 1)
+    return now
+
+
+def wait_for_db(engine: Engine) -> int:
+    """
+    Wartet, bis die DB Verbindungen annimmt (exponentieller Backoff).
+    Gibt die Anzahl Versuche zurück; nach DB_CONNECT_RETRIES wird abgebrochen.
+    """
+    delay = DB_CONNECT_BACKOFF
+    for attempt in range(1, DB_CONNECT_RETRIES + 1):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return attempt
+        except OperationalError as e:
+            if attempt == DB_CONNECT_RETRIES:
+                raise
+            print(f"DB nicht erreichbar (Versuch {attempt}/{DB_CONNECT_RETRIES}), "
+                  f"neuer Versuch in {delay:.2f}s:", e.orig)
+            time.sleep(delay)
+            delay = min(delay * 2, DB_CONNECT_BACKOFF_MAX)
+    return DB_CONNECT_RETRIES
+
+
+def warm_pool(engine: Engine, n: int = POOL_WARMUP) -> int:
+    """
+    Hält n Verbindungen gleichzeitig offen und gibt sie an den Pool zurück,
+    damit die ersten Requests nicht den Verbindungsaufbau bezahlen.
+    """
+    conns = []
+    try:
+        for _ in range(n):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+def _ping(engine: Engine) -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except OperationalError:
+        return False
+
+
+def startup(engine: Engine, read_engine: Engine | None = None) -> None:
+    t = time.perf_counter()
+    STARTUP["phasen_ms"]["import"] = round((t - _T0) * 1000, 1)
+
+    STARTUP["db_versuche"] = wait_for_db(engine)
+    t = _mark("db_verbindung", t)
+
+    run_migrations(engine)
+    t = _mark("schema", t)
+
+    STARTUP["pool_vorgewaermt"] = warm_pool(engine)
+    if read_engine is not None and read_engine is not engine:
+        # Replikat: gleiches Warten/Vorwärmen, Schema kommt per Replikation
+        STARTUP["replikat_versuche"] = wait_for_db(read_engine)
+        STARTUP["replikat_pool_vorgewaermt"] = warm_pool(read_engine)
+    t = _mark("pool", t)
+
+    STARTUP["kaltstart_ms"] = round((t - _T0) * 1000, 1)
+    STARTUP["bereit"] = True
+    phasen = ", ".join(f"{k} {v} ms" for k, v in STARTUP["phasen_ms"].items())
+    print(f"Backend bereit nach {STARTUP['kaltstart_ms']} ms ({phasen})")
+
+
+def misrouted_writes(app, read_deps: set) -> list[str]:
+    """
+    Schreibende Endpunkte, die eine Lese-Session (Replikat) bekommen –
+    muss leer sein; wird beim Start geprüft.
+    """
+    from fastapi.routing import APIRoute
+
+    falsch = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.methods - {"GET", "HEAD"}:
+            continue
+        if any(d.call in read_deps for d in route.dependant.dependencies):
+            falsch.append(f"{','.join(sorted(route.methods))} {route.path}")
+    return falsch
+
+
+def share_available() -> bool:
+    return BASE_DIR.is_dir() and os.access(BASE_DIR, os.W_OK | os.X_OK)
+
+
+def check_ready(engine: Engine, read_engine: Engine | None = None) -> dict:
+    """
+    Ergebnis für /health/ready: Start abgeschlossen, DB (und ggf. Replikat)
+    antwortet, Projektablage beschreibbar.
+    """
+    checks = {
+        "startup": STARTUP["bereit"],
+        "db": _ping(engine),
+        "projektablage": share_available(),
+    }
+    pool = {"primaer": engine.pool.status()}
+    if read_engine is not None and read_engine is not engine:
+        checks["replikat"] = _ping(read_engine)
+        pool["replikat"] = read_engine.pool.status()
+
+    return {
+        "ok": all(checks.values()),
+        "checks": checks,
+        "pool": pool,
+        "startup": STARTUP,
+    }
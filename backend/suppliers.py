@@ -0,0 +1,94 @@
+# backend/suppliers.py
+"""
+Lieferanten & Eingangsrechnungen: Abfragen, die auf die Indizes in
+models.py ausgelegt sind (GIN auf Tätigkeitsbereiche, Teilindex auf offene
+Rechnungen nach Fälligkeit).
+"""
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+import models
+
+# Eingangsrechnungen im Projektordner
+INVOICE_FOLDER = "03_Kaufmännisch/03_Rechnungen/01_Eingang"
+
+
+def normalize_tags(tags: list[str] | None) -> list[str]:
+    """
+    Kleinschreibung, Leerzeichen weg, Duplikate raus – damit "Pneumatik"
+    und "pneumatik " derselbe Tag sind.
+    """
+    seen = []
+    for t in tags or []:
+        t = t.strip().lower()
+        if t and t not in seen:
+            seen.append(t)
+    return seen
+
+
+def check_invoice_file(project: models.Project | None, datei: str) -> None:
+    """
+    datei ist relativ zu <projektpfad>/INVOICE_FOLDER und darf dort nicht
+    heraus (kein "..", kein absoluter Pfad). Ohne Projektordner nur Dateiname.
+    """
+    if project is None or not project.projektpfad:
+        if Path(datei).name != datei:
+            raise ValueError("Datei: nur Dateiname ohne Pfad angeben.")
+        return
+    base = (Path(project.projektpfad) / INVOICE_FOLDER).resolve()
+    path = (base / datei).resolve()
+    if base not in path.parents:
+        raise ValueError(f"Datei muss unter {INVOICE_FOLDER} im Projektordner liegen.")
+
+
+def find_suppliers(db: Session, taetigkeit: str | None = None, nur_aktive: bool = True):
+    q = db.query(models.Supplier)
+    if nur_aktive:
+        q = q.filter(models.Supplier.aktiv.is_(True))
+    if taetigkeit:
+        tags = normalize_tags([taetigkeit])
+        q = q.filter(models.Supplier.taetigkeitsbereiche.contains(tags))
+    return q.order_by(models.Supplier.firma).all()
+
+
+def open_invoices(
+    db: Session,
+    faellig_bis: date | None = None,
+    supplier_id: int | None = None,
+    project_id: int | None = None,
+):
+    q = db.query(models.SupplierInvoice).filter(models.SupplierInvoice.bezahlt.is_(False))
+    if faellig_bis:
+        q = q.filter(models.SupplierInvoice.faellig_am <= faellig_bis)
+    if supplier_id:
+        q = q.filter(models.SupplierInvoice.supplier_id == supplier_id)
+    if project_id:
+        q = q.filter(models.SupplierInvoice.project_id == project_id)
+    return q.order_by(models.SupplierInvoice.faellig_am.asc()).all()
+
+
+def supplier_totals(db: Session, supplier_id: int | None = None) -> list[dict]:
+    """
+    Summen pro Lieferant in einer Aggregat-Abfrage.
+    """
+    SI = models.SupplierInvoice
+    q = (
+        db.query(
+            models.Supplier.id.label("supplier_id"),
+            models.Supplier.firma,
+            func.count(SI.id).label("anzahl"),
+            func.coalesce(func.sum(SI.betrag), 0).label("total"),
+            func.coalesce(func.sum(case((SI.bezahlt.is_(False), SI.betrag), else_=0)), 0).label("offen"),
+            func.coalesce(func.sum(case((SI.bezahlt.is_(True), SI.betrag), else_=0)), 0).label("bezahlt"),
+            func.min(case((SI.bezahlt.is_(False), SI.faellig_am))).label("naechste_faelligkeit"),
+        )
+        .outerjoin(SI, SI.supplier_id == models.Supplier.id)
+        .group_by(models.Supplier.id, models.Supplier.firma)
+        .order_by(models.Supplier.firma)
+    )
+    if supplier_id:
+        q = q.filter(models.Supplier.id == supplier_id)
+    return [dict(r._mapping) for r in q.all()]
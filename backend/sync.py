@@ -0,0 +1,200 @@
+# backend/sync.py
+"""
+Offline-Stempeln: Der Client sammelt Start/Pause/Stop-Events lokal und
+schickt sie gebündelt an /timeentries/sync. Hier werden sie der Reihe nach
+mit derselben Logik wie beim Live-Stempeln angewendet.
+"""
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+from activities import PAUSE_TAETIGKEIT, assign_activity, bump_usage
+from billing import apply_rate
+from crud_timeentries import check_no_overlap, get_running_entry
+from schemas import StampEvent
+from sickdays import end_sick_period, is_sick_entry
+
+SYNC_QUELLE = "offline-sync"
+
+
+def _close_entry(db: Session, entry: models.TimeEntry, ev: StampEvent) -> None:
+    start_ts = datetime.combine(entry.datum, entry.start)
+    event_ts = datetime.combine(ev.datum, ev.zeit)
+
+    if event_ts < start_ts:
+        raise HTTPException(
+            status_code=409,
+            detail="Stopp liegt vor dem Start des laufenden Eintrags.",
+        )
+    if event_ts - start_ts >= timedelta(days=1):
+        raise HTTPException(
+            status_code=409,
+            detail="Laufender Eintrag ist älter als 24 h – bitte manuell korrigieren.",
+        )
+
+    check_no_overlap(
+        db=db,
+        employee_id=entry.employee_id,
+        datum=entry.datum,
+        start=entry.start,
+        ende=ev.zeit,
+        entry_id=entry.id,
+    )
+    entry.ende = ev.zeit
+    db.flush()
+
+
+def _open_entry(db: Session, ev: StampEvent, pause: bool = False) -> models.TimeEntry:
+    # Offline-Start darf nicht in einem bereits abgeschlossenen Eintrag liegen
+    # (geprüft wird die erste Sekunde ab Start)
+    check_no_overlap(
+        db=db,
+        employee_id=ev.employee_id,
+        datum=ev.datum,
+        start=ev.zeit,
+        ende=(datetime.combine(ev.datum, ev.zeit) + timedelta(seconds=1)).time(),
+    )
+    entry = models.TimeEntry(
+        employee_id=ev.employee_id,
+        customer_id=None if pause else ev.customer_id,
+        project_id=None if pause else ev.project_id,
+        datum=ev.datum,
+        start=ev.zeit,
+        taetigkeit=PAUSE_TAETIGKEIT if pause else ev.taetigkeit,
+        activity_id=None if pause else ev.activity_id,
+        details=None if pause else ev.details,
+        externe_id=ev.id,
+        quelle_system=SYNC_QUELLE,
+        uebermittelt=False,
+    )
+    assign_activity(db, entry)
+    bump_usage(db, entry.employee_id, entry.activity_id)
+    apply_rate(db, entry)
+    db.add(entry)
+    db.flush()
+    return entry
+
+
+def _apply_event(db: Session, emp: models.Employee, ev: StampEvent):
+    """
+    Gibt (status, meldung, time_entry) zurück.
+    """
+    running = get_running_entry(db, ev.employee_id)
+
+    if ev.typ == "stop":
+        if running is None:
+            return "ignoriert", "Kein laufender Eintrag.", None
+        _close_entry(db, running, ev)
+        return "ok", None, running
+
+    if ev.typ == "pause":
+        # laufende Pause → beenden
+        if running is not None and running.taetigkeit == PAUSE_TAETIGKEIT:
+            _close_entry(db, running, ev)
+            return "ok", None, running
+        # laufende Arbeit → beenden und Pause starten
+        if running is not None:
+            _close_entry(db, running, ev)
+        return "ok", None, _open_entry(db, ev, pause=True)
+
+    # start: laufenden Eintrag stoppen, neuen starten
+    if running is not None:
+        _close_entry(db, running, ev)
+    entry = _open_entry(db, ev)
+
+    # Erstes Einstempeln beendet eine Krankmeldung
+    if (
+        emp.krank_seit is not None
+        and not is_sick_entry(db, entry)
+        and entry.datum >= emp.krank_seit
+    ):
+        end_sick_period(db, emp, entry.datum)
+    return "ok", None, entry
+
+
+def _result(se: models.SyncEvent) -> dict:
+    return {
+        "id": se.id,
+        "status": se.status,
+        "meldung": se.meldung,
+        "time_entry_id": se.time_entry_id,
+    }
+
+
+def _claim_event(db: Session, ev: StampEvent) -> bool:
+    """
+    Reserviert die Event-ID. Schickt ein zweiter Request dasselbe Event
+    gleichzeitig, wartet das INSERT auf dessen Commit und liefert False.
+    """
+    stmt = (
+        insert(models.SyncEvent)
+        .values(id=ev.id, employee_id=ev.employee_id, typ=ev.typ, status="konflikt")
+        .on_conflict_do_nothing(index_elements=["id"])
+        .returning(models.SyncEvent.id)
+    )
+    return db.execute(stmt).first() is not None
+
+
+def apply_stamp_events(db: Session, events: list[StampEvent]) -> list[dict]:
+    """
+    Wendet die Events in der gelieferten Reihenfolge an (ohne Commit).
+    - Bereits bekannte Event-IDs werden nicht erneut gebucht, auch nicht
+      bei gleichzeitigen Requests (ON CONFLICT → gespeichertes Ergebnis).
+    - Konflikte (Überschneidung, Stopp vor Start …) werden pro Event per
+      Savepoint zurückgerollt und gemeldet, der Rest des Batches läuft weiter.
+    """
+    ids = [ev.id for ev in events]
+    known = {
+        se.id: se
+        for se in db.query(models.SyncEvent).filter(models.SyncEvent.id.in_(ids))
+    }
+    employees = {
+        e.id: e
+        for e in db.query(models.Employee).filter(
+            models.Employee.id.in_({ev.employee_id for ev in events})
+        )
+    }
+
+    results = []
+    for ev in events:
+        if ev.id in known:
+            results.append(_result(known[ev.id]))
+            continue
+
+        emp = employees.get(ev.employee_id)
+        if emp is None:
+            results.append({
+                "id": ev.id,
+                "status": "konflikt",
+                "meldung": "Mitarbeiter nicht gefunden",
+                "time_entry_id": None,
+            })
+            continue
+
+        if not _claim_event(db, ev):
+            se = db.query(models.SyncEvent).filter(models.SyncEvent.id == ev.id).one()
+            known[ev.id] = se
+            results.append(_result(se))
+            continue
+
+        savepoint = db.begin_nested()
+        try:
+            status, meldung, entry = _apply_event(db, emp, ev)
+            savepoint.commit()
+        except HTTPException as e:
+            savepoint.rollback()
+            status, meldung, entry = "konflikt", e.detail, None
+
+        se = db.query(models.SyncEvent).filter(models.SyncEvent.id == ev.id).one()
+        se.status = status
+        se.meldung = meldung
+        se.time_entry_id = entry.id if entry is not None else None
+        db.flush()
+        known[ev.id] = se
+
+        results.append(_result(se))
+
+    return results
@@ -14,6 +14,23 @@ if (origin.includes(":8080")) {
 }
 
 console.log("DEBUG API_BASE =", API_BASE);
+
+// Read-your-writes mit Lesereplikat: Das Backend liefert nach jedem
+// Schreibzugriff X-Write-LSN; bei allen weiteren Aufrufen mitschicken, damit
+// Listen sofort den eigenen Stand zeigen (ohne Replikat kommt kein Header).
+let WRITE_LSN = null;
+const _fetch = window.fetch.bind(window);
+window.fetch = async (url, options = {}) => {
+    if (WRITE_LSN && String(url).startsWith(API_BASE)) {
+        const headers = new Headers(options.headers || {});
+        headers.set("X-Write-LSN", WRITE_LSN);
+        options = { ...options, headers };
+    }
+    const resp = await _fetch(url, options);
+    const lsn = resp.headers.get("X-Write-LSN");
+    if (lsn) WRITE_LSN = lsn;
+    return resp;
+};
 let PROJECTS_CACHE = [];
 let CURRENT_USER = {
     id: 1, // ← muss zu deinem Employee passen
@@ -528,6 +545,7 @@ async function loadEmployeesForTime() {
 
         // Laufenden Eintrag aus DB wiederherstellen
         await restoreRunningEntry();
+        await loadActivitiesForTime();
     } catch (err) {
         console.warn("Fehler beim Laden der Mitarbeiter:", err);
     }
@@ -645,7 +663,271 @@ function getTodayStr() {
     return formatDateLocal(new Date());
 }
 
-// Start: ggf. laufenden Eintrag stoppen + neuen starten
+// ------------------------------------------------------------
+//  Offline-Warteschlange (IndexedDB)
+//  Jede Stempelung wird zuerst lokal gespeichert und dann gebündelt
+//  an /timeentries/sync geschickt. Ohne Netz bleibt sie in der Queue.
+// ------------------------------------------------------------
+
+const STAMP_DB_NAME = "stech_stamp_queue";
+const STAMP_STORE = "events";
+let STAMP_SYNC_RUNNING = false;
+// Backoff bei 5xx/Netzfehler: 5 s, 10 s, 20 s … höchstens 5 min
+const STAMP_RETRY_MIN_MS = 5000;
+const STAMP_RETRY_MAX_MS = 300000;
+let STAMP_RETRY_DELAY = 0;
+let STAMP_RETRY_TIMER = null;
+
+function openStampDb() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(STAMP_DB_NAME, 1);
+        req.onupgradeneeded = () => {
+            // seq = lokale Reihenfolge, id = Idempotenz-Schlüssel fürs Backend
+            req.result.createObjectStore(STAMP_STORE, { keyPath: "seq", autoIncrement: true });
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function makeEventId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    // Fallback für http ohne Secure Context
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+async function queueStampEvent(ev) {
+    const db = await openStampDb();
+    await new Promise((resolve, reject) => {
+        const tx = db.transaction(STAMP_STORE, "readwrite");
+        tx.objectStore(STAMP_STORE).add(ev);
+        tx.oncomplete = resolve;
+        tx.onerror = () => reject(tx.error);
+    });
+    db.close();
+}
+
+async function readQueuedStampEvents() {
+    const db = await openStampDb();
+    const items = await new Promise((resolve, reject) => {
+        const tx = db.transaction(STAMP_STORE, "readonly");
+        const req = tx.objectStore(STAMP_STORE).getAll();
+        req.onsuccess = () => resolve(req.result || []);
+        req.onerror = () => reject(req.error);
+    });
+    db.close();
+    return items;
+}
+
+// Konflikte bleiben in der Queue (konflikt = true) bis der Benutzer entscheidet
+async function markQueuedStampConflicts(items) {
+    if (!items.length) return;
+    const db = await openStampDb();
+    await new Promise((resolve, reject) => {
+        const tx = db.transaction(STAMP_STORE, "readwrite");
+        const store = tx.objectStore(STAMP_STORE);
+        items.forEach((it) => store.put(it));
+        tx.oncomplete = resolve;
+        tx.onerror = () => reject(tx.error);
+    });
+    db.close();
+}
+
+async function deleteQueuedStampEvents(seqs) {
+    if (!seqs.length) return;
+    const db = await openStampDb();
+    await new Promise((resolve, reject) => {
+        const tx = db.transaction(STAMP_STORE, "readwrite");
+        const store = tx.objectStore(STAMP_STORE);
+        seqs.forEach((s) => store.delete(s));
+        tx.oncomplete = resolve;
+        tx.onerror = () => reject(tx.error);
+    });
+    db.close();
+}
+
+function updateQueueInfo(count) {
+    const el = document.getElementById("time-queue-info");
+    if (!el) return;
+    el.textContent = count > 0 ? `Offline: ${count} Stempelung(en) warten auf Übertragung.` : "";
+}
+
+function stampEventLabel(ev) {
+    const typ = { start: "Start", pause: "Pause", stop: "Stop" }[ev.typ] || ev.typ;
+    const zeit = ev.zeit ? formatTimeStr(ev.zeit) : "";
+    return `${ev.datum || ""} ${zeit} ${typ}${ev.taetigkeit ? " – " + ev.taetigkeit : ""}`;
+}
+
+// Abgelehnte Stempelungen anzeigen: erneut senden (neue ID) oder verwerfen
+function renderStampConflicts(conflicts) {
+    const listEl = document.getElementById("time-queue-conflicts");
+    if (!listEl) return;
+    listEl.innerHTML = "";
+    if (!conflicts.length) return;
+
+    const title = document.createElement("div");
+    title.className = "error";
+    title.textContent = `${conflicts.length} Stempelung(en) wurden nicht gebucht:`;
+    listEl.appendChild(title);
+
+    conflicts.forEach((it) => {
+        const div = document.createElement("div");
+        div.className = "item";
+
+        const header = document.createElement("div");
+        header.className = "item-title";
+
+        const leftSpan = document.createElement("span");
+        leftSpan.textContent = stampEventLabel(it);
+        const info = document.createElement("span");
+        info.className = "small";
+        info.textContent = ` ${it.meldung || ""}`;
+        leftSpan.appendChild(info);
+
+        const rightSpan = document.createElement("span");
+        const retryBtn = document.createElement("button");
+        retryBtn.textContent = "Erneut senden";
+        retryBtn.addEventListener("click", async () => {
+            // Das Backend merkt sich das Ergebnis pro ID → neue ID vergeben
+            const { seq, konflikt, meldung, ...ev } = it;
+            await deleteQueuedStampEvents([seq]);
+            await queueStampEvent({ ...ev, id: makeEventId() });
+            await syncStampQueue(true);
+        });
+        const dropBtn = document.createElement("button");
+        dropBtn.textContent = "Verwerfen";
+        dropBtn.addEventListener("click", async () => {
+            if (!confirm("Diese Stempelung endgültig verwerfen?")) return;
+            await deleteQueuedStampEvents([it.seq]);
+            await syncStampQueue(true);
+        });
+        rightSpan.appendChild(retryBtn);
+        rightSpan.appendChild(dropBtn);
+
+        header.appendChild(leftSpan);
+        header.appendChild(rightSpan);
+        div.appendChild(header);
+        listEl.appendChild(div);
+    });
+}
+
+function scheduleStampRetry() {
+    STAMP_RETRY_DELAY = Math.min(
+        STAMP_RETRY_DELAY ? STAMP_RETRY_DELAY * 2 : STAMP_RETRY_MIN_MS,
+        STAMP_RETRY_MAX_MS
+    );
+    clearTimeout(STAMP_RETRY_TIMER);
+    STAMP_RETRY_TIMER = setTimeout(() => syncStampQueue(true), STAMP_RETRY_DELAY);
+}
+
+// Schickt alle wartenden Events in EINEM Request ans Backend.
+// force = true: sofort senden, auch wenn gerade ein Backoff läuft.
+async function syncStampQueue(force = false) {
+    if (STAMP_SYNC_RUNNING) return;
+    if (STAMP_RETRY_TIMER && force !== true) return;
+    STAMP_SYNC_RUNNING = true;
+    clearTimeout(STAMP_RETRY_TIMER);
+    STAMP_RETRY_TIMER = null;
+    try {
+        const all = await readQueuedStampEvents();
+        const items = all.filter((it) => !it.konflikt);
+        renderStampConflicts(all.filter((it) => it.konflikt));
+        updateQueueInfo(items.length);
+        if (items.length === 0) return;
+
+        let resp;
+        try {
+            resp = await fetch(`${API_BASE}/timeentries/sync`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ events: items.map(({ seq, ...ev }) => ev) }),
+            });
+        } catch (err) {
+            // offline → später erneut
+            console.warn("Stempel-Sync fehlgeschlagen, Events bleiben in der Warteschlange:", err);
+            scheduleStampRetry();
+            return;
+        }
+        if (resp.status >= 500) {
+            console.warn(`Stempel-Sync: Status ${resp.status}, neuer Versuch mit Backoff`);
+            scheduleStampRetry();
+            return;
+        }
+        if (!resp.ok) {
+            // 4xx: Batch wird so nie angenommen → als Konflikt zurückstellen,
+            // damit die Queue nicht blockiert und nichts verloren geht
+            const txt = await resp.text();
+            await markQueuedStampConflicts(
+                items.map((it) => ({ ...it, konflikt: true, meldung: `Status ${resp.status}: ${txt}` }))
+            );
+            STAMP_RETRY_DELAY = 0;
+            renderStampConflicts((await readQueuedStampEvents()).filter((it) => it.konflikt));
+            updateQueueInfo(0);
+            return;
+        }
+        const data = await resp.json();
+        STAMP_RETRY_DELAY = 0;
+
+        // Gebuchte/ignorierte Events entfernen, Konflikte mit Meldung behalten
+        const results = {};
+        (data.ergebnisse || []).forEach((r) => { results[r.id] = r; });
+        const conflicts = items
+            .filter((it) => results[it.id] && results[it.id].status === "konflikt")
+            .map((it) => ({ ...it, konflikt: true, meldung: results[it.id].meldung }));
+        await markQueuedStampConflicts(conflicts);
+        await deleteQueuedStampEvents(
+            items.filter((it) => results[it.id] && results[it.id].status !== "konflikt").map((it) => it.seq)
+        );
+
+        const rest = await readQueuedStampEvents();
+        updateQueueInfo(rest.filter((it) => !it.konflikt).length);
+        renderStampConflicts(rest.filter((it) => it.konflikt));
+
+        // Serverstand übernehmen
+        const sel = document.getElementById("time-employee");
+        if (sel && sel.value && data.running && sel.value in data.running) {
+            updateRunningUI(data.running[sel.value]);
+        }
+    } catch (err) {
+        console.warn("Stempel-Sync fehlgeschlagen, Events bleiben in der Warteschlange:", err);
+    } finally {
+        STAMP_SYNC_RUNNING = false;
+    }
+}
+
+// Lokalen Zustand sofort anpassen, damit die UI auch offline stimmt
+function applyStampLocally(ev) {
+    if (ev.typ === "stop") {
+        updateRunningUI(null);
+        return;
+    }
+    if (ev.typ === "pause" && CURRENT_RUNNING_ENTRY && CURRENT_RUNNING_ENTRY.is_pause) {
+        updateRunningUI(null);
+        return;
+    }
+    updateRunningUI({
+        id: null,
+        start: ev.zeit,
+        datum: ev.datum,
+        project_id: ev.typ === "pause" ? null : ev.project_id,
+        taetigkeit: ev.typ === "pause" ? "Pause" : ev.taetigkeit,
+    });
+}
+
+async function stampEvent(ev) {
+    const errEl = document.getElementById("time-error");
+    try {
+        await queueStampEvent({ id: makeEventId(), ...ev });
+    } catch (err) {
+        if (errEl) errEl.textContent = `Fehler beim Speichern der Stempelung: ${err}`;
+        return false;
+    }
+    applyStampLocally(ev);
+    await syncStampQueue(true);
+    return true;
+}
+
+// Start: laufenden Eintrag stoppt das Backend automatisch
 async function startTimeTracking() {
     const errEl = document.getElementById("time-error");
     if (errEl) errEl.textContent = "";
@@ -665,31 +947,8 @@ async function startTimeTracking() {
         return;
     }
 
-    // Immer aktuellen laufenden Eintrag holen
-    await fetchRunningEntry(empId);
-    const nowStr = getNowTimeStr();
-
-    // Falls etwas läuft → zuerst stoppen
-    if (CURRENT_RUNNING_ENTRY) {
-        try {
-            const respStop = await fetch(`${API_BASE}/timeentries/${CURRENT_RUNNING_ENTRY.id}`, {
-                method: "PUT",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ ende: nowStr }),
-            });
-            if (!respStop.ok) {
-                const txt = await respStop.text();
-                throw new Error(`Status ${respStop.status}: ${txt}`);
-            }
-            updateRunningUI(null);
-        } catch (err) {
-            if (errEl) errEl.textContent = `Fehler beim Stoppen des laufenden Eintrags: ${err}`;
-            return;
-        }
-    }
-
-    let dateStr = dateEl.value || getTodayStr();
-    let startStr = startEl.value ? `${startEl.value}:00` : nowStr;
+    const dateStr = dateEl.value || getTodayStr();
+    const startStr = startEl.value ? `${startEl.value}:00` : getNowTimeStr();
 
     const projectIdStr = projSelect.value;
     let projectId = projectIdStr ? parseInt(projectIdStr, 10) : null;
@@ -711,40 +970,19 @@ async function startTimeTracking() {
         localStorage.setItem("stech_last_activity", activity);
     }
 
-    try {
-        const resp = await fetch(`${API_BASE}/timeentries/`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                employee_id: parseInt(empId, 10),
-                customer_id: customerId,
-                project_id: projectId,
-                datum: dateStr,
-                start: startStr,
-                ende: null,
-                pause_min: null,
-                dauer_stunden: null,
-                taetigkeit: activity,
-                details: comment,
-                betrag: null,
-                quelle_datei: null,
-                externe_id: null,
-                quelle_system: "web-ui",
-            }),
-        });
-        if (!resp.ok) {
-            const txt = await resp.text();
-            throw new Error(`Status ${resp.status}: ${txt}`);
-        }
-        const data = await resp.json();
-        updateRunningUI(data);
-        if (errEl) errEl.textContent = "";
-    } catch (err) {
-        if (errEl) errEl.textContent = `Fehler beim Starten: ${err}`;
-    }
+    await stampEvent({
+        typ: "start",
+        employee_id: parseInt(empId, 10),
+        datum: dateStr,
+        zeit: startStr,
+        customer_id: customerId,
+        project_id: projectId,
+        taetigkeit: activity,
+        details: comment,
+    });
 }
 
-// Pause-Logik wie vorher
+// Pause: startet/beendet Pause, laufende Arbeit wird dabei beendet (Logik im Backend)
 async function pauseTimeTracking() {
     const errEl = document.getElementById("time-error");
     if (errEl) errEl.textContent = "";
@@ -754,108 +992,13 @@ async function pauseTimeTracking() {
         if (errEl) errEl.textContent = "Bitte zuerst einen Mitarbeiter wählen.";
         return;
     }
-    const empId = empSelect.value;
 
-    // Immer erst frische Info aus Backend holen
-    await fetchRunningEntry(empId);
-
-    const nowStr = getNowTimeStr();
-
-    try {
-        if (!CURRENT_RUNNING_ENTRY) {
-            // Keine Arbeit läuft → reine Pause starten
-            const today = getTodayStr();
-            const resp = await fetch(`${API_BASE}/timeentries/`, {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({
-                    employee_id: parseInt(empId, 10),
-                    customer_id: null,
-                    project_id: null,
-                    datum: today,
-                    start: nowStr,
-                    ende: null,
-                    pause_min: null,
-                    dauer_stunden: null,
-                    taetigkeit: "Pause",
-                    details: null,
-                    betrag: null,
-                    quelle_datei: null,
-                    externe_id: null,
-                    quelle_system: "web-ui",
-                }),
-            });
-            if (!resp.ok) {
-                const txt = await resp.text();
-                throw new Error(`Status ${resp.status}: ${txt}`);
-            }
-            const data = await resp.json();
-            updateRunningUI(data);
-            return;
-        }
-
-        // Es läuft etwas
-        if (CURRENT_RUNNING_ENTRY.is_pause) {
-            // Pause beenden
-            const resp = await fetch(`${API_BASE}/timeentries/${CURRENT_RUNNING_ENTRY.id}`, {
-                method: "PUT",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({
-                    ende: nowStr,
-                }),
-            });
-            if (!resp.ok) {
-                const txt = await resp.text();
-                throw new Error(`Status ${resp.status}: ${txt}`);
-            }
-            updateRunningUI(null);
-        } else {
-            // Arbeit läuft → Arbeit beenden, neue Pause starten
-            // 1. Arbeit beenden
-            let resp = await fetch(`${API_BASE}/timeentries/${CURRENT_RUNNING_ENTRY.id}`, {
-                method: "PUT",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({
-                    ende: nowStr,
-                }),
-            });
-            if (!resp.ok) {
-                const txt = await resp.text();
-                throw new Error(`Status ${resp.status}: ${txt}`);
-            }
-
-            // 2. Pause starten
-            const today = getTodayStr();
-            resp = await fetch(`${API_BASE}/timeentries/`, {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({
-                    employee_id: parseInt(empId, 10),
-                    customer_id: null,
-                    project_id: null,
-                    datum: today,
-                    start: nowStr,
-                    ende: null,
-                    pause_min: null,
-                    dauer_stunden: null,
-                    taetigkeit: "Pause",
-                    details: null,
-                    betrag: null,
-                    quelle_datei: null,
-                    externe_id: null,
-                    quelle_system: "web-ui",
-                }),
-            });
-            if (!resp.ok) {
-                const txt = await resp.text();
-                throw new Error(`Status ${resp.status}: ${txt}`);
-            }
-            const pauseEntry = await resp.json();
-            updateRunningUI(pauseEntry);
-        }
-    } catch (err) {
-        if (errEl) errEl.textContent = `Fehler bei Pause: ${err}`;
-    }
+    await stampEvent({
+        typ: "pause",
+        employee_id: parseInt(empSelect.value, 10),
+        datum: getTodayStr(),
+        zeit: getNowTimeStr(),
+    });
 }
 
 async function stopTimeTracking() {
@@ -867,33 +1010,15 @@ async function stopTimeTracking() {
         if (errEl) errEl.textContent = "Bitte zuerst einen Mitarbeiter wählen.";
         return;
     }
-    const empId = empSelect.value;
-
-    await fetchRunningEntry(empId);
-    if (!CURRENT_RUNNING_ENTRY) {
-        if (errEl) errEl.textContent = "Kein laufender Eintrag zum Stoppen.";
-        return;
-    }
-
-    const nowStr = getNowTimeStr();
-
-    try {
-        const resp = await fetch(`${API_BASE}/timeentries/${CURRENT_RUNNING_ENTRY.id}`, {
-            method: "PUT",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                ende: nowStr,
-            }),
-        });
-        if (!resp.ok) {
-            const txt = await resp.text();
-            throw new Error(`Status ${resp.status}: ${txt}`);
-        }
-        updateRunningUI(null);
-        await loadTimeEntries();
-    } catch (err) {
-        if (errEl) errEl.textContent = `Fehler beim Stoppen: ${err}`;
-    }
+    // Kein Check auf CURRENT_RUNNING_ENTRY: offline ist der Stand evtl. veraltet,
+    // ein Stop ohne laufenden Eintrag ignoriert das Backend.
+    const ok = await stampEvent({
+        typ: "stop",
+        employee_id: parseInt(empSelect.value, 10),
+        datum: getTodayStr(),
+        zeit: getNowTimeStr(),
+    });
+    if (ok && navigator.onLine) await loadTimeEntries();
 }
 
 // ============================================================
@@ -1331,6 +1456,7 @@ function fillEmployeeAdminForm(e) {
     setVal("admin-employee-ferienanspruch", e.ferienanspruch);
     setVal("admin-employee-ferien-guthaben", e.ferien_guthaben_stunden);
     setVal("admin-employee-ueberstunden", e.ueberstunden_guthaben);
+    setVal("admin-employee-saldo-stichtag", e.saldo_stichtag);
 
     // Versicherungen
     setVal("admin-employee-bvg-eintritt", e.bvg_eintritt);
@@ -1352,6 +1478,7 @@ function fillEmployeeAdminForm(e) {
     // Sonstiges
     setVal("admin-employee-krankentage", e.krankentage);
     setChecked("admin-employee-aktiv", e.aktiv);
+    updateSickUI(e);
 
     // Rechte
     setChecked("admin-employee-is-admin", e.is_admin);
@@ -1384,6 +1511,7 @@ function newEmployeeAdminForm() {
         "admin-employee-ferienanspruch",
         "admin-employee-ferien-guthaben",
         "admin-employee-ueberstunden",
+        "admin-employee-saldo-stichtag",
         "admin-employee-bvg-eintritt",
         "admin-employee-iban",
         "admin-employee-bank",
@@ -1416,6 +1544,7 @@ function newEmployeeAdminForm() {
 
     const aktiv = document.getElementById("admin-employee-aktiv");
     if (aktiv) aktiv.checked = true;
+    updateSickUI(null);
 
     showEmployeeForm(true);
 }
@@ -1467,6 +1596,7 @@ async function saveEmployeeAdmin() {
         ueberstunden_guthaben: document.getElementById("admin-employee-ueberstunden").value
             ? parseFloat(document.getElementById("admin-employee-ueberstunden").value)
             : null,
+        saldo_stichtag: document.getElementById("admin-employee-saldo-stichtag").value || null,
         bvg_eintritt: document.getElementById("admin-employee-bvg-eintritt").value || null,
         bvg_pflichtig: document.getElementById("admin-employee-bvg-pflichtig").checked,
         krankentaggeld_versichert: document.getElementById("admin-employee-ktg").checked,
@@ -1512,19 +1642,179 @@ async function saveEmployeeAdmin() {
     }
 }
 
+// Krank melden / beenden
+function updateSickUI(e) {
+    const statusEl = document.getElementById("admin-employee-krank-status");
+    const btn = document.getElementById("btn-admin-employee-krank");
+    if (!statusEl || !btn) return;
+
+    if (e && e.krank_seit) {
+        statusEl.textContent = `Krank seit ${e.krank_seit}`;
+        btn.textContent = "Gesund melden";
+    } else {
+        statusEl.textContent = "";
+        btn.textContent = "Krank melden";
+    }
+}
+
+async function toggleSickAdmin() {
+    const idStr = document.getElementById("admin-employee-id").value;
+    if (!idStr) {
+        alert("Bitte zuerst einen Mitarbeiter wählen.");
+        return;
+    }
+    const id = parseInt(idStr, 10);
+    const emp = (EMPLOYEES_CACHE_ADMIN || []).find((e) => e.id === id);
+    const action = emp && emp.krank_seit ? "gesund" : "krank";
+
+    try {
+        const resp = await fetch(`${API_BASE}/employees/${id}/${action}`, { method: "POST" });
+        if (!resp.ok) {
+            const txt = await resp.text();
+            throw new Error(`Status ${resp.status}: ${txt}`);
+        }
+        const data = await resp.json();
+        if (emp) Object.assign(emp, data);
+        const ktEl = document.getElementById("admin-employee-krankentage");
+        if (ktEl) ktEl.value = data.krankentage ?? "";
+        updateSickUI(data);
+    } catch (err) {
+        alert("Fehler bei Krankmeldung: " + err);
+    }
+}
+
 // ============================================================
-//  A D M I N  -  T Ä T I G K E I T E N  (Platzhalter)
+//  T Ä T I G K E I T E N
 // ============================================================
 
+// Auswahl fürs Live-Stempeln: zuerst die meistgenutzten des Mitarbeiters,
+// danach alle aktiven. Ohne Backend bleibt die Liste aus index.html stehen.
+async function loadActivitiesForTime() {
+    const select = document.getElementById("time-activity");
+    if (!select) return;
+    const empSelect = document.getElementById("time-employee");
+    const empId = empSelect ? empSelect.value : "";
+
+    try {
+        const resp = await fetch(`${API_BASE}/activities/`);
+        if (!resp.ok) throw new Error(`Status ${resp.status}`);
+        const all = await resp.json();
+
+        let top = [];
+        if (empId) {
+            const respTop = await fetch(`${API_BASE}/activities/suggestions?employee_id=${empId}`);
+            if (respTop.ok) top = await respTop.json();
+        }
+
+        const current = select.value || localStorage.getItem("stech_last_activity") || "";
+        select.innerHTML = `<option value="">Tätigkeit wählen…</option>`;
+
+        const addGroup = (label, items) => {
+            if (!items.length) return;
+            const group = document.createElement("optgroup");
+            group.label = label;
+            items.forEach((a) => {
+                const opt = document.createElement("option");
+                opt.value = a.name;
+                opt.textContent = a.name;
+                group.appendChild(opt);
+            });
+            select.appendChild(group);
+        };
+
+        const topIds = new Set(top.map((a) => a.id));
+        addGroup("Meistgenutzt", top);
+        addGroup("Alle", all.filter((a) => !topIds.has(a.id)));
+
+        if (current && select.querySelector(`option[value="${current}"]`)) {
+            select.value = current;
+        }
+    } catch (err) {
+        console.warn("Fehler beim Laden der Tätigkeiten:", err);
+    }
+}
+
 async function loadActivitiesAdmin() {
     const listEl = document.getElementById("admin-activity-list");
     if (!listEl) return;
-    listEl.innerHTML =
-        "<div class='small'>Tätigkeiten-Verwaltung: Backend-Endpoint /activities ist noch nicht implementiert.</div>";
+    listEl.innerHTML = "<div class='small'>Lade Tätigkeiten…</div>";
+
+    try {
+        const resp = await fetch(`${API_BASE}/activities/?include_inactive=true`);
+        if (!resp.ok) throw new Error(`Status ${resp.status}`);
+        const data = await resp.json();
+
+        if (data.length === 0) {
+            listEl.innerHTML = "<div class='small'>Noch keine Tätigkeiten angelegt.</div>";
+            return;
+        }
+
+        listEl.innerHTML = "";
+        data.forEach((a) => {
+            const div = document.createElement("div");
+            div.className = "item";
+
+            const header = document.createElement("div");
+            header.className = "item-title";
+
+            const leftSpan = document.createElement("span");
+            leftSpan.innerHTML = `${a.name} <span class="small">${a.aktiv ? "" : "(inaktiv)"}</span>`;
+
+            const rightSpan = document.createElement("span");
+            const toggleBtn = document.createElement("button");
+            toggleBtn.textContent = a.aktiv ? "Deaktivieren" : "Aktivieren";
+            toggleBtn.addEventListener("click", async () => {
+                try {
+                    const r = await fetch(`${API_BASE}/activities/${a.id}`, {
+                        method: "PUT",
+                        headers: { "Content-Type": "application/json" },
+                        body: JSON.stringify({ aktiv: !a.aktiv }),
+                    });
+                    if (!r.ok) {
+                        const txt = await r.text();
+                        throw new Error(`Status ${r.status}: ${txt}`);
+                    }
+                    await loadActivitiesAdmin();
+                } catch (err) {
+                    alert("Fehler beim Ändern der Tätigkeit: " + err);
+                }
+            });
+            rightSpan.appendChild(toggleBtn);
+
+            header.appendChild(leftSpan);
+            header.appendChild(rightSpan);
+            div.appendChild(header);
+            listEl.appendChild(div);
+        });
+    } catch (err) {
+        listEl.innerHTML = `<div class='small'>Fehler beim Laden der Tätigkeiten: ${err}</div>`;
+    }
 }
 
 async function createActivityAdmin() {
-    alert("Tätigkeiten-Verwaltung im Backend (/activities) ist noch nicht implementiert.");
+    const input = document.getElementById("admin-activity-name");
+    if (!input) return;
+    const name = input.value.trim();
+    if (!name) {
+        alert("Bitte einen Namen eingeben.");
+        return;
+    }
+
+    try {
+        const resp = await fetch(`${API_BASE}/activities/`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ name }),
+        });
+        if (!resp.ok) {
+            const txt = await resp.text();
+            throw new Error(`Status ${resp.status}: ${txt}`);
+        }
+        input.value = "";
+        await loadActivitiesAdmin();
+    } catch (err) {
+        alert("Fehler beim Anlegen der Tätigkeit: " + err);
+    }
 }
 
 // ============================================================
@@ -1639,6 +1929,7 @@ document.addEventListener("DOMContentLoaded", () => {
     // Admin
     document.getElementById("btn-admin-employee-save")?.addEventListener("click", saveEmployeeAdmin);
     document.getElementById("btn-admin-employee-new")?.addEventListener("click", newEmployeeAdminForm);
+    document.getElementById("btn-admin-employee-krank")?.addEventListener("click", toggleSickAdmin);
     document.getElementById("btn-admin-activity-add")?.addEventListener("click", createActivityAdmin);
     document.getElementById("admin-employee-select")?.addEventListener("change", (ev) => {
         const idStr = ev.target.value;
@@ -1655,11 +1946,17 @@ document.addEventListener("DOMContentLoaded", () => {
     });
 
     // Zeit-Auswertung
+    document.getElementById("time-employee")?.addEventListener("change", loadActivitiesForTime);
     document.getElementById("time-view-mode")?.addEventListener("change", loadTimeEntries);
     document.getElementById("time-view-date")?.addEventListener("change", loadTimeEntries);
 
+    // Offline-Stempelungen nachsenden, sobald wieder Netz da ist
+    window.addEventListener("online", () => syncStampQueue(true));
+    setInterval(syncStampQueue, 30000);
+
     // Anfangszustand
     checkBackend();
+    syncStampQueue();
     loadCustomers();
     loadProjects();
     setTodayAsDefaultDate();